@@ -1,14 +1,23 @@
+import array
+import bisect
 import collections
 import functools
+import heapq
 import inspect
-import os
+import math
 import re
-import stat
-import threading
+
+import pygame
 
 from pydisplay import Colors
+from pydisplay import DataSources
 from pydisplay import Drawables
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class Sorting(object):
     """
@@ -23,7 +32,87 @@ class Sorting(object):
     OTHER = -1
 
 
-class Chart(Drawables.Drawable):
+class Eviction(object):
+    """
+    The ways of picking which row is removed when a chart has more rows than its maximum (refer to Chart.set_max_rows).
+    OLDEST removes the row that was added first.  LOWEST and HIGHEST remove the row with the lowest or highest value in a
+    column (the oldest of them if there is a tie).  OTHER means that you are providing your own priority function (which
+    must take in a dictionary of the values of a row and return its priority); the row with the lowest priority is
+    removed first.
+    """
+    OLDEST = 0
+    LOWEST = 1
+    HIGHEST = 2
+    OTHER = -1
+
+
+def _typecode(value):
+    """
+    Internal function that gets the array.array typecode that can store a value without changing how it is formatted.
+    :param value: The value
+    :return: "q" for ints, "d" for floats, and None for anything else
+    """
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return "q"
+    if type(value) is float:
+        return "d"
+    return None
+
+
+def _new_column(values):
+    """
+    Internal function that stores the values of a column: in a typed array.array if they are all ints or all floats (so
+    they take up little memory and can be sorted by numpy) and in a list otherwise.
+    :param values: The values
+    :return: The column
+    """
+    typecodes = set(_typecode(value) for value in values)
+    if len(typecodes) == 0:
+        return array.array("q")
+    if len(typecodes) == 1 and None not in typecodes:
+        return array.array(typecodes.pop(), values)
+    return list(values)
+
+
+def _append_to_column(column, value):
+    """
+    Internal function that adds a value to the end of a column.  A typed column that gets a value of another type becomes
+    a list (an empty one just changes type).
+    :param column: The column (from _new_column)
+    :param value: The value
+    :return: The column (which is a new one if it had to change type)
+    """
+    if isinstance(column, array.array):
+        typecode = _typecode(value)
+        if typecode == column.typecode:
+            column.append(value)
+            return column
+        if len(column) == 0 and typecode is not None:
+            return array.array(typecode, [value])
+        column = list(column)
+    column.append(value)
+    return column
+
+
+class _Reversed(object):
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        """
+        Internal class that wraps a value so that it compares in reverse (used to evict the highest values first from a
+        heap that pops the smallest entry).
+        :param value: The value
+        """
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class Chart(Drawables.Drawable, DataSources.DataSourceMixin):
     # This is the restricted word that you should not send to the fifo; when this command is read, the data feed closes
     FIFO_CLOSING_COMMAND = "CLOSING"
 
@@ -31,6 +120,11 @@ class Chart(Drawables.Drawable):
         """
         Create a chart with columns of data (each column is called a dataset).  The first row is the headers of the
         columns and everything below are data points.  All of the columns must have the same number of data points.
+        The chart is virtualized: only the values are kept for every row, and the cells (and lines) are only made for the
+        rows that are actually on the screen, so a chart with thousands of rows costs about as much to draw (and as much
+        memory for drawables) as one that fills the screen.  The values are stored by column (in typed arrays when a
+        column only has ints or only has floats) and never move: sorting (add_sorting_scheme), filtering (set_filter),
+        and only showing the top rows (set_top_k) just change which rows are shown in what order.
         :param x: The x coordinate of the top left corner of the chart
         :param y: The y coordinate of the top left corner of the chart
         :param width: The width of the chart (the sum of column widths cannot exceed this)
@@ -42,14 +136,30 @@ class Chart(Drawables.Drawable):
         self._fg_color = fg_color
         self._cell_heights = cell_heights
 
-        self._drawables = {"horizontal": [], "vertical": [], "headers": [], "data": {}}
+        # data has the recycled cells of every dataset (refer to _draw_rows)
+        self._drawables = {"vertical": [], "headers": [], "data": {}}
 
         self.datasets = collections.OrderedDict()
-        self.fifo_sources = []
+        self._create_data_sources()
         self._can_add_more_datasets = True
 
         self._sorting_scheme = {"sorting_scheme": Sorting.FIFO, "dataset_name": None, "other_compare_func": None}
 
+        # The data of every dataset is kept in insertion order; order is the single permutation that says which row is
+        # shown where (order[i] is the row shown at position i) and keys are the sort keys of order.  Evicted rows stay
+        # in the data (marked as not alive) until there are enough of them to compact the data (refer to _compact).
+        self._rows = {"order": [], "keys": [], "alive": bytearray(), "num_evicted": 0, "oldest": 0}
+
+        # Refer to set_max_rows (entries is a heap of the rows by how soon they are evicted)
+        self._eviction = {"max_rows": None, "eviction": Eviction.OLDEST, "dataset_name": None, "eviction_func": None,
+                          "entries": []}
+
+        # Which rows are shown (refer to set_filter and set_top_k)
+        self._view = {"dataset_name": None, "filter_func": None, "top_k": None}
+
+        # The row that every recycled cell currently shows (refer to _draw_rows)
+        self._slots = []
+
     def draw(self, surface):
         """
         Draw the chart.  This chart has a list of its own drawables so it needs to draw those too
@@ -57,16 +167,81 @@ class Chart(Drawables.Drawable):
         :return: None
         """
         super().draw(surface)
+        self.receive_data()
 
-        for line in self._drawables["horizontal"]:
-            line.draw(surface)
         for line in self._drawables["vertical"]:
+            line.height = (self.num_rows + 1) * self._cell_heights
             line.draw(surface)
         for text in self._drawables["headers"]:
             text.draw(surface)
-        for dataset_texts in self._drawables["data"].values():
-            for text in dataset_texts:
-                text.draw(surface)
+        self._draw_rows(surface)
+
+    @property
+    def num_rows(self):
+        """
+        Getter for the number of rows that are shown (refer to set_filter and set_top_k).
+        :return: The number of rows
+        """
+        if self._view["top_k"] is None:
+            return len(self._rows["order"])
+        return min(len(self._rows["order"]), self._view["top_k"])
+
+    def get_row(self, position):
+        """
+        Get the values of a row that is shown.
+        :param position: The position of the row (0 is the top row)
+        :return: OrderedDict of the values of the row by dataset name
+        """
+        assert isinstance(position, int) and 0 <= position < self.num_rows
+
+        return self._row_values(self._rows["order"][position])
+
+    def _draw_rows(self, surface):
+        """
+        Internal function that draws the horizontal lines and the cells of only the rows that are inside of the surface
+        (or its clip area).  The cells are recycled: there are only as many cells as there are rows on the screen, and the
+        row at position i is drawn with cell i % (number of cells).  A cell only gets a new text (and is only rendered
+        again) when it shows a different row, so scrolling by a row only changes one row of cells.
+        :param surface: The surface onto which the chart should be drawn
+        :return: None
+        """
+        order = self._rows["order"]
+        num_rows = self.num_rows
+        clip = surface.get_clip()
+        first_line = max(int(math.floor((clip.top - self.y) / self._cell_heights)), 0)
+        last_line = min(int(math.ceil((clip.bottom - self.y) / self._cell_heights)), num_rows + 1)
+        if first_line > last_line:
+            return
+
+        # Line 0 is the top of the headers and line i + 2 is the bottom of the row at position i
+        width = sum([dataset["cell_width"] for dataset in self.datasets.values()])
+        for line in range(first_line, last_line + 1):
+            y = self.y + line * self._cell_heights
+            pygame.draw.line(surface, self._fg_color, (self.x, y), (self.x + width, y))
+
+        first, last = max(first_line - 1, 0), min(last_line, num_rows)
+        if last - first > len(self._slots):
+            for dataset_name, dataset in self.datasets.items():
+                cells = self._drawables["data"][dataset_name]
+                while len(cells) < last - first:
+                    cells.append(Drawables.Text(0, 0, "", dataset["data_font_size"], fg_color=dataset["font_color"],
+                                                align_x=dataset["data_align_x"], align_y=Drawables.Text.ALIGN_Y_CENTER))
+            self._slots = [None] * (last - first)
+
+        for position in range(first, last):
+            slot = position % len(self._slots)
+            row = order[position]
+            changed = self._slots[slot] != row
+            self._slots[slot] = row
+
+            y = round(self.y + (position + 1.5) * self._cell_heights)
+            for dataset_name, dataset in self.datasets.items():
+                cell = self._drawables["data"][dataset_name][slot]
+                if changed:
+                    cell.text = dataset["formatting"].format(dataset["data"][row])
+                cell.x = round(self.x + dataset["cell_x"])
+                cell.y = y
+                cell.draw(surface)
 
     def move(self, dx, dy):
         """
@@ -77,60 +252,18 @@ class Chart(Drawables.Drawable):
         """
         super().move(dx, dy)
 
-        for line in self._drawables["horizontal"]:
-            line.move(dx, dy)
+        # The cells and horizontal lines are placed when they are drawn
         for line in self._drawables["vertical"]:
             line.move(dx, dy)
         for text in self._drawables["headers"]:
             text.move(dx, dy)
-        for dataset_texts in self._drawables["data"].values():
-            for text in dataset_texts:
-                text.move(dx, dy)
 
     def exit(self):
         """
         Exit out of this chart. This involves closing the fifo data feed
         :return: None
         """
-        for fifo_source in self.fifo_sources:
-            if not (os.path.exists(fifo_source) and stat.S_ISFIFO(os.stat(fifo_source).st_mode)):
-                continue
-
-            # Go through all of the fifos writing a command indicating that fifo should close
-            with open(fifo_source, "w") as fifo:
-                fifo.write(Chart.FIFO_CLOSING_COMMAND)
-
-    def setup_new_data_source(self, fifo_source, new_data_callback):
-        """
-        Set up a new data_source/data feed.  This new source must be a fifo from which this function will automatically
-        and continuously try to read from in a new thread until this Chart is exited.  When there is a new data point,
-        the new_data_callback function will be triggered and you can define what to do in that (though you probably will
-        want to call the add_datum function)
-        :param fifo_source: The filepath (relative or absolute) to the data source
-        :param new_data_callback: The callback function that will process the data read from the fifo
-        :return: None
-        """
-        assert os.path.exists(fifo_source) and stat.S_ISFIFO(os.stat(fifo_source).st_mode)
-
-        self.fifo_sources.append(fifo_source)
-
-        def _get_new_data():
-            while True:
-                with open(fifo_source, "r") as fifo:
-                    while True:
-                        data = fifo.read().rstrip("\n")
-                        if len(data) == 0:
-                            break
-
-                        # Check if the fifo is actually initiating closing
-                        if data == Chart.FIFO_CLOSING_COMMAND:
-                            return
-
-                        # Data arrived so run the callback with the new data
-                        new_data_callback(self, fifo_source, data)
-
-        # Checking for new data needs to be done in a new thread so the select statement can block
-        threading.Thread(target=_get_new_data).start()
+        self._exit_data_sources()
 
     def add_dataset(self, name, data, font_color=Colors.WHITE, formatting="{}", cell_width=100,
                     header_align_x=Drawables.Text.ALIGN_X_CENTER, data_align_x=Drawables.Text.ALIGN_X_LEFT):
@@ -138,7 +271,9 @@ class Chart(Drawables.Drawable):
         Add a new dataset (or column) to the chart.  Note that this funciton cannot be called after the add_datum
         function has been called.
         :param name: Name of the column (will show up as a header and must be unique)
-        :param data: A list of data points for this column (all columns must have the same number of datapoints.
+        :param data: A list of data points for this column (all columns must have the same number of datapoints; the
+                    chart keeps its own copy, in insertion order, as self.datasets[name]["data"], which is an array.array
+                    if all of the values are ints or all of them are floats)
         :param font_color: Color of the font of the text in this column
         :param formatting: If you wat custom formatting; for example, if you want percent signs, you can pass in "{}%"
         :param cell_width: Width of the cells in this column
@@ -167,14 +302,7 @@ class Chart(Drawables.Drawable):
         column_x = self.x + sum([dataset["cell_width"] for dataset in self.datasets.values()])
         self._drawables["vertical"].append(Drawables.Line(column_x + cell_width, self.y, 0, vertical_line_height, color=self._fg_color))
 
-        # Deal with all horizontal lines
-        if len(self._drawables["horizontal"]) == 0:
-            for i in range(len(data) + 2):
-                horizontal = Drawables.Line(self.x, self.y + i * self._cell_heights, column_x + cell_width, 0, color=self._fg_color)
-                self._drawables["horizontal"].append(horizontal)
-        else:
-            for horizontal in self._drawables["horizontal"]:
-                horizontal.width = column_x + cell_width
+        # The horizontal lines are drawn for the rows on the screen (refer to _draw_rows)
 
         # Deal with headers
         x_values = {
@@ -186,26 +314,26 @@ class Chart(Drawables.Drawable):
                                                          name, font_size=15, fg_color=font_color,
                                                          align_x=header_align_x, align_y=Drawables.Text.ALIGN_Y_CENTER))
 
-        # Deal with data
-        data_drawables = []
-        for i, datum in enumerate(data):
-            data_drawables.append(Drawables.Text(x_values[data_align_x], self.y + (i + 1.5) * self._cell_heights,
-                                                 formatting.format(datum), font_size=data_font_size, fg_color=font_color,
-                                                 align_x=data_align_x, align_y=Drawables.Text.ALIGN_Y_CENTER))
-        self._drawables["data"][name] = data_drawables
+        # The cells are made when they are drawn (refer to _draw_rows)
+        self._drawables["data"][name] = []
+        self._slots = []
+
+        self._rows["alive"] = bytearray(b"\x01") * len(data)
 
-        # Store the input values
-        self.datasets[name] = {"data": data, "insertion_order": range(len(data)), "font_color": font_color,
-                               "formatting": formatting, "cell_width": cell_width, "data_font_size": data_font_size,
-                               "pad": pad, "header_align_x": header_align_x, "data_align_x": data_align_x}
+        # Store the input values (cell_x is where the cells of this column are, relative to the chart)
+        self.datasets[name] = {"data": _new_column(data), "font_color": font_color, "formatting": formatting,
+                               "cell_width": cell_width, "data_font_size": data_font_size, "pad": pad,
+                               "header_align_x": header_align_x, "data_align_x": data_align_x,
+                               "cell_x": x_values[data_align_x] - self.x}
 
         self._sort()
 
     def add_datum(self, values):
         """
-        Add new datum.  This will automatically add the datum to the chart and draw a new row for this.  After the data
-        point is added, the chart is resorted as desired (set the sorting scheme using add_sorting_scheme; default is
-        FIFO so new data appears at the bottom).
+        Add new datum.  This will automatically add the datum to the chart and draw a new row for this.  The row is put
+        where it belongs with the sorting scheme (set the sorting scheme using add_sorting_scheme; default is FIFO so new
+        data appears at the bottom) with a binary search, so the chart isn't sorted again.  Only the values are stored; the
+        cells are made when the row is on the screen.
         :param values: A dictionary of values (must have the same keys as the names of the columns and must have a
                     key/value pair for every column.
         :return: None
@@ -215,38 +343,23 @@ class Chart(Drawables.Drawable):
         # Mark that you can't add more datasets
         self._can_add_more_datasets = False
 
-        # Extend old vertical lines
-        for vertical in self._drawables["vertical"]:
-            vertical.height += self._cell_heights
-
-        # Add extra horizontal line
-        horizontal_y = self.y + (max([len(dataset["data"]) for dataset in self.datasets.values()]) + 2) * self._cell_heights
-        horizontal_width = sum([dataset["cell_width"] for dataset in self.datasets.values()])
-        self._drawables["horizontal"].append(Drawables.Line(self.x, horizontal_y, horizontal_width, 0, color=self._fg_color))
-
-        # Add text for the new row's data
-        column_x = self.x
-        for i, (dataset_name, value) in enumerate(values.items()):
-            dataset = self.datasets[dataset_name]
-            x_values = {
-                Drawables.Text.ALIGN_X_LEFT: column_x + dataset["pad"],
-                Drawables.Text.ALIGN_X_CENTER: column_x + dataset["cell_width"] / 2,
-                Drawables.Text.ALIGN_X_RIGHT: column_x + dataset["cell_width"] - dataset["pad"]
-            }
-            y_value = self.y + (len(dataset["data"]) + 1.5) * self._cell_heights
-
-            dataset["data"].append(value)
-            dataset["insertion_order"].append(max(dataset["insertion_order"]) + 1)
-            data_text = Drawables.Text(x_values[dataset["data_align_x"]], y_value, dataset["formatting"].format(value),
-                                       dataset["data_font_size"], fg_color=dataset["font_color"],
-                                       align_x=dataset["data_align_x"], align_y=Drawables.Text.ALIGN_Y_CENTER)
-            self._drawables["data"][dataset_name].append(data_text)
-
-            column_x += dataset["cell_width"]
-
-        # Since new datapoint, sort if not FIFO
-        if self._sorting_scheme != Sorting.FIFO:
-            self._sort()
+        row = len(self._rows["alive"])
+        for dataset_name, dataset in self.datasets.items():
+            dataset["data"] = _append_to_column(dataset["data"], values[dataset_name])
+        self._rows["alive"].append(1)
+
+        if self._shows(row):
+            # Put the new row where it belongs; the rows below it all move down by one
+            key = self._sort_keys((row,))[0]
+            position = self._insert_position(key)
+            self._rows["keys"].insert(position, key)
+            self._rows["order"].insert(position, row)
+
+        if self._eviction["max_rows"] is not None:
+            if self._eviction["eviction"] != Eviction.OLDEST:
+                heapq.heappush(self._eviction["entries"], self._eviction_entry(row, values))
+            while len(self._rows["alive"]) - self._rows["num_evicted"] > self._eviction["max_rows"]:
+                self._evict()
 
     def add_sorting_scheme(self, sorting_scheme, dataset_name=None, other_compare_func=None):
         """
@@ -275,61 +388,267 @@ class Chart(Drawables.Drawable):
         # Sort the rows
         self._sort()
 
+    def set_max_rows(self, max_rows=None, eviction=Eviction.OLDEST, dataset_name=None, eviction_func=None):
+        """
+        Limit how many rows the chart keeps (i.e. for a log that runs for weeks).  Once there are more rows, rows are
+        evicted (picked with one of the options in Chart.Eviction).  Evicting a row is O(n): picking it (from a heap) and
+        finding it in the rows that are shown (with a binary search) are O(log n), but taking it out of the list of the
+        rows that are shown moves the rows after it, just like putting a new row in with add_datum does.  That is a
+        memory move and not a Python loop, so it is cheap until there are a lot of rows (about 25 microseconds per row
+        with 100,000 rows).  Rows don't have drawables (refer to Chart), so evicting a row only forgets its values.  Note that datasets can't
+        be added after this.
+        :param max_rows: Maximum number of rows (or None for no maximum)
+        :param eviction: One of the options in Chart.Eviction
+        :param dataset_name: Only needed for Eviction.LOWEST and Eviction.HIGHEST; the name of the column whose values
+                    decide which row is evicted
+        :param eviction_func: Only needed for Eviction.OTHER; the priority function (refer to Chart.Eviction)
+        :return: None
+        """
+        assert max_rows is None or (isinstance(max_rows, int) and max_rows > 0)
+        assert eviction in [Eviction.OLDEST, Eviction.LOWEST, Eviction.HIGHEST, Eviction.OTHER]
+        if eviction == Eviction.OLDEST:
+            assert dataset_name is None and eviction_func is None
+        elif eviction == Eviction.LOWEST or eviction == Eviction.HIGHEST:
+            assert dataset_name is not None and dataset_name in self.datasets and eviction_func is None
+        else:
+            assert dataset_name is None and callable(eviction_func)
+
+        self._can_add_more_datasets = False
+        self._eviction = {"max_rows": max_rows, "eviction": eviction, "dataset_name": dataset_name,
+                          "eviction_func": eviction_func, "entries": []}
+        if max_rows is None:
+            return
+
+        alive = self._rows["alive"]
+        if eviction != Eviction.OLDEST:
+            entries = [self._eviction_entry(row, self._row_values(row)) for row in range(len(alive)) if alive[row]]
+            heapq.heapify(entries)
+            self._eviction["entries"] = entries
+        while len(alive) - self._rows["num_evicted"] > max_rows:
+            self._evict()
+
+    def _eviction_entry(self, row, values):
+        """
+        Internal function that gets the entry of a row in the heap of the rows by how soon they are evicted (refer to
+        set_max_rows).  The smallest entry is evicted first.
+        :param row: The row (its index in insertion order)
+        :param values: Dictionary of the values of the row
+        :return: Tuple of the priority and the row (so older rows go first if there is a tie)
+        """
+        eviction = self._eviction["eviction"]
+        if eviction == Eviction.LOWEST:
+            return values[self._eviction["dataset_name"]], row
+        if eviction == Eviction.HIGHEST:
+            return _Reversed(values[self._eviction["dataset_name"]]), row
+        return self._eviction["eviction_func"](values), row
+
+    def _evict(self):
+        """
+        Internal function that evicts a row (refer to set_max_rows).  The row is found in the rows that are shown with a
+        binary search and deleted from the list (an O(n) memory move); its values are only thrown away the next time the
+        data is compacted.
+        :return: None
+        """
+        alive = self._rows["alive"]
+        if self._eviction["eviction"] == Eviction.OLDEST:
+            while not alive[self._rows["oldest"]]:
+                self._rows["oldest"] += 1
+            row = self._rows["oldest"]
+        else:
+            row = heapq.heappop(self._eviction["entries"])[1]
+
+        if self._shows(row):
+            low, high = self._key_range(self._sort_keys((row,))[0])
+            # Rows with equal keys are in insertion order
+            position = bisect.bisect_left(self._rows["order"], row, low, high)
+            if position < high and self._rows["order"][position] == row:
+                del self._rows["order"][position]
+                del self._rows["keys"][position]
+
+        alive[row] = 0
+        self._rows["num_evicted"] += 1
+        if self._rows["num_evicted"] >= 64 and 2 * self._rows["num_evicted"] >= len(alive):
+            self._compact()
+
+    def _compact(self):
+        """
+        Internal function that throws away the values of the evicted rows.  The rows that are left are renumbered (in the
+        same order) so the data stays in insertion order.  This is done once at least half of the rows were evicted, so
+        it is O(1) amortized per evicted row.
+        :return: None
+        """
+        alive = self._rows["alive"]
+        kept = [row for row in range(len(alive)) if alive[row]]
+        renumbered = {row: i for i, row in enumerate(kept)}
+
+        for dataset in self.datasets.values():
+            column = dataset["data"]
+            if isinstance(column, array.array):
+                dataset["data"] = array.array(column.typecode, [column[row] for row in kept])
+            else:
+                dataset["data"] = [column[row] for row in kept]
+
+        # The keys of Sorting.FIFO, Sorting.LIFO, and Sorting.OTHER are made from the rows so they are made again (the
+        # rows keep their order, so the keys stay sorted)
+        self._rows["order"] = [renumbered[row] for row in self._rows["order"]]
+        if self._sorting_scheme["sorting_scheme"] not in (Sorting.ASCENDING, Sorting.DESCENDING):
+            self._rows["keys"] = self._sort_keys(self._rows["order"])
+        self._rows["alive"] = bytearray(b"\x01") * len(kept)
+        self._rows["num_evicted"] = 0
+        self._rows["oldest"] = 0
+
+        # Renumbering keeps the order of the rows so the entries are still a heap
+        self._eviction["entries"] = [(key, renumbered[row]) for key, row in self._eviction["entries"]]
+
+        # The recycled cells remember rows by their old numbers
+        self._slots = [None] * len(self._slots)
+
+    def _row_values(self, row):
+        """
+        Internal function that gets the values of a row.
+        :param row: The row (its index in insertion order)
+        :return: OrderedDict of the values of the row by dataset name
+        """
+        return collections.OrderedDict((name, dataset["data"][row]) for name, dataset in self.datasets.items())
+
+    def set_filter(self, dataset_name=None, filter_func=None):
+        """
+        Only show the rows whose value in a column passes a filter (the data itself is kept, so changing or removing the
+        filter shows the rows again).  Pass in nothing to show all of the rows again.
+        :param dataset_name: Name of the column that is filtered on
+        :param filter_func: Function that takes in a value of the column and returns whether or not to show its row
+        :return: None
+        """
+        assert (dataset_name is None) == (filter_func is None)
+        assert dataset_name is None or (dataset_name in self.datasets and callable(filter_func))
+
+        self._view["dataset_name"] = dataset_name
+        self._view["filter_func"] = filter_func
+        self._sort()
+
+    def set_top_k(self, k=None):
+        """
+        Only show the first k rows (with the sorting scheme; i.e. the k highest scores with Sorting.DESCENDING).
+        :param k: Number of rows to show (or None to show all of them)
+        :return: None
+        """
+        assert k is None or (isinstance(k, int) and k >= 0)
+
+        self._view["top_k"] = k
+
+    def _shows(self, row):
+        """
+        Internal function that checks if a row passes the filter (refer to set_filter).
+        :param row: The row (its index in insertion order)
+        :return: Whether or not the row is shown
+        """
+        if self._view["filter_func"] is None:
+            return True
+        return bool(self._view["filter_func"](self.datasets[self._view["dataset_name"]]["data"][row]))
+
     def _sort(self):
         """
-        Internal function that sorts the datasets accordingly.
+        Internal function that sorts all of the rows accordingly (only needed when the sorting scheme, the filter, or the
+        datasets change; add_datum inserts new rows into the sorted rows).
         :return: None
         """
-        if self._sorting_scheme["sorting_scheme"] == Sorting.FIFO:
-            for dataset_name, dataset in self.datasets.items():
-                zipped = zip(dataset["data"], dataset["insertion_order"])
-                zipped = sorted(zipped, key=lambda x: x[1])
-                dataset["data"] = [x[0] for x in zipped]
-                dataset["insertion_order"] = [x[1] for x in zipped]
-        elif self._sorting_scheme["sorting_scheme"] == Sorting.LIFO:
-            for dataset_name, dataset in self.datasets.items():
-                zipped = zip(dataset["data"], dataset["insertion_order"])
-                zipped = sorted(zipped, key=lambda x: x[1], reverse=True)
-                dataset["data"] = [x[0] for x in zipped]
-                dataset["insertion_order"] = [x[1] for x in zipped]
-        elif self._sorting_scheme["sorting_scheme"] == Sorting.ASCENDING:
-            dataset_name_sorting = self._sorting_scheme["dataset_name"]
-            dataset_sorting = self.datasets[dataset_name_sorting]
-            zipped_sorting = zip(dataset_sorting["data"], dataset_sorting["insertion_order"])
-            zipped_sorting = sorted(zipped_sorting, key=lambda x: x[0])
-            insertion_order_sorting = [x[1] for x in zipped_sorting]
-            for dataset_name, dataset in self.datasets.items():
-                zipped = zip(dataset["data"], dataset["insertion_order"])
-                zipped = sorted(zipped, key=lambda x: x[1])
-                dataset["data"] = [zipped[i][0] for i in insertion_order_sorting]
-                dataset["insertion_order"] = insertion_order_sorting
-        elif self._sorting_scheme["sorting_scheme"] == Sorting.DESCENDING:
-            dataset_name_sorting = self._sorting_scheme["dataset_name"]
-            dataset_sorting = self.datasets[dataset_name_sorting]
-            zipped_sorting = zip(dataset_sorting["data"], dataset_sorting["insertion_order"])
-            zipped_sorting = sorted(zipped_sorting, key=lambda x: x[0], reverse=True)
-            insertion_order_sorting = [x[1] for x in zipped_sorting]
-            for dataset_name, dataset in self.datasets.items():
-                zipped = zip(dataset["data"], dataset["insertion_order"])
-                zipped = sorted(zipped, key=lambda x: x[1])
-                dataset["data"] = [zipped[i][0] for i in insertion_order_sorting]
-                dataset["insertion_order"] = insertion_order_sorting
-        elif self._sorting_scheme["sorting_scheme"] == Sorting.OTHER:
-            dataset_name_sorting = self._sorting_scheme["dataset_name"]
-            dataset_sorting = self.datasets[dataset_name_sorting]
-            zipped_sorting = zip(dataset_sorting["data"], dataset_sorting["insertion_order"])
-            zipped_sorting = sorted(zipped_sorting, key=functools.cmp_to_key(self._sorting_scheme["other_compare_func"]))
-            insertion_order_sorting = [x[1] for x in zipped_sorting]
-            for dataset_name, dataset in self.datasets.items():
-                zipped = zip(dataset["data"], dataset["insertion_order"])
-                zipped = sorted(zipped, key=lambda x: x[1])
-                dataset["data"] = [zipped[i][0] for i in insertion_order_sorting]
-                dataset["insertion_order"] = insertion_order_sorting
+        if self._sorting_scheme["sorting_scheme"] == Sorting.OTHER:
+            self._sorting_scheme["key"] = functools.cmp_to_key(self._sorting_scheme["other_compare_func"])
+
+        alive = self._rows["alive"]
+        if self._rows["num_evicted"] == 0:
+            rows = range(len(alive))
+        else:
+            rows = [row for row in range(len(alive)) if alive[row]]
+        if self._view["filter_func"] is not None:
+            filter_column = self.datasets[self._view["dataset_name"]]["data"]
+            rows = [row for row in rows if self._view["filter_func"](filter_column[row])]
+
+        column = None
+        if self._sorting_scheme["sorting_scheme"] in (Sorting.ASCENDING, Sorting.DESCENDING):
+            column = self.datasets[self._sorting_scheme["dataset_name"]]["data"]
+        if numpy is not None and isinstance(column, array.array) and len(rows) > 0:
+            # A typed column is sorted by numpy without making a key for every row first
+            rows = numpy.asarray(rows)
+            values = numpy.frombuffer(column, dtype=numpy.int64 if column.typecode == "q" else numpy.float64)[rows]
+            if self._sorting_scheme["sorting_scheme"] == Sorting.ASCENDING:
+                indices = numpy.argsort(values, kind="stable")
+                self._rows["keys"] = values[indices].tolist()
+            else:
+                # Sorting the reversed values and reversing that keeps equal values in insertion order
+                indices = len(rows) - 1 - numpy.argsort(values[::-1], kind="stable")[::-1]
+                self._rows["keys"] = values[indices].tolist()
+            self._rows["order"] = rows[indices].tolist()
         else:
-            raise ValueError
+            keys = self._sort_keys(rows)
+            positions = sorted(range(len(keys)), key=keys.__getitem__, reverse=self._descending())
+            self._rows["order"] = [rows[position] for position in positions]
+            self._rows["keys"] = [keys[position] for position in positions]
 
-        # Update the actual items in the chart
-        for dataset_name, dataset in self.datasets.items():
-            texts = self._drawables["data"][dataset_name]
-            for datum, text in zip(dataset["data"], texts):
-                text.text = dataset["formatting"].format(datum)
\ No newline at end of file
+    def _sort_keys(self, rows):
+        """
+        Internal function that gets the keys that rows are sorted by (in ascending order, or in descending order if
+        _descending).  Rows with equal keys stay in insertion order.
+        :param rows: The rows (their indices in insertion order)
+        :return: List of the keys
+        """
+        sorting_scheme = self._sorting_scheme["sorting_scheme"]
+        if sorting_scheme == Sorting.FIFO or sorting_scheme == Sorting.LIFO:
+            return list(rows)
+
+        column = self.datasets[self._sorting_scheme["dataset_name"]]["data"]
+        if sorting_scheme == Sorting.ASCENDING or sorting_scheme == Sorting.DESCENDING:
+            return [column[row] for row in rows]
+        if sorting_scheme == Sorting.OTHER:
+            # Like before, the compare function is given (value, row) tuples
+            key = self._sorting_scheme["key"]
+            return [key((column[row], row)) for row in rows]
+        raise ValueError
+
+    def _descending(self):
+        """
+        Internal function that checks if the rows are sorted by their keys in descending order.
+        :return: True for Sorting.LIFO and Sorting.DESCENDING
+        """
+        return self._sorting_scheme["sorting_scheme"] in (Sorting.LIFO, Sorting.DESCENDING)
+
+    def _insert_position(self, key):
+        """
+        Internal function that finds where a new row goes with a binary search on the keys of the sorted rows.  The new
+        row goes after the rows with an equal key (so rows with equal keys stay in insertion order).
+        :param key: The key of the new row
+        :return: The position
+        """
+        keys = self._rows["keys"]
+        if not self._descending():
+            return bisect.bisect_right(keys, key)
+
+        # The keys are in descending order, so look for the first key that is smaller
+        low, high = 0, len(keys)
+        while low < high:
+            middle = (low + high) // 2
+            if keys[middle] < key:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _key_range(self, key):
+        """
+        Internal function that finds the rows that are shown with a key equal to key (with a binary search).
+        :param key: The key
+        :return: Tuple of the first position and the position after the last one
+        """
+        keys = self._rows["keys"]
+        if not self._descending():
+            return bisect.bisect_left(keys, key), bisect.bisect_right(keys, key)
+
+        # The keys are in descending order, so look for the first key that isn't larger
+        low, high = 0, len(keys)
+        while low < high:
+            middle = (low + high) // 2
+            if key < keys[middle]:
+                low = middle + 1
+            else:
+                high = middle
+        return low, self._insert_position(key)
@@ -9,6 +9,9 @@ MAGENTA = (255,0,255)
 CYAN = (0,238,238)
 PURPLE = (128,0,128)
 
+# Colors of a heatmap from the smallest value to the largest (refer to color_lookup_table)
+HEAT_COLORS = (BLACK, BLUE, RED, YELLOW, WHITE)
+
 
 def is_color(color):
     """
@@ -18,3 +21,23 @@ def is_color(color):
     :return: True if it is a valid color and False otherwise
     """
     return isinstance(color, tuple) and len(color) == 3 and all([0 <= x <= 255 for x in color])
+
+
+def color_lookup_table(colors, size=256):
+    """
+    Spread colors evenly over a table of size colors and fill in between them by interpolating, so that a value can be
+    turned into a color with one lookup (i.e. for a heatmap).
+    :param colors: Tuple or list of at least two colors (from the smallest value to the largest)
+    :param size: Number of colors in the table
+    :return: List of size colors
+    """
+    assert (isinstance(colors, tuple) or isinstance(colors, list)) and len(colors) >= 2 and all([is_color(c) for c in colors])
+    assert isinstance(size, int) and size >= 2
+
+    table = []
+    for i in range(size):
+        position = i * (len(colors) - 1) / float(size - 1)
+        low = min(int(position), len(colors) - 2)
+        fraction = position - low
+        table.append(tuple([int(round(a + (b - a) * fraction)) for a, b in zip(colors[low], colors[low + 1])]))
+    return table
@@ -10,3 +10,9 @@ REFRESH_INTERVAL = 0.02
 # When holding down finger on the screen, the position might change a bit.  This defines the amount the finger can move
 # (in number of pixel in x or y direction) for the hold to count as a press
 TOUCH_HOLD_TOLERANCE = 10
+
+# Two taps on the screen within this many seconds (and within TOUCH_HOLD_TOLERANCE of each other) count as a double tap
+DOUBLE_TAP_INTERVAL = 0.3
+
+# Holding a finger on the screen (without moving it) for at least this many seconds counts as a long press
+LONG_PRESS_DURATION = 0.5
@@ -0,0 +1,593 @@
+import asyncio
+import collections
+import os
+import stat
+import threading
+import time
+
+
+class PolicyTypes(object):
+    """
+    The ways a DataPolicy can deal with a data source that produces records faster than the display can handle them.
+    KEEP_ALL delivers every record, KEEP_LATEST only keeps the newest max_records records, DECIMATE drops records that
+    arrive faster than max_rate records per second, and the AGGREGATE options combine all of the records that arrived
+    during a frame into their mean, their min and max, or just the last one.
+    """
+    KEEP_ALL = 0
+    KEEP_LATEST = 1
+    DECIMATE = 2
+    AGGREGATE_MEAN = 3
+    AGGREGATE_MIN_MAX = 4
+    AGGREGATE_LAST = 5
+
+    ALL = (KEEP_ALL, KEEP_LATEST, DECIMATE, AGGREGATE_MEAN, AGGREGATE_MIN_MAX, AGGREGATE_LAST)
+    AGGREGATES = (AGGREGATE_MEAN, AGGREGATE_MIN_MAX, AGGREGATE_LAST)
+
+
+class DataPolicy(object):
+    def __init__(self, policy_type=PolicyTypes.KEEP_ALL, max_records=None, max_rate=None, parser=None):
+        """
+        A policy that sits between a data source and the Graph/Chart it feeds.  Records from the source are offered to
+        the policy (from whatever thread reads the source) and the records that survive the policy are drained once per
+        frame by the drawing thread, so a burst from the source costs at most a bounded amount of work per frame.  The
+        counters (received, delivered, dropped, aggregated, and parse_errors) can be read at any time to see what the
+        policy did.
+        :param policy_type: One of the options in PolicyTypes
+        :param max_records: Only needed for PolicyTypes.KEEP_LATEST; how many records to hold on to between frames
+        :param max_rate: Only needed for PolicyTypes.DECIMATE; maximum number of records per second to let through
+        :param parser: Function that turns the raw data into a record (i.e. "1 2" into (1.0, 2.0)); this runs on the
+                    thread reading the source.  Required for the AGGREGATE options, where records must be a number or a
+                    tuple of numbers (for MIN_MAX, tuples are compared on their last value).  Data that the parser can't
+                    parse (or that doesn't parse into numbers for the AGGREGATE options) is dropped and counted in
+                    parse_errors instead of stopping the thread reading the source.
+        """
+        assert policy_type in PolicyTypes.ALL
+        if policy_type == PolicyTypes.KEEP_LATEST:
+            assert isinstance(max_records, int) and max_records > 0
+        else:
+            assert max_records is None
+        if policy_type == PolicyTypes.DECIMATE:
+            assert (isinstance(max_rate, int) or isinstance(max_rate, float)) and max_rate > 0
+        else:
+            assert max_rate is None
+        if policy_type in PolicyTypes.AGGREGATES:
+            assert callable(parser)
+        else:
+            assert parser is None or callable(parser)
+
+        self.policy_type = policy_type
+        self.max_records = max_records
+        self.max_rate = max_rate
+        self._parser = parser
+
+        # Counters
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.aggregated = 0
+        self.parse_errors = 0
+
+        self._lock = threading.Lock()
+        self._records = collections.deque()
+        self._last_accepted_time = None
+        self._aggregate = None
+
+    def offer(self, data, timestamp=None):
+        """
+        Give a new record from the data source to the policy.  This is safe to call from any thread.
+        :param data: The raw data from the data source
+        :param timestamp: When the data arrived (as returned by time.time()); defaults to now.  Only used for
+                    PolicyTypes.DECIMATE.
+        :return: None
+        """
+        # Parsing happens before taking the lock so a slow parser doesn't hold up drain
+        try:
+            record = data if self._parser is None else self._parser(data)
+            valid = self.policy_type not in PolicyTypes.AGGREGATES or DataPolicy._is_numeric_record(record)
+        except Exception:
+            valid = False
+
+        with self._lock:
+            self.received += 1
+            if not valid:
+                self.parse_errors += 1
+                return
+
+            if self.policy_type == PolicyTypes.KEEP_ALL:
+                self._records.append(record)
+            elif self.policy_type == PolicyTypes.KEEP_LATEST:
+                if len(self._records) == self.max_records:
+                    self._records.popleft()
+                    self.dropped += 1
+                self._records.append(record)
+            elif self.policy_type == PolicyTypes.DECIMATE:
+                now = time.time() if timestamp is None else timestamp
+                if self._last_accepted_time is not None and now - self._last_accepted_time < 1.0 / self.max_rate:
+                    self.dropped += 1
+                    return
+                self._last_accepted_time = now
+                self._records.append(record)
+            else:
+                self._add_to_aggregate(record)
+
+    def drain(self):
+        """
+        Take the records that survived the policy since the last drain.  This is called once per frame by the Graph or
+        Chart that owns the data source.
+        :return: A list of records in the order that they arrived
+        """
+        with self._lock:
+            if self.policy_type in PolicyTypes.AGGREGATES:
+                records = self._aggregate_records()
+                if self._aggregate is not None:
+                    self.aggregated += self._aggregate["count"] - len(records)
+                self._aggregate = None
+            else:
+                records = list(self._records)
+                self._records.clear()
+
+            self.delivered += len(records)
+
+        return records
+
+    @staticmethod
+    def _is_numeric_record(record):
+        """
+        Internal function that checks if a record can be aggregated.
+        :param record: The parsed record
+        :return: True if the record is a number or a non-empty tuple of numbers and False otherwise
+        """
+        if isinstance(record, tuple):
+            return len(record) > 0 and all(isinstance(value, (int, float)) for value in record)
+        return isinstance(record, (int, float))
+
+    def _add_to_aggregate(self, record):
+        """
+        Internal function that folds a record into the aggregate of the current frame (constant memory per frame).
+        :param record: A number or a tuple of numbers
+        :return: None
+        """
+        value = record[-1] if isinstance(record, tuple) else record
+        aggregate = self._aggregate
+        if aggregate is None:
+            self._aggregate = {"count": 1, "last": record, "sum": record if isinstance(record, tuple) else (record,),
+                               "min": (value, 0, record), "max": (value, 0, record)}
+            return
+
+        if self.policy_type == PolicyTypes.AGGREGATE_MEAN:
+            aggregate["sum"] = tuple(a + b for a, b in zip(aggregate["sum"], record if isinstance(record, tuple) else (record,)))
+        elif self.policy_type == PolicyTypes.AGGREGATE_MIN_MAX:
+            if value < aggregate["min"][0]:
+                aggregate["min"] = (value, aggregate["count"], record)
+            if value > aggregate["max"][0]:
+                aggregate["max"] = (value, aggregate["count"], record)
+        aggregate["last"] = record
+        aggregate["count"] += 1
+
+    def _aggregate_records(self):
+        """
+        Internal function that turns the aggregate of the current frame into the records to deliver.
+        :return: A list of records
+        """
+        aggregate = self._aggregate
+        if aggregate is None:
+            return []
+
+        if self.policy_type == PolicyTypes.AGGREGATE_MEAN:
+            means = tuple(total / aggregate["count"] for total in aggregate["sum"])
+            return [means if isinstance(aggregate["last"], tuple) else means[0]]
+        elif self.policy_type == PolicyTypes.AGGREGATE_MIN_MAX:
+            if aggregate["min"][1] == aggregate["max"][1]:
+                return [aggregate["min"][2]]
+            # Deliver the two records in the order they arrived
+            return [record for _, _, record in sorted([aggregate["min"], aggregate["max"]], key=lambda x: x[1])]
+        else:
+            return [aggregate["last"]]
+
+
+def is_async_source(source):
+    """
+    Check if something can be used as an async data source (an asyncio.StreamReader or any async iterator).
+    :param source: Something to check to see if it is a valid async data source
+    :return: True if it is a valid async data source and False otherwise
+    """
+    return isinstance(source, asyncio.StreamReader) or hasattr(source, "__aiter__")
+
+
+async def read_async_source(source, on_data, closing_command):
+    """
+    Coroutine that keeps reading records from an async data source until the source is exhausted or the closing
+    command is received.  An asyncio.StreamReader is read line by line (each line is a record, decoded as UTF-8) while
+    an async iterator can yield strings, bytes, or already parsed objects.
+    :param source: An asyncio.StreamReader or an async iterator
+    :param on_data: Function that is called with every record that arrives
+    :param closing_command: When a record equal to this is read, stop reading
+    :return: None
+    """
+    assert is_async_source(source)
+
+    if isinstance(source, asyncio.StreamReader):
+        while True:
+            line = await source.readline()
+            if len(line) == 0:
+                # End of the stream
+                return
+
+            data = line.decode().rstrip("\n")
+            if data == closing_command:
+                return
+            if len(data) > 0:
+                on_data(data)
+    else:
+        async for data in source:
+            if isinstance(data, bytes):
+                data = data.decode()
+            if isinstance(data, str):
+                data = data.rstrip("\n")
+                if data == closing_command:
+                    return
+                if len(data) == 0:
+                    continue
+            on_data(data)
+
+
+def read_fifo_source(fifo_source, on_data, closing_command):
+    """
+    Keep reading records from a fifo until the closing command is received (this blocks so run it in its own thread).
+    :param fifo_source: The filepath (relative or absolute) to the fifo
+    :param on_data: Function that is called with every record that arrives
+    :param closing_command: When a record equal to this is read, stop reading
+    :return: None
+    """
+    while True:
+        with open(fifo_source, "r") as fifo:
+            while True:
+                data = fifo.read().rstrip("\n")
+                if len(data) == 0:
+                    break
+
+                # Check if the fifo is actually initiating closing
+                if data == closing_command:
+                    return
+
+                on_data(data)
+
+
+def close_fifo_source(fifo_source, closing_command):
+    """
+    Make a thread running read_fifo_source stop by writing the closing command to the fifo.
+    :param fifo_source: The filepath (relative or absolute) to the fifo
+    :param closing_command: The closing command that the reader is waiting for
+    :return: None
+    """
+    if not (os.path.exists(fifo_source) and stat.S_ISFIFO(os.stat(fifo_source).st_mode)):
+        return
+
+    with open(fifo_source, "w") as fifo:
+        fifo.write(closing_command)
+
+
+def start_async_source(source, on_data, closing_command):
+    """
+    Schedule reading from an async data source on the currently running event loop.
+    :param source: An asyncio.StreamReader or an async iterator
+    :param on_data: Function that is called with every record that arrives
+    :param closing_command: When a record equal to this is read, stop reading
+    :return: The asyncio.Task doing the reading or None if there is no running event loop yet
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+    return loop.create_task(read_async_source(source, on_data, closing_command))
+
+
+class DataSourceMixin(object):
+    """
+    The data sources (fifos and async sources) and data policies shared by Graph and Chart.  A class using this must call
+    _create_data_sources when it is created, receive_data at the start of every draw, and _exit_data_sources when it is
+    exited.  The callbacks are called with the object using this, the source, and the record.
+    """
+    # This is the restricted word that you should not send to a data source; when this command is read, the feed closes
+    FIFO_CLOSING_COMMAND = "CLOSING"
+
+    def _create_data_sources(self):
+        """
+        Internal function that creates everything for keeping track of data sources.
+        :return: None
+        """
+        self.fifo_sources = []
+        self.async_sources = []
+        self._async_sources_pending = False
+        self._policed_sources = []
+
+    def setup_new_data_source(self, fifo_source, new_data_callback, policy=None):
+        """
+        Set up a new data_source/data feed.  This new source must be a fifo from which this function will automatically
+        and continuously try to read from in a new thread until this is exited.  When there is a new data point, the
+        new_data_callback function will be triggered and you can define what to do in that (though you probably will
+        want to call the add_datum function)
+        :param fifo_source: The filepath (relative or absolute) to the data source
+        :param new_data_callback: The callback function that will process the data read from the fifo; called with this,
+                    the source, and the data
+        :param policy: Optional DataPolicy for sources that can produce faster than the display.  With a policy, the data
+                    is buffered by the policy and new_data_callback is instead called once per frame (from the drawing
+                    thread) with the records that made it through the policy.
+        :return: None
+        """
+        assert os.path.exists(fifo_source) and stat.S_ISFIFO(os.stat(fifo_source).st_mode)
+        assert policy is None or isinstance(policy, DataPolicy)
+
+        self.fifo_sources.append(fifo_source)
+        on_data = self._data_receiver(fifo_source, new_data_callback, policy)
+
+        # Checking for new data needs to be done in a new thread so reading the fifo can block
+        threading.Thread(target=read_fifo_source, args=(fifo_source, on_data, self.FIFO_CLOSING_COMMAND)).start()
+
+    def setup_new_async_data_source(self, source, new_data_callback, policy=None):
+        """
+        Set up a new async data source/data feed.  This is the asyncio equivalent of setup_new_data_source and is meant
+        to be used with PyDisplay.run_async.  The source is read by a task on the running event loop (so no extra thread
+        is needed and the callback runs on the same thread that draws) until it is exhausted, the closing command is
+        received, or this is exited.  If no event loop is running yet, reading starts on the first draw.
+        :param source: An asyncio.StreamReader (every line is a record) or an async iterator (every item is a record)
+        :param new_data_callback: The callback function that will process the data; called with this, the source, and
+                    the record
+        :param policy: Optional DataPolicy (refer to setup_new_data_source)
+        :return: None
+        """
+        assert is_async_source(source)
+        assert callable(new_data_callback)
+        assert policy is None or isinstance(policy, DataPolicy)
+
+        on_data = self._data_receiver(source, new_data_callback, policy)
+        self.async_sources.append({"source": source, "on_data": on_data, "task": None})
+        self._start_async_sources()
+
+    def receive_data(self):
+        """
+        Start the async data sources that couldn't be started yet and hand over the records that made it through the
+        data policies since the last frame.  PyDisplay calls this every frame for everything on every page (even the
+        pages that aren't shown, so their policies don't keep piling up records) and draw calls it too, so you only need
+        to call it yourself when this isn't on a page of a running PyDisplay and isn't drawn.
+        :return: None
+        """
+        # Async data sources set up before the event loop was running can only be started now
+        if self._async_sources_pending:
+            self._start_async_sources()
+
+        for policed_source in self._policed_sources:
+            for record in policed_source["policy"].drain():
+                policed_source["callback"](self, policed_source["source"], record)
+
+    def _exit_data_sources(self):
+        """
+        Internal function that stops reading from all of the data sources.
+        :return: None
+        """
+        for fifo_source in self.fifo_sources:
+            close_fifo_source(fifo_source, self.FIFO_CLOSING_COMMAND)
+
+        # Async data sources are just cancelled
+        for async_source in self.async_sources:
+            if async_source["task"] is not None:
+                async_source["task"].cancel()
+
+    def _start_async_sources(self):
+        """
+        Internal function that starts reading from the async data sources that aren't being read yet.
+        :return: None
+        """
+        self._async_sources_pending = False
+        for async_source in self.async_sources:
+            if async_source["task"] is not None:
+                continue
+
+            async_source["task"] = start_async_source(async_source["source"], async_source["on_data"],
+                                                      self.FIFO_CLOSING_COMMAND)
+            if async_source["task"] is None:
+                self._async_sources_pending = True
+
+    def _data_receiver(self, source, new_data_callback, policy):
+        """
+        Internal function that creates the function that receives the data read from a data source.  Without a policy,
+        the data goes straight to new_data_callback; with a policy, the data is offered to the policy and handed over to
+        new_data_callback at the next draw.
+        :param source: The data source
+        :param new_data_callback: The callback function that will process the data
+        :param policy: A DataPolicy or None
+        :return: A function that takes in the data
+        """
+        if policy is None:
+            return lambda data: new_data_callback(self, source, data)
+
+        self._policed_sources.append({"source": source, "callback": new_data_callback, "policy": policy})
+        return policy.offer
+
+
+class DataHub(object):
+    # This is the restricted word that you should not send to the fifo; when this command is read, the stream closes
+    FIFO_CLOSING_COMMAND = "CLOSING"
+
+    def __init__(self):
+        """
+        A central place where named data streams are read and parsed once and then shared with any number of
+        subscribers (Graphs, Charts, or your own Drawables, possibly on different pages).  Reading a record only costs
+        parsing it and queueing it on its stream, no matter how many subscribers there are.  Once per frame (PyDisplay
+        calls iteration), every stream hands the same list of parsed records to each of its subscribers, so records are
+        never copied per subscriber.  Each subscriber can have its own DataPolicy for its own windowing and decimation.
+        You do not need to directly create an instance of this because PyDisplay creates it automatically (refer to
+        PyDisplay.data_hub).
+        """
+        self._streams = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def add_stream(self, name, parser=None, max_pending=None):
+        """
+        Create a new named stream.  Records can then be published to it with publish or by one of the setup functions.
+        :param name: Name of the stream (must be unique)
+        :param parser: Optional function that turns the raw data into a record; run once per record no matter how many
+                    subscribers there are.  Data that the parser can't parse is skipped and counted (refer to
+                    parse_errors) instead of stopping the thread or task reading the source.
+        :param max_pending: Optional maximum number of records that can wait for the next frame (the oldest records are
+                    dropped beyond this and counted; refer to dropped)
+        :return: None
+        """
+        assert isinstance(name, str) and name not in self._streams
+        assert parser is None or callable(parser)
+        assert max_pending is None or (isinstance(max_pending, int) and max_pending > 0)
+
+        self._streams[name] = {"parser": parser, "pending": collections.deque(maxlen=max_pending),
+                               "dropped": 0, "parse_errors": 0, "subscribers": [], "fifo_sources": [], "async_sources": []}
+
+    def publish(self, name, data):
+        """
+        Publish new data to a stream.  This is safe to call from any thread.
+        :param name: Name of the stream
+        :param data: The raw data (it is parsed by the parser of the stream; data that can't be parsed is skipped)
+        :return: None
+        """
+        stream = self._streams[name]
+        try:
+            record = data if stream["parser"] is None else stream["parser"](data)
+        except Exception:
+            with self._lock:
+                stream["parse_errors"] += 1
+            return
+
+        with self._lock:
+            pending = stream["pending"]
+            if len(pending) == pending.maxlen:
+                # The deque drops the oldest record to make room
+                stream["dropped"] += 1
+            pending.append((time.time(), record))
+
+    def dropped(self, name):
+        """
+        Get how many records of a stream were dropped because max_pending records were already waiting for a frame.
+        :param name: Name of the stream
+        :return: The number of dropped records
+        """
+        return self._streams[name]["dropped"]
+
+    def parse_errors(self, name):
+        """
+        Get how many records of a stream were skipped because the parser of the stream couldn't parse them.
+        :param name: Name of the stream
+        :return: The number of skipped records
+        """
+        return self._streams[name]["parse_errors"]
+
+    def setup_fifo_stream(self, name, fifo_source, parser=None, max_pending=None):
+        """
+        Create a new stream that is fed from a fifo (read in a new thread until the hub is exited).
+        :param name: Name of the stream (must be unique)
+        :param fifo_source: The filepath (relative or absolute) to the fifo
+        :param parser: Refer to add_stream
+        :param max_pending: Refer to add_stream
+        :return: None
+        """
+        assert os.path.exists(fifo_source) and stat.S_ISFIFO(os.stat(fifo_source).st_mode)
+
+        self.add_stream(name, parser, max_pending)
+        self._streams[name]["fifo_sources"].append(fifo_source)
+        threading.Thread(target=read_fifo_source, args=(fifo_source, lambda data: self.publish(name, data),
+                                                        DataHub.FIFO_CLOSING_COMMAND)).start()
+
+    def setup_async_stream(self, name, source, parser=None, max_pending=None):
+        """
+        Create a new stream that is fed from an asyncio.StreamReader or an async iterator (read by a task on the running
+        event loop; if no event loop is running yet, reading starts on the next iteration).
+        :param name: Name of the stream (must be unique)
+        :param source: An asyncio.StreamReader (every line is a record) or an async iterator (every item is a record)
+        :param parser: Refer to add_stream
+        :param max_pending: Refer to add_stream
+        :return: None
+        """
+        assert is_async_source(source)
+
+        self.add_stream(name, parser, max_pending)
+        self._streams[name]["async_sources"].append({"source": source, "task": None})
+        self._start_async_sources()
+
+    def subscribe(self, name, subscriber, new_data_callback, policy=None):
+        """
+        Subscribe to a stream.  Once per frame, new_data_callback is called with the subscriber, the name of the stream,
+        and the record for every new record (that made it through the policy).
+        :param name: Name of the stream
+        :param subscriber: Whatever wants the data (i.e. a Graph or a Chart); passed back into new_data_callback
+        :param new_data_callback: The callback function that will process the records
+        :param policy: Optional DataPolicy for this subscriber only (records are already parsed by the stream, so the
+                    parser of the policy gets parsed records; for the AGGREGATE options it can just pick out the values to
+                    aggregate, i.e. lambda record: record[1])
+        :return: None
+        """
+        assert name in self._streams
+        assert callable(new_data_callback)
+        assert policy is None or isinstance(policy, DataPolicy)
+
+        self._streams[name]["subscribers"].append({"subscriber": subscriber, "callback": new_data_callback,
+                                                   "policy": policy})
+
+    def unsubscribe(self, name, subscriber):
+        """
+        Stop a subscriber from receiving records from a stream.
+        :param name: Name of the stream
+        :param subscriber: The subscriber that was passed into subscribe
+        :return: True if the subscriber was subscribed and False otherwise
+        """
+        subscribers = self._streams[name]["subscribers"]
+        remaining = [s for s in subscribers if s["subscriber"] is not subscriber]
+        self._streams[name]["subscribers"] = remaining
+        return len(remaining) != len(subscribers)
+
+    def iteration(self):
+        """
+        This function gets called every draw iteration (before drawing).  Every stream hands its new records to its
+        subscribers.
+        :return: None
+        """
+        self._start_async_sources()
+
+        for name, stream in list(self._streams.items()):
+            with self._lock:
+                batch = list(stream["pending"])
+                stream["pending"].clear()
+            if len(batch) == 0:
+                continue
+
+            for subscription in stream["subscribers"]:
+                policy = subscription["policy"]
+                if policy is None:
+                    for _, record in batch:
+                        subscription["callback"](subscription["subscriber"], name, record)
+                else:
+                    for timestamp, record in batch:
+                        policy.offer(record, timestamp)
+                    for record in policy.drain():
+                        subscription["callback"](subscription["subscriber"], name, record)
+
+    def exit(self):
+        """
+        Gracefully exit (stop reading from all of the fifos and async sources).
+        :return: None
+        """
+        for stream in self._streams.values():
+            for fifo_source in stream["fifo_sources"]:
+                close_fifo_source(fifo_source, DataHub.FIFO_CLOSING_COMMAND)
+            for async_source in stream["async_sources"]:
+                if async_source["task"] is not None:
+                    async_source["task"].cancel()
+
+    def _start_async_sources(self):
+        """
+        Internal function that starts reading from the async sources that aren't being read yet.
+        :return: None
+        """
+        for name, stream in self._streams.items():
+            for async_source in stream["async_sources"]:
+                if async_source["task"] is None:
+                    async_source["task"] = start_async_source(async_source["source"],
+                                                              lambda data, name=name: self.publish(name, data),
+                                                              DataHub.FIFO_CLOSING_COMMAND)
@@ -0,0 +1,1213 @@
+import array
+import collections
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def float_array(values):
+    """
+    Get a numpy array of floats for some values without copying them if possible (numpy must be installed).  Note that
+    while the returned array is around, an array.array it was taken from cannot grow, so don't hold on to it.
+    :param values: list, array.array, RingBuffer, or numpy array
+    :return: numpy array of floats
+    """
+    if isinstance(values, array.array) and values.typecode == "d":
+        return numpy.frombuffer(values, dtype=numpy.float64)
+    if isinstance(values, RingBuffer):
+        return numpy.frombuffer(values.storage, dtype=numpy.float64)[values.start:values.start + len(values)]
+    return numpy.asarray(values, dtype=numpy.float64)
+
+
+def to_array(values):
+    """
+    Copy some values into an array.array of floats (this is also how a batch of values is validated: anything that isn't
+    a number raises a TypeError).
+    :param values: list, tuple, array.array, memoryview, or numpy array of numbers
+    :return: array.array of floats
+    """
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return array.array("d", numpy.ascontiguousarray(values, dtype=numpy.float64).tobytes())
+    if isinstance(values, memoryview) and values.format == "d" and values.c_contiguous:
+        return array.array("d", values.tobytes())
+    return array.array("d", values)
+
+
+class RingBuffer(object):
+    def __init__(self, capacity, values=()):
+        """
+        A fixed size buffer of floats.  Appending is O(1) and once the buffer is full, appending evicts the oldest value,
+        so the memory used never changes.  Every value is written twice (at i and at i + capacity) so the values, oldest
+        first, are always a contiguous piece of the storage (storage[start:start + len(self)]).
+        :param capacity: Maximum number of values
+        :param values: Initial values (only the last capacity of them are kept)
+        """
+        assert isinstance(capacity, int) and capacity > 0
+
+        self.capacity = capacity
+        self._storage = array.array("d", bytes(2 * capacity * 8))
+        self._start = 0
+        self._length = 0
+
+        for value in values:
+            self.append(value)
+
+    @property
+    def storage(self):
+        """
+        Getter for the underlying array.array (values are at storage[start:start + len(self)]).
+        :return: The storage
+        """
+        return self._storage
+
+    @property
+    def start(self):
+        """
+        Getter for the index of the oldest value in storage.
+        :return: The index
+        """
+        return self._start
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return iter(self._storage[self._start:self._start + self._length])
+
+    def __getitem__(self, i):
+        """
+        Get a value (0 is the oldest value and -1 is the newest value) or a slice of values (as an array.array).
+        :param i: Index or slice
+        :return: The value or values
+        """
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self._length)
+            if step == 1:
+                return self._storage[self._start + start:self._start + max(start, stop)]
+            return self._storage[self._start:self._start + self._length][i]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("RingBuffer index out of range")
+        return self._storage[self._start + i]
+
+    def append(self, value):
+        """
+        Add a value to the end of the buffer.
+        :param value: The value to add
+        :return: The value that got evicted to make space or None if the buffer wasn't full
+        """
+        evicted = None
+        if self._length == self.capacity:
+            evicted = self._storage[self._start]
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._length += 1
+
+        i = (self._start + self._length - 1) % self.capacity
+        self._storage[i] = value
+        self._storage[i + self.capacity] = value
+        return evicted
+
+    def popleft(self):
+        """
+        Remove the oldest value.
+        :return: The value that was removed
+        """
+        if self._length == 0:
+            raise IndexError("pop from an empty RingBuffer")
+
+        value = self._storage[self._start]
+        self._start = (self._start + 1) % self.capacity
+        self._length -= 1
+        return value
+
+
+class Extrema(object):
+    def __init__(self, windowed, values=()):
+        """
+        Keeps track of the minimum and maximum of a sequence of values in O(1) amortized time per value.  If windowed,
+        values can also be removed from the front of the sequence (popleft) which is done with monotonic deques: the
+        deque for the minimum only keeps values that are smaller than every value after them, so its front is always
+        the minimum of the values still in the window (and the same for the maximum).  NaN and infinite values are
+        ignored.
+        :param windowed: Will values be removed with popleft?  If not, only the minimum and maximum are stored.
+        :param values: Initial values
+        """
+        self.windowed = windowed
+        self._min = None
+        self._max = None
+
+        # Monotonic deques of (index, value) and the indices of the oldest value and the next value
+        self._mins = collections.deque()
+        self._maxs = collections.deque()
+        self._first = 0
+        self._next = 0
+
+        self.extend(values)
+
+    @property
+    def min(self):
+        """
+        Getter for the minimum value.
+        :return: The minimum or None if there are no values
+        """
+        if self.windowed:
+            return self._mins[0][1] if len(self._mins) > 0 else None
+        return self._min
+
+    @property
+    def max(self):
+        """
+        Getter for the maximum value.
+        :return: The maximum or None if there are no values
+        """
+        if self.windowed:
+            return self._maxs[0][1] if len(self._maxs) > 0 else None
+        return self._max
+
+    def append(self, value):
+        """
+        Add a value to the end of the sequence.
+        :param value: The value
+        :return: None
+        """
+        i = self._next
+        self._next += 1
+        if not -math.inf < value < math.inf:
+            return
+
+        if not self.windowed:
+            if self._min is None or value < self._min:
+                self._min = value
+            if self._max is None or value > self._max:
+                self._max = value
+            return
+
+        while len(self._mins) > 0 and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((i, value))
+        while len(self._maxs) > 0 and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((i, value))
+
+    def extend(self, values):
+        """
+        Add values to the end of the sequence.
+        :param values: The values
+        :return: None
+        """
+        if self.windowed:
+            for value in values:
+                self.append(value)
+            return
+
+        values = [value for value in values if -math.inf < value < math.inf]
+        if len(values) > 0:
+            self.append(min(values))
+            self.append(max(values))
+
+    def popleft(self):
+        """
+        Remove the oldest value (only if windowed).
+        :return: None
+        """
+        assert self.windowed
+
+        self._first += 1
+        if len(self._mins) > 0 and self._mins[0][0] < self._first:
+            self._mins.popleft()
+        if len(self._maxs) > 0 and self._maxs[0][0] < self._first:
+            self._maxs.popleft()
+
+
+class Dataset(object):
+    def __init__(self, xs, ys, color, capacity=None, time_window=None):
+        """
+        A dataset of a Graph.  The data is double buffered: the drawing thread only reads the front buffer (the snapshot)
+        while new data from any thread is queued up.  Once per frame, the drawing thread calls publish which applies the
+        queued data to the back buffer and then swaps the two buffers.  This way drawing never waits on ingestion,
+        ingestion never waits on drawing, and since x and y values are queued together a snapshot never has an x
+        without its y.  Note that the two buffers mean that the data is stored twice.  The values are stored in
+        contiguous arrays of floats (array.array) so they take up little memory and can be handed to numpy without
+        copying.  With a capacity, the values are kept in RingBuffers instead so that the dataset never grows: appending
+        stays O(1) and the oldest data points are evicted automatically.  The queue is bounded by the capacity too (the
+        data points beyond it would be evicted at the next publish anyways), so a dataset that isn't drawn for a while
+        (i.e. on a page that isn't shown) doesn't grow either.
+        :param xs: List of x data values
+        :param ys: List of y data values
+        :param color: Color of the dataset
+        :param capacity: Optional maximum number of data points to keep (the oldest ones are evicted)
+        :param time_window: Optional; only keep data points with an x value within time_window of the newest x value
+                    (x values must be increasing).  Needs a capacity since the memory used is fixed.
+        """
+        assert capacity is None or (isinstance(capacity, int) and capacity > 0)
+        assert time_window is None or (capacity is not None and (isinstance(time_window, int) or isinstance(time_window, float)) and time_window > 0)
+
+        self.color = color
+        self.capacity = capacity
+        self.time_window = time_window
+
+        self._buffers = [self._new_buffer(xs, ys), self._new_buffer(xs, ys)]
+        self._front = 0
+
+        # Every queued item has at least one data point so the last capacity items have the last capacity data points
+        self._pending = collections.deque(maxlen=capacity)
+        self._last_batch = []
+
+        # Extrema of every buffer (only kept track of once someone asks for them; refer to extrema)
+        self._track_extrema = False
+
+        # Optional multi-resolution summary of the current snapshot (refer to set_pyramid)
+        self.pyramid = None
+
+        # Increases every time new data is published (useful for knowing when cached things are out of date)
+        self.version = 0
+
+    @property
+    def xs(self):
+        """
+        Getter for the x values of the current snapshot.  Don't modify these; they are only valid until the next publish.
+        :return: The x values
+        """
+        return self._buffers[self._front]["xs"]
+
+    @property
+    def ys(self):
+        """
+        Getter for the y values of the current snapshot.  Don't modify these; they are only valid until the next publish.
+        :return: The y values
+        """
+        return self._buffers[self._front]["ys"]
+
+    def __getitem__(self, key):
+        """
+        Allows the dataset to still be used like the dictionaries that used to be stored in Graph.datasets (i.e.
+        dataset["xs"], dataset["ys"], and dataset["color"])
+        :param key: "xs", "ys", or "color"
+        :return: The value of the key for the current snapshot
+        """
+        if key == "color":
+            return self.color
+        return self._buffers[self._front][key]
+
+    def __len__(self):
+        """
+        :return: Number of data points in the current snapshot
+        """
+        return len(self.xs)
+
+    def extrema(self):
+        """
+        Get the smallest and largest x and y values of the current snapshot.  The first call starts keeping track of
+        them for every data point that is added (in O(1) amortized time, even when data points are evicted), so this
+        doesn't need to look at all of the data.  This must only be called from the drawing thread.
+        :return: Tuple of x_min, x_max, y_min, y_max (any of them are None if there are no finite values)
+        """
+        if not self._track_extrema:
+            self._track_extrema = True
+            windowed = self.capacity is not None
+            for buffer in self._buffers:
+                buffer["extrema"] = (Extrema(windowed, buffer["xs"]), Extrema(windowed, buffer["ys"]))
+
+        x_extrema, y_extrema = self._buffers[self._front]["extrema"]
+        return x_extrema.min, x_extrema.max, y_extrema.min, y_extrema.max
+
+    def set_pyramid(self, pyramid):
+        """
+        Keep a Decimation.MinMaxPyramid up to date with the current snapshot (it is updated with the new data points at
+        every publish).  Only for datasets without a capacity since data points can't be removed from a pyramid.  This
+        must only be called from the drawing thread.
+        :param pyramid: The pyramid (or None to stop keeping one)
+        :return: None
+        """
+        assert pyramid is None or self.capacity is None
+
+        self.pyramid = pyramid
+        if pyramid is not None:
+            pyramid.update(self.xs, self.ys)
+
+    def append(self, x, y):
+        """
+        Queue a new data point.  This is safe to call from any thread; the data point becomes part of the snapshot at
+        the next publish.
+        :param x: The x value
+        :param y: The y value
+        :return: None
+        """
+        self._pending.append((float(x), float(y)))
+
+    def extend(self, xs, ys):
+        """
+        Queue a lot of data points at once.  They are queued as one item (so this is a lot cheaper than calling append
+        for every data point) and become part of the snapshot together at the next publish.
+        :param xs: array.array of x values (refer to to_array)
+        :param ys: array.array of y values (same length as xs)
+        :return: None
+        """
+        if len(xs) == 0:
+            return
+        if self.capacity is not None and len(xs) > self.capacity:
+            xs, ys = xs[-self.capacity:], ys[-self.capacity:]
+        self._pending.append((xs, ys))
+
+    def publish(self):
+        """
+        Apply the queued data to the back buffer and swap it in as the new snapshot.  This must only be called from the
+        drawing thread (Graph calls this once per frame before drawing).
+        :return: True if there was new data and False otherwise
+        """
+        # Only take what is queued right now; anything arriving after this waits for the next frame
+        batch = [self._pending.popleft() for _ in range(len(self._pending))]
+        if len(batch) == 0 and len(self._last_batch) == 0:
+            return False
+
+        # The back buffer is still missing the batch that was applied to the current front buffer
+        back = self._buffers[1 - self._front]
+        self._apply(back, self._last_batch)
+        self._apply(back, batch)
+
+        self._front = 1 - self._front
+        self._last_batch = batch
+
+        if len(batch) == 0:
+            return False
+        if self.pyramid is not None:
+            self.pyramid.update(self.xs, self.ys)
+        self.version += 1
+        return True
+
+    def _new_buffer(self, xs, ys):
+        """
+        Internal function that creates a buffer holding the initial data.
+        :param xs: List of x data values
+        :param ys: List of y data values
+        :return: The buffer (a dictionary)
+        """
+        if self.capacity is None:
+            return {"xs": array.array("d", xs), "ys": array.array("d", ys)}
+
+        buffer = {"xs": RingBuffer(self.capacity), "ys": RingBuffer(self.capacity)}
+        self._apply(buffer, [(array.array("d", xs), array.array("d", ys))])
+        return buffer
+
+    def _apply(self, buffer, batch):
+        """
+        Internal function that adds a batch of queued data points to a buffer.
+        :param buffer: The buffer to add to
+        :param batch: List of queued (x, y) tuples and (xs, ys) tuples of arrays (from extend)
+        :return: None
+        """
+        extrema = buffer.get("extrema")
+        batch_xs, batch_ys = Dataset._flatten(batch)
+        if self.capacity is None:
+            buffer["xs"].extend(batch_xs)
+            buffer["ys"].extend(batch_ys)
+            if extrema is not None:
+                extrema[0].extend(batch_xs)
+                extrema[1].extend(batch_ys)
+            return
+
+        # Anything before the last capacity data points would be evicted right away anyways
+        xs, ys = buffer["xs"], buffer["ys"]
+        for x, y in zip(batch_xs[-self.capacity:], batch_ys[-self.capacity:]):
+            evicted = xs.append(x)
+            ys.append(y)
+            if extrema is not None:
+                extrema[0].append(x)
+                extrema[1].append(y)
+                if evicted is not None:
+                    extrema[0].popleft()
+                    extrema[1].popleft()
+
+        if self.time_window is not None:
+            while len(xs) > 0 and xs[0] < xs[-1] - self.time_window:
+                xs.popleft()
+                ys.popleft()
+                if extrema is not None:
+                    extrema[0].popleft()
+                    extrema[1].popleft()
+
+    @staticmethod
+    def _flatten(batch):
+        """
+        Internal function that puts the queued data points and arrays of data points of a batch into two array.arrays.
+        :param batch: List of queued (x, y) tuples and (xs, ys) tuples of arrays (from extend)
+        :return: Tuple of array.array of the x values and array.array of the y values
+        """
+        xs = array.array("d")
+        ys = array.array("d")
+        for item in batch:
+            if isinstance(item[0], float):
+                xs.append(item[0])
+                ys.append(item[1])
+            else:
+                xs.extend(item[0])
+                ys.extend(item[1])
+        return xs, ys
+
+
+class FunctionDataset(object):
+    def __init__(self, func, color, vectorized=None, max_depth=4):
+        """
+        A dataset of a Line graph that is a function instead of stored data points.  The function is only evaluated when
+        the graph is drawn, over the x range that is shown, at about one x value per pixel column, plus more x values
+        where the curve bends sharply (up to max_depth halvings of the spacing).  The x values are on a grid whose
+        spacing is a power of 2 and every value of the function is remembered, so panning only evaluates the function
+        at the new x values and zooming in or out by a factor of 2 reuses what was already evaluated.  The function
+        is called once with a numpy array of all of the new x values if it supports that (vectorized=None tries it
+        out) and once per x value otherwise; x values where it fails (i.e. division by 0) aren't drawn.
+        :param func: Function that takes in a single x value and returns the corresponding y value
+        :param color: Color of the dataset
+        :param vectorized: Does func take in numpy arrays? (None to try it out; needs numpy either way)
+        :param max_depth: Maximum number of times the spacing is halved where the curve bends sharply
+        """
+        assert callable(func)
+        assert isinstance(max_depth, int) and max_depth >= 0
+
+        self.func = func
+        self.color = color
+        self.max_depth = max_depth
+        self._vectorized = vectorized if numpy is not None else False
+
+        self._values = {}
+        self._key = None
+        self._xs = []
+        self._ys = []
+
+        # Only changes when the x values that are drawn change
+        self.version = 0
+
+    @property
+    def xs(self):
+        """
+        Getter for the x values from the last time the function was sampled.
+        :return: The x values
+        """
+        return self._xs
+
+    @property
+    def ys(self):
+        """
+        Getter for the y values from the last time the function was sampled.
+        :return: The y values
+        """
+        return self._ys
+
+    def __getitem__(self, key):
+        """
+        Refer to Dataset.__getitem__.
+        :param key: "xs", "ys", or "color"
+        :return: The value of the key
+        """
+        return {"xs": self._xs, "ys": self._ys, "color": self.color}[key]
+
+    def __len__(self):
+        return len(self._xs)
+
+    def publish(self):
+        """
+        Nothing to publish; the function is sampled when the graph is drawn (refer to sample).
+        :return: False
+        """
+        return False
+
+    def extrema(self):
+        """
+        Get the range of the y values from the last time the function was sampled (a function has no x range).
+        :return: Tuple of None, None, y_min, y_max
+        """
+        finite = [y for y in self._ys if -math.inf < y < math.inf]
+        if len(finite) == 0:
+            return None, None, None, None
+        return None, None, min(finite), max(finite)
+
+    def sample(self, x_min, x_max, num_columns, y_min, y_max, num_rows):
+        """
+        Sample the function for a plot (only done again if the bounds or the size of the plot changed).
+        :param x_min: x value at the left edge of the plot
+        :param x_max: x value at the right edge of the plot
+        :param num_columns: Width of the plot in pixels
+        :param y_min: y value at the bottom of the plot
+        :param y_max: y value at the top of the plot
+        :param num_rows: Height of the plot in pixels (how sharp a bend is, is measured in pixels)
+        :return: Tuple of the x values and the y values
+        """
+        key = (x_min, x_max, num_columns, y_min, y_max, num_rows)
+        if key == self._key:
+            return self._xs, self._ys
+
+        # The spacing is a power of 2 so the grids of different zoom levels share x values (and they are exact)
+        step = 2.0 ** math.floor(math.log2((x_max - x_min) / float(max(num_columns, 1))))
+        xs = [k * step for k in range(int(math.floor(x_min / step)), int(math.ceil(x_max / step)) + 1)]
+        ys = self._evaluate(xs)
+
+        pixels_per_y = num_rows / float(y_max - y_min)
+        for _ in range(self.max_depth):
+            xs, ys, refined = self._refine(xs, ys, pixels_per_y)
+            if not refined:
+                break
+
+        # Forget about values that are far away from what is shown now (before the separators below are put in, since
+        # they aren't values of the function)
+        if len(self._values) > 8 * len(xs):
+            self._values = dict(zip(xs, ys))
+
+        # A segment that still jumps from above the plot to below it (or the other way around) after being refined as
+        # much as possible is a discontinuity (i.e. tan at pi / 2) so it isn't drawn
+        min_spacing = step / 2 ** self.max_depth
+        for i in range(len(xs) - 2, -1, -1):
+            if xs[i + 1] - xs[i] <= min_spacing and \
+                    ((ys[i] > y_max and ys[i + 1] < y_min) or (ys[i] < y_min and ys[i + 1] > y_max)):
+                xs.insert(i + 1, (xs[i] + xs[i + 1]) / 2)
+                ys.insert(i + 1, math.nan)
+
+        self._key = key
+        self._xs = xs
+        self._ys = ys
+        self.version += 1
+        return xs, ys
+
+    def _refine(self, xs, ys, pixels_per_y):
+        """
+        Internal function that adds the midpoint of every segment next to a sharp bend (a point more than half a pixel
+        away from the line between its neighbours) or going to or from a value the function couldn't give, if the
+        midpoint is more than half a pixel away from the segment.
+        :param xs: The x values so far
+        :param ys: The y values so far
+        :param pixels_per_y: How many pixels one y unit is
+        :return: Tuple of the new x values, the new y values, and whether anything was added
+        """
+        def off_line(x0, y0, x1, y1, x, y):
+            return abs(y - (y0 + (y1 - y0) * (x - x0) / (x1 - x0))) * pixels_per_y > 0.5
+
+        bent = [False] * len(xs)
+        for i in range(1, len(xs) - 1):
+            bent[i] = off_line(xs[i - 1], ys[i - 1], xs[i + 1], ys[i + 1], xs[i], ys[i])
+
+        segments = []
+        for i in range(len(xs) - 1):
+            broken = (-math.inf < ys[i] < math.inf) != (-math.inf < ys[i + 1] < math.inf)
+            if bent[i] or bent[i + 1] or broken:
+                segments.append(i)
+        if len(segments) == 0:
+            return xs, ys, False
+
+        mids = [(xs[i] + xs[i + 1]) / 2 for i in segments]
+        mid_ys = self._evaluate(mids)
+
+        added = {}
+        for i, x, y in zip(segments, mids, mid_ys):
+            finite = -math.inf < y < math.inf
+            if (-math.inf < ys[i] < math.inf) != finite or (-math.inf < ys[i + 1] < math.inf) != finite or \
+                    (finite and off_line(xs[i], ys[i], xs[i + 1], ys[i + 1], x, y)):
+                added[i] = (x, y)
+        if len(added) == 0:
+            return xs, ys, False
+
+        new_xs, new_ys = [], []
+        for i in range(len(xs)):
+            new_xs.append(xs[i])
+            new_ys.append(ys[i])
+            if i in added:
+                new_xs.append(added[i][0])
+                new_ys.append(added[i][1])
+        return new_xs, new_ys, True
+
+    def _evaluate(self, xs):
+        """
+        Internal function that gets the value of the function at some x values (only calling it for the x values it
+        hasn't been called for yet).
+        :param xs: List of x values
+        :return: List of y values (NaN where the function failed)
+        """
+        missing = [x for x in xs if x not in self._values]
+        if len(missing) > 0:
+            ys = None
+            if self._vectorized is not False:
+                try:
+                    with numpy.errstate(all="ignore"):
+                        ys = numpy.asarray(self.func(numpy.array(missing)), dtype=numpy.float64)
+                    if ys.shape != (len(missing),):
+                        ys = None
+                except Exception:
+                    ys = None
+
+                # Once the function fails with an array, it is only called with single x values
+                self._vectorized = ys is not None
+                ys = None if ys is None else ys.tolist()
+
+            if ys is None:
+                ys = [self._evaluate_one(x) for x in missing]
+            self._values.update(zip(missing, ys))
+
+        return [self._values[x] for x in xs]
+
+    def _evaluate_one(self, x):
+        """
+        Internal function that calls the function for a single x value.
+        :param x: The x value
+        :return: The y value (NaN if the function failed)
+        """
+        try:
+            return float(self.func(x))
+        except (ArithmeticError, ValueError, TypeError):
+            return math.nan
+
+
+class BarDataset(Dataset):
+    def __init__(self, ys, color):
+        """
+        A dataset of a Bar graph.  Same as Dataset except there is one y value per column and queued values replace the
+        y value of their column instead of adding a data point.  After every publish, changed_columns holds the columns
+        whose value changed so only those bars need to be drawn again.
+        :param ys: List of y values (one per column)
+        :param color: Color of the dataset
+        """
+        super(BarDataset, self).__init__([x + 0.5 for x in range(len(ys))], ys, color)
+
+        self.changed_columns = set()
+
+    def append(self, x, y):
+        raise NotImplementedError("Data points can't be added to a bar dataset; set the value of a column instead")
+
+    def extend(self, xs, ys):
+        raise NotImplementedError("Data points can't be added to a bar dataset; set the value of a column instead")
+
+    def set_value(self, column, value):
+        """
+        Queue a new value for a column.  This is safe to call from any thread; the value becomes part of the snapshot at
+        the next publish.
+        :param column: Index of the column
+        :param value: The new y value
+        :return: None
+        """
+        self._pending.append((column, float(value)))
+
+    def set_values(self, values):
+        """
+        Queue new values for a lot of columns at once.
+        :param values: List with a value for every column or dictionary of column to value
+        :return: None
+        """
+        items = values.items() if isinstance(values, dict) else enumerate(values)
+        self._pending.extend([(column, float(value)) for column, value in items])
+
+    def publish(self):
+        """
+        Refer to Dataset.publish.  This also updates changed_columns.
+        :return: True if there was new data and False otherwise
+        """
+        published = super(BarDataset, self).publish()
+
+        self.changed_columns.clear()
+        if published:
+            self.changed_columns.update([column for column, _ in self._last_batch])
+        return published
+
+    def extrema(self):
+        """
+        Get the range of the values of the current snapshot (values get replaced so this just looks at all columns).
+        :return: Tuple of None, None, the smallest value, and the largest value
+        """
+        if len(self.ys) == 0:
+            return None, None, None, None
+        return None, None, min(self.ys), max(self.ys)
+
+    def _apply(self, buffer, batch):
+        """
+        Internal function that sets the values of a batch of queued (column, value) tuples in a buffer.
+        :param buffer: The buffer to apply the values to
+        :param batch: List of queued (column, value) tuples
+        :return: None
+        """
+        ys = buffer["ys"]
+        for column, value in batch:
+            ys[column] = value
+
+
+class HistogramDataset(Dataset):
+    def __init__(self, xs, num_bins, bin_counts, color, capacity=None):
+        """
+        A dataset of a Histogram.  Same as Dataset except only x values are queued and the y values of a snapshot are
+        the number of x values in each bin.  With a capacity, evicted x values are subtracted from their bins.
+        :param xs: List of x data values
+        :param num_bins: Number of bins
+        :param bin_counts: Function that takes in an array.array of x values and returns a list with the number of them
+                    in each bin (so that a whole batch can be binned at once)
+        :param color: Color of the dataset
+        :param capacity: Optional maximum number of x values to keep (the oldest ones are evicted)
+        """
+        self._num_bins = num_bins
+        self._bin_counts = bin_counts
+
+        super(HistogramDataset, self).__init__(xs, None, color, capacity)
+
+    def append(self, x, y=None):
+        """
+        Queue a new x value (refer to Dataset.append).
+        :param x: The x value
+        :param y: Not used!
+        :return: None
+        """
+        self._pending.append(float(x))
+
+    def extend(self, xs, ys=None):
+        """
+        Queue a lot of x values at once.  They are queued as one item (so this is a lot cheaper than calling append for
+        every x value) and are binned together at the next publish.
+        :param xs: array.array of x values (refer to to_array)
+        :param ys: Not used!
+        :return: None
+        """
+        if len(xs) == 0:
+            return
+        if self.capacity is not None and len(xs) > self.capacity:
+            xs = xs[-self.capacity:]
+        self._pending.append(xs)
+
+    def rebin(self, num_bins):
+        """
+        Count the x values again after the bins changed (bin_counts must already use the new bins).  This must only be
+        called from the drawing thread.
+        :param num_bins: The new number of bins
+        :return: None
+        """
+        self._num_bins = num_bins
+        for buffer in self._buffers:
+            buffer["ys"] = self._bin_counts(buffer["xs"][:])
+
+    def extrema(self):
+        """
+        Get the range of the bin counts of the current snapshot (the bars start at 0 so that is the minimum).
+        :return: Tuple of None, None, 0, and the largest bin count
+        """
+        return None, None, 0, max(self.ys) if len(self.ys) > 0 else None
+
+    def _new_buffer(self, xs, ys):
+        """
+        Internal function that creates a buffer holding the initial data and the bin counts of the data.
+        :param xs: List of x data values
+        :param ys: Not used!
+        :return: The buffer (a dictionary)
+        """
+        xs_buffer = array.array("d") if self.capacity is None else RingBuffer(self.capacity)
+        buffer = {"xs": xs_buffer, "ys": [0] * self._num_bins}
+        self._apply(buffer, [array.array("d", xs)])
+        return buffer
+
+    def _apply(self, buffer, batch):
+        """
+        Internal function that adds a batch of queued x values to a buffer and counts them in their bins.
+        :param buffer: The buffer to add to
+        :param batch: List of queued x values and arrays of x values (from extend)
+        :return: None
+        """
+        values = HistogramDataset._flatten(batch)
+
+        counts = buffer["ys"]
+        if self.capacity is None:
+            buffer["xs"].extend(values)
+        else:
+            # Anything before the last capacity x values would be evicted right away anyways
+            values = values[-self.capacity:]
+            evicted = array.array("d")
+            for x in values:
+                x = buffer["xs"].append(x)
+                if x is not None:
+                    evicted.append(x)
+
+            if len(evicted) > 0:
+                for i, count in enumerate(self._bin_counts(evicted)):
+                    counts[i] -= count
+
+        for i, count in enumerate(self._bin_counts(values)):
+            counts[i] += count
+
+    @staticmethod
+    def _flatten(batch):
+        """
+        Internal function that puts the queued x values and arrays of x values of a batch into one array.array.
+        :param batch: List of queued x values and arrays of x values (from extend)
+        :return: array.array of the x values
+        """
+        values = array.array("d")
+        for item in batch:
+            if isinstance(item, float):
+                values.append(item)
+            else:
+                values.extend(item)
+        return values
+
+
+class QuantileSketch(object):
+    # Values closer to 0 than this are counted as 0
+    ZERO_THRESHOLD = 1e-12
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        """
+        A DDSketch: a summary of a stream of values that can answer quantile queries (i.e. the 99th percentile) with a
+        relative error of at most relative_accuracy while using constant memory however many values are added.  Every
+        value v is counted in the bucket ceil(log(|v|) / log(gamma)) with gamma = (1 + a) / (1 - a), so every bucket
+        covers values within a relative accuracy of a of each other.  Positive and negative values have their own
+        buckets and values closer to 0 than ZERO_THRESHOLD are counted as 0.  If either side needs more than
+        max_buckets buckets, the buckets of the values closest to 0 are merged (so the high quantiles stay accurate).
+        Sketches with the same relative_accuracy can be merged.
+        :param relative_accuracy: Maximum relative error of a quantile (must be > 0 and < 1)
+        :param max_buckets: Maximum number of buckets for each of the positive and negative values
+        """
+        assert 0 < relative_accuracy < 1
+        assert isinstance(max_buckets, int) and max_buckets > 0
+
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._multiplier = 1 / math.log(self._gamma)
+
+        self._positive = {}
+        self._negative = {}
+        self._zero = 0
+
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value, count=1):
+        """
+        Add a value (NaN and infinite values are ignored).
+        :param value: The value
+        :param count: How many times to add the value
+        :return: None
+        """
+        if not -math.inf < value < math.inf:
+            return
+
+        self.count += count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if value > QuantileSketch.ZERO_THRESHOLD:
+            store = self._positive
+        elif value < -QuantileSketch.ZERO_THRESHOLD:
+            store = self._negative
+        else:
+            self._zero += count
+            return
+
+        i = int(math.ceil(math.log(abs(value)) * self._multiplier))
+        store[i] = store.get(i, 0) + count
+        if len(store) > self.max_buckets:
+            self._collapse(store)
+
+    def extend(self, values):
+        """
+        Add a lot of values (with numpy, the buckets of all of them are found in one vectorized pass).
+        :param values: List, array.array, or numpy array of values
+        :return: None
+        """
+        if numpy is None:
+            for value in values:
+                self.add(value)
+            return
+
+        values = numpy.asarray(values, dtype=numpy.float64)
+        values = values[numpy.isfinite(values)]
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+        positive = values[values > QuantileSketch.ZERO_THRESHOLD]
+        negative = -values[values < -QuantileSketch.ZERO_THRESHOLD]
+        self._zero += len(values) - len(positive) - len(negative)
+        for store, side in ((self._positive, positive), (self._negative, negative)):
+            if len(side) == 0:
+                continue
+            indices, counts = numpy.unique(numpy.ceil(numpy.log(side) * self._multiplier).astype(numpy.int64),
+                                           return_counts=True)
+            for i, count in zip(indices.tolist(), counts.tolist()):
+                store[i] = store.get(i, 0) + count
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+
+    def merge(self, other):
+        """
+        Add all of the values of another sketch to this sketch.
+        :param other: A QuantileSketch with the same relative_accuracy
+        :return: None
+        """
+        assert isinstance(other, QuantileSketch) and other.relative_accuracy == self.relative_accuracy
+
+        for store, other_store in ((self._positive, other._positive), (self._negative, other._negative)):
+            for i, count in other_store.items():
+                store[i] = store.get(i, 0) + count
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+
+        self._zero += other._zero
+        self.count += other.count
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def buckets(self):
+        """
+        Get every bucket as a value representing it and the number of values in it.
+        :return: Tuple of a list of representative values (increasing) and a list of counts
+        """
+        values = [-self._value(i) for i in sorted(self._negative, reverse=True)]
+        counts = [self._negative[i] for i in sorted(self._negative, reverse=True)]
+        if self._zero > 0:
+            values.append(0.0)
+            counts.append(self._zero)
+        for i in sorted(self._positive):
+            values.append(self._value(i))
+            counts.append(self._positive[i])
+        return values, counts
+
+    def quantiles(self, qs):
+        """
+        Get some quantiles.
+        :param qs: List of quantiles (between 0 and 1)
+        :return: List of the values at those quantiles (None if there are no values)
+        """
+        assert all([0 <= q <= 1 for q in qs])
+
+        if self.count == 0:
+            return [None] * len(qs)
+
+        values, counts = self.buckets()
+        results = [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda j: qs[j])
+        seen = 0
+        bucket = -1
+        for j in order:
+            rank = qs[j] * (self.count - 1)
+            while seen <= rank and bucket < len(values) - 1:
+                bucket += 1
+                seen += counts[bucket]
+            results[j] = min(max(values[bucket], self.min), self.max)
+        return results
+
+    def quantile(self, q):
+        """
+        Get a quantile.
+        :param q: The quantile (between 0 and 1; i.e. 0.99 for the 99th percentile)
+        :return: The value at that quantile (None if there are no values)
+        """
+        return self.quantiles([q])[0]
+
+    def _value(self, i):
+        """
+        Internal function for the value representing a bucket (every value in the bucket is within relative_accuracy
+        of it).
+        :param i: Index of the bucket
+        :return: The value
+        """
+        return 2 * self._gamma ** i / (self._gamma + 1)
+
+    def _collapse(self, store):
+        """
+        Internal function that merges the buckets closest to 0 until there are only max_buckets left.
+        :param store: The buckets (positive or negative)
+        :return: None
+        """
+        indices = sorted(store)
+        extra = len(indices) - self.max_buckets
+        store[indices[extra]] += sum([store.pop(i) for i in indices[:extra]])
+
+
+class SketchDataset(HistogramDataset):
+    def __init__(self, num_bins, bin_counts, color, relative_accuracy=0.01, max_buckets=2048,
+                 percentiles=(50, 95, 99)):
+        """
+        A streaming dataset of a Histogram.  Same as HistogramDataset except the x values aren't kept; they are added to
+        a QuantileSketch so the memory used stays the same however many x values arrive.  The bin counts are worked out
+        from the buckets of the sketch (so the histogram can be binned again at any time) and the percentiles are
+        updated with every publish.
+        :param num_bins: Number of bins
+        :param bin_counts: Function that takes in an array.array of x values (and a list of weights) and returns a list
+                    with the total weight in each bin
+        :param color: Color of the dataset
+        :param relative_accuracy: Refer to QuantileSketch
+        :param max_buckets: Refer to QuantileSketch
+        :param percentiles: Percentiles to keep track of (i.e. for markers on the histogram)
+        """
+        assert all([0 <= p <= 100 for p in percentiles])
+
+        self._relative_accuracy = relative_accuracy
+        self._max_buckets = max_buckets
+        self.percentiles = tuple(percentiles)
+
+        super(SketchDataset, self).__init__([], num_bins, bin_counts, color)
+
+    def __len__(self):
+        """
+        :return: Number of x values added to the sketch of the current snapshot
+        """
+        return self._buffers[self._front]["sketch"].count
+
+    @property
+    def sketch(self):
+        """
+        Getter for the QuantileSketch of the current snapshot.  Don't modify it; it is only valid until the next publish.
+        :return: The sketch
+        """
+        return self._buffers[self._front]["sketch"]
+
+    def percentile_values(self):
+        """
+        Get the values at the percentiles of the current snapshot.
+        :return: Dictionary of percentile to value (None if there are no values)
+        """
+        return self._buffers[self._front]["percentiles"]
+
+    def rebin(self, num_bins):
+        """
+        Refer to HistogramDataset.rebin.
+        :param num_bins: The new number of bins
+        :return: None
+        """
+        self._num_bins = num_bins
+        for buffer in self._buffers:
+            self._count_bins(buffer)
+
+    def _new_buffer(self, xs, ys):
+        """
+        Internal function that creates an empty buffer.
+        :param xs: Not used!
+        :param ys: Not used!
+        :return: The buffer (a dictionary)
+        """
+        return {"xs": array.array("d"), "ys": [0] * self._num_bins, "percentiles": {p: None for p in self.percentiles},
+                "sketch": QuantileSketch(self._relative_accuracy, self._max_buckets)}
+
+    def _apply(self, buffer, batch):
+        """
+        Internal function that adds a batch of queued x values to the sketch of a buffer.
+        :param buffer: The buffer to add to
+        :param batch: List of queued x values and arrays of x values (from extend)
+        :return: None
+        """
+        values = HistogramDataset._flatten(batch)
+        if len(values) == 0:
+            return
+
+        buffer["sketch"].extend(values)
+        self._count_bins(buffer)
+
+    def _count_bins(self, buffer):
+        """
+        Internal function that works out the bin counts and the percentiles of a buffer from its sketch.
+        :param buffer: The buffer
+        :return: None
+        """
+        values, counts = buffer["sketch"].buckets()
+        buffer["ys"] = self._bin_counts(array.array("d", values), counts)
+        quantiles = buffer["sketch"].quantiles([p / 100.0 for p in self.percentiles])
+        buffer["percentiles"] = dict(zip(self.percentiles, quantiles))
+
+
+class HeatmapDataset(object):
+    def __init__(self, num_rows, num_columns):
+        """
+        The grid of values of a Heatmap.  The grid is kept as a ring of num_columns columns of num_rows values each, so
+        adding a column overwrites the oldest one instead of moving all of the values.  Columns (or a whole grid) can be
+        queued from any thread and are applied once per frame by publish, which also keeps track of what needs to be
+        drawn again: only the new columns or everything.
+        :param num_rows: Number of values in a column
+        :param num_columns: Number of columns
+        """
+        assert isinstance(num_rows, int) and num_rows > 0
+        assert isinstance(num_columns, int) and num_columns > 0
+
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+
+        # Column i is at values[i * num_rows:(i + 1) * num_rows] and start is the index of the oldest column
+        self._values = array.array("d", [math.nan]) * (num_rows * num_columns)
+        self._start = 0
+
+        self._pending = collections.deque()
+
+        # Number of columns added by the last publish (num_columns if everything changed)
+        self.new_columns = num_columns
+
+        # Increases every time new data is published
+        self.version = 0
+
+    def set_grid(self, columns):
+        """
+        Queue a whole new grid.  This is safe to call from any thread.
+        :param columns: array.array of num_columns * num_rows values, one column after another (oldest first)
+        :return: None
+        """
+        assert len(columns) == self.num_rows * self.num_columns
+
+        self._pending.append((True, columns))
+
+    def add_columns(self, columns):
+        """
+        Queue new columns; they replace the oldest columns.  This is safe to call from any thread.
+        :param columns: array.array of a multiple of num_rows values, one column after another (oldest first)
+        :return: None
+        """
+        assert len(columns) % self.num_rows == 0
+
+        self._pending.append((False, columns))
+
+    def publish(self):
+        """
+        Apply the queued grids and columns.  This must only be called from the drawing thread.
+        :return: True if there was new data and False otherwise
+        """
+        batch = [self._pending.popleft() for _ in range(len(self._pending))]
+        if len(batch) == 0:
+            self.new_columns = 0
+            return False
+
+        rows = self.num_rows
+        new_columns = 0
+        for whole_grid, values in batch:
+            if whole_grid:
+                self._values[:] = values
+                self._start = 0
+                new_columns = self.num_columns
+                continue
+
+            # Anything before the last num_columns columns would be overwritten right away anyways
+            count = len(values) // rows
+            skip = max(count - self.num_columns, 0)
+            for i in range(skip, count):
+                slot = self._start * rows
+                self._values[slot:slot + rows] = values[i * rows:(i + 1) * rows]
+                self._start = (self._start + 1) % self.num_columns
+            new_columns += count - skip
+
+        self.new_columns = min(new_columns, self.num_columns)
+        self.version += 1
+        return True
+
+    def columns(self, first, last):
+        """
+        Get columns (0 is the oldest column and num_columns - 1 is the newest).  This must only be called from the
+        drawing thread.
+        :param first: Index of the first column
+        :param last: Index after the last column
+        :return: array.array of the values of the columns, one column after another
+        """
+        rows = self.num_rows
+        start = (self._start + first) % self.num_columns
+        stop = start + last - first
+        if stop <= self.num_columns:
+            return self._values[start * rows:stop * rows]
+        return self._values[start * rows:] + self._values[:(stop - self.num_columns) * rows]
@@ -0,0 +1,444 @@
+import array
+import bisect
+import math
+import mmap
+import os
+import struct
+
+from pydisplay import Datasets
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def visible_range(xs, x_min, x_max):
+    """
+    Find the part of a dataset that is between x_min and x_max, plus one data point on each side so that lines leaving
+    the plot area are still drawn.  The x values must be increasing.
+    :param xs: The x values (list, array.array, RingBuffer, or numpy array)
+    :param x_min: Minimum x value
+    :param x_max: Maximum x value
+    :return: Tuple of start and stop indices
+    """
+    if numpy is not None:
+        xs = Datasets.float_array(xs)
+        start = int(numpy.searchsorted(xs, x_min, side="left"))
+        stop = int(numpy.searchsorted(xs, x_max, side="right"))
+    else:
+        start = bisect.bisect_left(xs, x_min)
+        stop = bisect.bisect_right(xs, x_max)
+    return max(start - 1, 0), min(stop + 1, len(xs))
+
+
+def min_max(xs, ys, x_min, x_max, num_columns):
+    """
+    Reduce a dataset to what can actually be seen on a plot that is num_columns pixels wide.  Every run of consecutive
+    data points that fall into the same pixel column is replaced by its first point, its minimum, its maximum, and its
+    last point, so a line drawn through the result lights up the same pixels as a line drawn through all of the data.
+    Data points left or right of the plot are grouped into one column on each side, of which only the data point next
+    to the plot is kept (that's all a line into the plot needs).
+    :param xs: The x values (list, array.array, RingBuffer, or numpy array)
+    :param ys: The y values (list, array.array, RingBuffer, or numpy array)
+    :param x_min: x value at the left edge of the plot
+    :param x_max: x value at the right edge of the plot
+    :param num_columns: Width of the plot in pixels
+    :return: Tuple of the reduced x values and y values (at most 4 per column)
+    """
+    scale = num_columns / float(x_max - x_min)
+
+    if numpy is not None:
+        xs = Datasets.float_array(xs)
+        ys = Datasets.float_array(ys)
+        if len(xs) == 0:
+            return xs.copy(), ys.copy()
+
+        columns = numpy.floor((xs - x_min) * scale)
+        numpy.clip(columns, -1, num_columns, out=columns)
+        starts = numpy.flatnonzero(numpy.concatenate(([True], columns[1:] != columns[:-1])))
+        ends = numpy.concatenate((starts[1:], [len(xs)])) - 1
+
+        reduced_xs = numpy.empty(4 * len(starts))
+        reduced_ys = numpy.empty(4 * len(starts))
+        reduced_xs[0::4] = xs[starts]
+        reduced_ys[0::4] = ys[starts]
+        reduced_xs[1::4] = xs[starts]
+        reduced_ys[1::4] = numpy.minimum.reduceat(ys, starts)
+        reduced_xs[2::4] = xs[starts]
+        reduced_ys[2::4] = numpy.maximum.reduceat(ys, starts)
+        reduced_xs[3::4] = xs[ends]
+        reduced_ys[3::4] = ys[ends]
+
+        # The same data point four times for the columns outside of the plot
+        outside = (columns[starts] == -1) | (columns[starts] == num_columns)
+        if outside.any():
+            nearest = numpy.where(columns[starts] == -1, ends, starts)[outside]
+            outside = numpy.repeat(outside, 4)
+            reduced_xs[outside] = numpy.repeat(xs[nearest], 4)
+            reduced_ys[outside] = numpy.repeat(ys[nearest], 4)
+        return reduced_xs, reduced_ys
+
+    reduced_xs = []
+    reduced_ys = []
+    column = None
+    for x, y in zip(xs, ys):
+        c = (x - x_min) * scale
+        if not c >= 0:
+            c = -1
+        elif c >= num_columns:
+            c = num_columns
+        else:
+            c = int(c)
+
+        if c != column:
+            if column is not None:
+                _add_column(reduced_xs, reduced_ys, column, num_columns, first_x, first_y, low, high, last_x, last_y)
+            column = c
+            first_x, first_y, low, high = x, y, y, y
+        elif y < low:
+            low = y
+        elif y > high:
+            high = y
+        last_x, last_y = x, y
+
+    if column is not None:
+        _add_column(reduced_xs, reduced_ys, column, num_columns, first_x, first_y, low, high, last_x, last_y)
+    return reduced_xs, reduced_ys
+
+
+def _add_column(reduced_xs, reduced_ys, column, num_columns, first_x, first_y, low, high, last_x, last_y):
+    """
+    Internal function that adds the four data points of a column to the result of min_max.
+    :param reduced_xs: List of reduced x values to add to
+    :param reduced_ys: List of reduced y values to add to
+    :param column: The column (-1 or num_columns for the data points left or right of the plot)
+    :param num_columns: Width of the plot in pixels
+    :param first_x: x value of the first data point in the column
+    :param first_y: y value of the first data point in the column
+    :param low: Minimum y value in the column
+    :param high: Maximum y value in the column
+    :param last_x: x value of the last data point in the column
+    :param last_y: y value of the last data point in the column
+    :return: None
+    """
+    if column == -1:
+        first_x, first_y, low, high = last_x, last_y, last_y, last_y
+    elif column == num_columns:
+        low, high, last_x, last_y = first_y, first_y, first_x, first_y
+    reduced_xs.extend((first_x, first_x, first_x, last_x))
+    reduced_ys.extend((first_y, low, high, last_y))
+
+
+def lttb(xs, ys, num_points):
+    """
+    Reduce a dataset to num_points data points with the Largest-Triangle-Three-Buckets algorithm.  The data points are
+    split into buckets and from every bucket the data point forming the largest triangle with the point picked from the
+    previous bucket and the average of the next bucket is kept.  The x values must be increasing.
+    :param xs: The x values (list, array.array, RingBuffer, or numpy array)
+    :param ys: The y values (list, array.array, RingBuffer, or numpy array)
+    :param num_points: How many data points to reduce to (at least 3)
+    :return: Tuple of the reduced x values and y values
+    """
+    assert isinstance(num_points, int) and num_points >= 3
+
+    n = len(xs)
+    if n <= num_points:
+        if numpy is not None:
+            return Datasets.float_array(xs).copy(), Datasets.float_array(ys).copy()
+        return list(xs), list(ys)
+
+    bucket_size = (n - 2) / float(num_points - 2)
+    picked = [0]
+    a = 0
+
+    if numpy is not None:
+        xs = Datasets.float_array(xs)
+        ys = Datasets.float_array(ys)
+        for i in range(num_points - 2):
+            start = int(i * bucket_size) + 1
+            stop = int((i + 1) * bucket_size) + 1
+            next_stop = min(int((i + 2) * bucket_size) + 1, n)
+            average_x = xs[stop:next_stop].mean() if next_stop > stop else xs[n - 1]
+            average_y = ys[stop:next_stop].mean() if next_stop > stop else ys[n - 1]
+
+            areas = numpy.abs((xs[a] - average_x) * (ys[start:stop] - ys[a]) - (xs[a] - xs[start:stop]) * (average_y - ys[a]))
+            a = start + int(numpy.argmax(areas))
+            picked.append(a)
+        picked.append(n - 1)
+        return xs[picked], ys[picked]
+
+    for i in range(num_points - 2):
+        start = int(i * bucket_size) + 1
+        stop = int((i + 1) * bucket_size) + 1
+        next_stop = min(int((i + 2) * bucket_size) + 1, n)
+        if next_stop > stop:
+            average_x = math.fsum(xs[j] for j in range(stop, next_stop)) / (next_stop - stop)
+            average_y = math.fsum(ys[j] for j in range(stop, next_stop)) / (next_stop - stop)
+        else:
+            average_x, average_y = xs[n - 1], ys[n - 1]
+
+        x_a, y_a = xs[a], ys[a]
+        best_area = -1
+        for j in range(start, stop):
+            area = abs((x_a - average_x) * (ys[j] - y_a) - (x_a - xs[j]) * (average_y - y_a))
+            if area > best_area:
+                best_area = area
+                a = j
+        picked.append(a)
+    picked.append(n - 1)
+    return [xs[i] for i in picked], [ys[i] for i in picked]
+
+
+class MinMaxPyramid(object):
+    # Start of every file written by save (the number is the version of the file layout)
+    FILE_MAGIC = b"PYDPYR01"
+
+    # Magic, bucket size, branching, number of levels, number of data points, and the first x, last x, and last y
+    _HEADER = struct.Struct("<8sIIIQddd")
+
+    # What is stored for every bucket of every level
+    _FIELDS = ("x_first", "x_last", "y_first", "y_last", "y_min", "y_max")
+
+    def __init__(self, bucket_size=32, branching=4, path=None):
+        """
+        A precomputed min/max summary of a dataset at several resolutions, so that any x range of a very large dataset
+        can be reduced like min_max in time that depends on the plot width instead of the number of data points.  Level
+        0 splits the data points into buckets of bucket_size and every level above that combines branching buckets of
+        the level below.  Every bucket stores its first and last data point and its minimum and maximum y value.  Only
+        the last bucket of every level changes when data points are added, so keeping the pyramid up to date costs
+        O(1) amortized per data point.  The x values must be increasing and data points can only be added, not removed.
+        The pyramid can be saved to a file; with a path, the first update reads the saved pyramid through a memory map
+        (instead of recomputing it) as long as it was saved for the same data.
+        :param bucket_size: Number of data points in every bucket of level 0
+        :param branching: Number of buckets of a level that are combined into one bucket of the level above
+        :param path: Optional file that the pyramid is loaded from and saved to (refer to save)
+        """
+        assert isinstance(bucket_size, int) and bucket_size > 1
+        assert isinstance(branching, int) and branching > 1
+
+        self.bucket_size = bucket_size
+        self.branching = branching
+        self.path = path
+
+        self._levels = [MinMaxPyramid._new_level()]
+        self._count = 0
+        self._checked_file = path is None
+
+    def __len__(self):
+        """
+        :return: Number of data points that are summarized
+        """
+        return self._count
+
+    @property
+    def num_levels(self):
+        """
+        Getter for the number of levels.
+        :return: Number of levels
+        """
+        return len(self._levels)
+
+    def update(self, xs, ys):
+        """
+        Catch up with the data points that were added to the dataset since the last update.  Only the buckets that the
+        new data points fall into (and the buckets above them) are recomputed.
+        :param xs: All of the x values of the dataset (list, array.array, or numpy array)
+        :param ys: All of the y values of the dataset (list, array.array, or numpy array)
+        :return: None
+        """
+        if not self._checked_file:
+            self._checked_file = True
+            self._load(xs, ys)
+
+        assert len(xs) >= self._count, "data points can't be removed from a dataset with a pyramid"
+        if len(xs) == self._count:
+            return
+
+        dirty = self._count // self.bucket_size
+        self._summarize(self._levels[0], (xs, xs, ys, ys, ys, ys), dirty, self.bucket_size)
+        self._count = len(xs)
+
+        k = 0
+        while len(self._levels[k]["x_first"]) > self.branching:
+            if k + 1 == len(self._levels):
+                self._levels.append(MinMaxPyramid._new_level())
+                dirty = 0
+            else:
+                dirty //= self.branching
+            child = self._levels[k]
+            self._summarize(self._levels[k + 1], [child[field] for field in MinMaxPyramid._FIELDS], dirty, self.branching)
+            k += 1
+
+    def min_max(self, xs, ys, x_min, x_max, num_columns):
+        """
+        Same as min_max (the module function) but the coarsest level that still has at least four buckets for every
+        pixel column is reduced instead of the data points themselves.  The minimum and maximum of a bucket are put at
+        the middle of the bucket, so the only difference is that a bucket straddling two columns counts towards one of
+        them.  When zoomed in far enough that no level is fine enough, only the data points in the x range are reduced
+        (which is exactly the same as min_max).
+        :param xs: All of the x values of the dataset (must be what the pyramid was last updated with)
+        :param ys: All of the y values of the dataset (must be what the pyramid was last updated with)
+        :param x_min: x value at the left edge of the plot
+        :param x_max: x value at the right edge of the plot
+        :param num_columns: Width of the plot in pixels
+        :return: Tuple of the reduced x values and y values (at most 4 per column)
+        """
+        start, stop = visible_range(xs, x_min, x_max)
+
+        size = self.bucket_size * self.branching ** (len(self._levels) - 1)
+        for level in reversed(self._levels):
+            if (stop - start) >= 4 * num_columns * size:
+                break
+            size //= self.branching
+        else:
+            if numpy is not None:
+                return min_max(Datasets.float_array(xs)[start:stop], Datasets.float_array(ys)[start:stop], x_min, x_max,
+                               num_columns)
+            return min_max(xs[start:stop], ys[start:stop], x_min, x_max, num_columns)
+
+        # Every bucket becomes its first data point, its minimum, its maximum, and its last data point
+        first = start // size
+        last = min((stop + size - 1) // size, len(level["x_first"]))
+        if numpy is not None:
+            fields = [Datasets.float_array(level[field])[first:last] for field in MinMaxPyramid._FIELDS]
+            points_xs = numpy.empty(4 * (last - first))
+            points_ys = numpy.empty(4 * (last - first))
+            points_xs[0::4] = fields[0]
+            points_xs[1::4] = points_xs[2::4] = (fields[0] + fields[1]) / 2
+            points_xs[3::4] = fields[1]
+            points_ys[0::4] = fields[2]
+            points_ys[1::4] = fields[4]
+            points_ys[2::4] = fields[5]
+            points_ys[3::4] = fields[3]
+            return min_max(points_xs, points_ys, x_min, x_max, num_columns)
+
+        points_xs = []
+        points_ys = []
+        for i in range(first, last):
+            middle = (level["x_first"][i] + level["x_last"][i]) / 2
+            points_xs.extend((level["x_first"][i], middle, middle, level["x_last"][i]))
+            points_ys.extend((level["y_first"][i], level["y_min"][i], level["y_max"][i], level["y_last"][i]))
+        return min_max(points_xs, points_ys, x_min, x_max, num_columns)
+
+    def save(self, path=None):
+        """
+        Write the pyramid to a file (through a memory map) so that it doesn't have to be recomputed the next time the
+        same data is loaded.  The file is written next to path first and then moved over it, so a crash while saving
+        never leaves a broken file behind.
+        :param path: The file (defaults to the path the pyramid was created with)
+        :return: None
+        """
+        path = self.path if path is None else path
+        assert path is not None
+
+        first_x = self._levels[0]["x_first"][0] if self._count > 0 else 0.0
+        last_x = self._levels[0]["x_last"][-1] if self._count > 0 else 0.0
+        last_y = self._levels[0]["y_last"][-1] if self._count > 0 else 0.0
+        sizes = array.array("Q", [len(level["x_first"]) for level in self._levels])
+        header = MinMaxPyramid._HEADER.pack(MinMaxPyramid.FILE_MAGIC, self.bucket_size, self.branching,
+                                            len(self._levels), self._count, first_x, last_x, last_y)
+        length = len(header) + 8 * len(sizes) + 8 * len(MinMaxPyramid._FIELDS) * sum(sizes)
+
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w+b") as file:
+            file.truncate(length)
+            with mmap.mmap(file.fileno(), length) as mapped:
+                mapped[:len(header)] = header
+                offset = len(header)
+                for values in [sizes] + [level[field] for level in self._levels for field in MinMaxPyramid._FIELDS]:
+                    data = memoryview(values).cast("B")
+                    mapped[offset:offset + len(data)] = data
+                    offset += len(data)
+                    data.release()
+                mapped.flush()
+        os.replace(temporary_path, path)
+
+    def _load(self, xs, ys):
+        """
+        Internal function that reads the pyramid from self.path if it was saved with the same settings for the same
+        data (or for the start of it; the data points after that are added by the next update).  Anything else (no
+        file, a different dataset, a broken file) leaves the pyramid empty so it is recomputed.
+        :param xs: All of the x values of the dataset
+        :param ys: All of the y values of the dataset
+        :return: True if the pyramid was loaded and False otherwise
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < MinMaxPyramid._HEADER.size:
+            return False
+
+        with open(self.path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, bucket_size, branching, num_levels, count, first_x, last_x, last_y = \
+                MinMaxPyramid._HEADER.unpack_from(mapped)
+            if magic != MinMaxPyramid.FILE_MAGIC or (bucket_size, branching) != (self.bucket_size, self.branching):
+                return False
+            if count > len(xs) or (count > 0 and (xs[0], xs[count - 1], ys[count - 1]) != (first_x, last_x, last_y)):
+                return False
+
+            view = memoryview(mapped)
+            try:
+                offset = MinMaxPyramid._HEADER.size
+                sizes = array.array("Q")
+                sizes.frombytes(view[offset:offset + 8 * num_levels])
+                offset += 8 * num_levels
+                if offset + 8 * len(MinMaxPyramid._FIELDS) * sum(sizes) != len(mapped):
+                    return False
+
+                levels = []
+                for size in sizes:
+                    level = MinMaxPyramid._new_level()
+                    for field in MinMaxPyramid._FIELDS:
+                        level[field].frombytes(view[offset:offset + 8 * size])
+                        offset += 8 * size
+                    levels.append(level)
+            finally:
+                view.release()
+
+        self._levels = levels
+        self._count = count
+        return True
+
+    @staticmethod
+    def _new_level():
+        """
+        Internal function that creates an empty level.
+        :return: Dictionary of an array.array of floats for every field
+        """
+        return {field: array.array("d") for field in MinMaxPyramid._FIELDS}
+
+    @staticmethod
+    def _summarize(level, sources, start, size):
+        """
+        Internal function that recomputes the buckets of a level from bucket start onwards.  Every bucket combines size
+        items of the level below (or size data points for level 0).
+        :param level: The level to update
+        :param sources: Tuple of the x_first, x_last, y_first, y_last, y_min, and y_max values of the level below
+        :param start: First bucket to recompute (the buckets before it don't change)
+        :param size: Number of items of the level below in a bucket
+        :return: None
+        """
+        for field in MinMaxPyramid._FIELDS:
+            del level[field][start:]
+
+        # numpy only pays off for more than a few buckets (usually only the last bucket of every level changes)
+        length = len(sources[0])
+        if numpy is not None and length - start * size > 256:
+            x_first, x_last, y_first, y_last, y_min, y_max = [Datasets.float_array(s)[start * size:] for s in sources]
+            firsts = numpy.arange(0, length - start * size, size)
+            lasts = numpy.minimum(firsts + size, length - start * size) - 1
+            summaries = (x_first[firsts], x_last[lasts], y_first[firsts], y_last[lasts],
+                         numpy.fmin.reduceat(y_min, firsts), numpy.fmax.reduceat(y_max, firsts))
+            for field, values in zip(MinMaxPyramid._FIELDS, summaries):
+                level[field].frombytes(values.tobytes())
+            return
+
+        x_first, x_last, y_first, y_last, y_min, y_max = sources
+        for first in range(start * size, length, size):
+            last = min(first + size, length) - 1
+            lows = [y for y in y_min[first:last + 1] if y == y]
+            highs = [y for y in y_max[first:last + 1] if y == y]
+            level["x_first"].append(x_first[first])
+            level["x_last"].append(x_last[last])
+            level["y_first"].append(y_first[first])
+            level["y_last"].append(y_last[last])
+            level["y_min"].append(min(lows) if len(lows) > 0 else math.nan)
+            level["y_max"].append(max(highs) if len(highs) > 0 else math.nan)
@@ -1,4 +1,5 @@
 import argparse
+import math
 import random
 
 from pydisplay import Chart
@@ -89,8 +90,9 @@ class LineDemo(Pages.Page):
         self.line.set_title("TEST")
         self.line.set_x_label("x axis")
         self.line.set_y_label("y axis")
-        self.line.add_dataset("linear", *self.line.generate_ys_from_function(LineDemo._x_to_y_linear))
-        self.line.add_dataset("quadratic", *self.line.generate_ys_from_function(LineDemo._x_to_y_quadratic))
+        self.line.add_function_dataset("linear", LineDemo._x_to_y_linear)
+        self.line.add_function_dataset("quadratic", LineDemo._x_to_y_quadratic)
+        self.line.set_interactive()
 
         self._drawables.append(self.line)
 
@@ -103,6 +105,20 @@ class LineDemo(Pages.Page):
         return x ** 2
 
 
+class HeatmapDemo(Pages.Page):
+    def __init__(self, pydisplay, event_handler):
+        page_size = (Constants.PI_TFT_SCREEN_SIZE[0], Constants.PI_TFT_SCREEN_SIZE[1] - Pages.PageManager.SWITCHER_HEIGHT)
+        super().__init__(pydisplay, event_handler, "Heat", page_size, Colors.BLACK)
+
+        self.heatmap = Graphs.Heatmap(0, 0, *self.page_size, num_rows=32, num_columns=64, value_min=-1, value_max=1)
+        self.heatmap.set_title("TEST")
+        self.heatmap.set_x_label("time")
+        self.heatmap.set_y_label("frequency")
+        self.heatmap.add_columns([[math.sin(column / 8.0 + row / 4.0) for row in range(32)] for column in range(64)])
+
+        self._drawables.append(self.heatmap)
+
+
 class ButtonsTextDemo(Pages.Page):
     def __init__(self, pydisplay, event_handler):
         super().__init__(pydisplay, event_handler, "Buttons", (400, 300), Colors.BLACK)
@@ -162,8 +178,8 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
 
-    page_classes = [ChartDemo, HistogramDemo, BarDemo, LineDemo, ScatterDemo, ButtonsTextDemo]
-    page_class_args = [[], [], [], [], [], []]
+    page_classes = [ChartDemo, HistogramDemo, BarDemo, LineDemo, ScatterDemo, HeatmapDemo, ButtonsTextDemo]
+    page_class_args = [[], [], [], [], [], [], []]
     pydisplay = PyDisplay.PyDisplay(not args.not_on_pitft, not args.disable_touchscreen, not args.disable_button)
     pydisplay.setup_pages(page_classes, page_class_args, Pages.PageManager.SWITCHER_LOCATIONS["BOTTOM"])
     pydisplay.run()
@@ -3,6 +3,21 @@ import pygame
 from pydisplay import Colors
 from pydisplay import Events
 
+# Loading a font is slow, so every font size is only loaded once and then shared (refer to _font)
+_fonts = {}
+
+
+def _font(font_size):
+    """
+    Internal function that gets the default font in a size.
+    :param font_size: Size of the font
+    :return: The pygame.font.Font
+    """
+    font = _fonts.get(font_size)
+    if font is None:
+        font = _fonts[font_size] = pygame.font.Font(None, font_size)
+    return font
+
 
 class Drawable(object):
     def __init__(self, x, y, width, height):
@@ -159,7 +174,7 @@ class Button(Drawable):
         self.bg_color = bg_color
         self.fg_color = fg_color
         self.font_size = font_size
-        self._my_font = pygame.font.Font(None, font_size)
+        self._my_font = _font(font_size)
         self.shape = shape
         self.callback = callback
         self.args = args if args is not None else []
@@ -265,11 +280,14 @@ class Text(Drawable):
         assert isinstance(rotate, int) and 0 <= rotate <= 360
         self.text = text
         self.fg_color = fg_color
-        self._my_font = pygame.font.Font(None, font_size)
+        self._my_font = _font(font_size)
         self.align_x = align_x
         self.align_y = align_y
         self._rotate = rotate
 
+        # The text is only rendered again when the text or color changes
+        self._rendered = {"text": None, "fg_color": None, "surface": None}
+
     def draw(self, surface):
         """
         Custom draw function
@@ -277,10 +295,14 @@ class Text(Drawable):
         :return: None
         """
         super().draw(surface)
-        text_surface = self._my_font.render(str(self.text), True, self.fg_color)
-        text_surface = pygame.transform.rotate(text_surface, self._rotate)
-        text_rect = text_surface.get_rect(**self._convert_align_to_arguments())
-        surface.blit(text_surface, text_rect)
+        rendered = self._rendered
+        if rendered["surface"] is None or rendered["text"] != self.text or rendered["fg_color"] != self.fg_color:
+            text_surface = self._my_font.render(str(self.text), True, self.fg_color)
+            rendered["surface"] = pygame.transform.rotate(text_surface, self._rotate)
+            rendered["text"] = self.text
+            rendered["fg_color"] = self.fg_color
+        text_rect = rendered["surface"].get_rect(**self._convert_align_to_arguments())
+        surface.blit(rendered["surface"], text_rect)
 
     def _convert_align_to_arguments(self):
         """
@@ -111,10 +111,13 @@ class EventTouchDrag(Event):
         triggered at the same time as EventTouchUp.  This has information on all of the positions during which the
         mouse/finger was pressed down.  The no_movement variable is True if during the whole duration, the positions
         did not move much (based on the TOUCH_HOLD_TOLERANCE variables in Constants).
+        :param positions: All of the positions (x, y coordinates) from down to up
+        :param duration: How long the mouse/finger was pressed down for (in seconds as a float)
         """
         super().__init__(EventTypes.TOUCH_DRAG)
         assert isinstance(duration, float)
         self.positions = positions
+        self.duration = duration
         self.position_start = positions[0]
         self.position_end = positions[-1]
         xs = [x for x, _ in self.positions]
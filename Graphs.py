@@ -1,14 +1,25 @@
+import array
+import bisect
 import collections
 import inspect
 import math
-import os
-import stat
-import threading
+import operator
+import time
 
 import pygame
 
 from pydisplay import Colors
+from pydisplay import Constants
+from pydisplay import DataSources
+from pydisplay import Datasets
+from pydisplay import Decimation
 from pydisplay import Drawables
+from pydisplay import Events
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class GraphTypes(object):
@@ -19,12 +30,53 @@ class GraphTypes(object):
     BAR = 1
     HISTOGRAM = 2
     LINE = 3
+    HEATMAP = 4
+
+
+class LevelOfDetail(object):
+    """
+    How Line and Scatter reduce large datasets before drawing them (only done once a dataset has more data points than
+    can be seen, and the result is cached until the data or the bounds change).  NONE draws every data point. MIN_MAX
+    keeps the first, minimum, maximum, and last data point of every pixel column, which looks the same for lines.  LTTB
+    keeps about two data points per pixel column using Largest-Triangle-Three-Buckets (x values must be increasing).
+    """
+    NONE = 0
+    MIN_MAX = 1
+    LTTB = 2
+
+
+class PointRendering(object):
+    """
+    How Scatter draws its data points.  CIRCLES draws every data point with pygame.draw.circle.  PIXELS writes all of the
+    data points straight into the pixels of the surface at once (needs numpy), which looks the same but is a lot faster
+    for a lot of data points.  DENSITY also counts how many data points land on every pixel and shades the pixels from
+    a dark version of the dataset color (few) to white (the most), so dense clouds of data points show where most of
+    them are.  Datasets with only a few data points are always drawn with circles.
+    """
+    CIRCLES = 0
+    PIXELS = 1
+    DENSITY = 2
 
 
-class Graph(Drawables.Drawable):
+class AutoRange(object):
+    """
+    How the bounds of an axis follow the data (refer to Graph.set_auto_range).  OFF only changes the bounds with
+    set_bounds.  FIT keeps the bounds just around the data (they grow and shrink with it).  GROW only ever grows the
+    bounds to fit new data.
+    """
+    OFF = 0
+    FIT = 1
+    GROW = 2
+
+
+class Graph(Drawables.Drawable, DataSources.DataSourceMixin):
     # This is the restricted word that you should not send to the fifo; when this command is read, the data feed closes
     FIFO_CLOSING_COMMAND = "CLOSING"
 
+    # The tick intervals (in seconds) that a time axis picks from (refer to set_time_axis)
+    TIME_INTERVALS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400,
+                      172800, 604800)
+
     def __init__(self, x, y, width, height):
         """
         Create a graph with an option of multiple datasets.
@@ -36,7 +88,9 @@ class Graph(Drawables.Drawable):
         super(Graph, self).__init__(x, y, width, height)
 
         self._plot = {"x": 0, "y": 0, "width": 0, "height": 0, "bg_color": None, "fg_color": None}
-        self._axis = {"x_min": -10, "x_max": 10, "x_interval": 2, "y_min": -7, "y_max": 7, "y_interval": 2}
+        self._axis = {"x_min": -10, "x_max": 10, "x_interval": 2, "y_min": -7, "y_max": 7, "y_interval": 2,
+                      "aligned_ticks": False}
+        self._time_axis = {"enabled": False, "utc": False, "pixels_per_tick": 60, "window": None, "follow_clock": False}
         self._drawables = {"title": None, "x_label": None, "y_label": None, "x_axis": None, "y_axis": None,
                            "x_ticks": [], "x_numbers": [], "y_ticks": [], "y_numbers": []}
 
@@ -46,8 +100,28 @@ class Graph(Drawables.Drawable):
         self.update_distance_between_ticks()
         self.create_plot()
 
+        self._create_data_storage()
+
+    def _create_data_storage(self):
+        """
+        Internal function that creates everything for storing datasets and keeping track of data sources.
+        :return: None
+        """
         self.datasets = collections.OrderedDict()
-        self.fifo_sources = []
+        self._create_data_sources()
+
+        # The datasets that are drawn in the current frame (refer to _publish_datasets)
+        self._frame_datasets = []
+
+        # Reduced datasets for drawing (refer to _reduced_data)
+        self._level_of_detail = LevelOfDetail.NONE
+        self._reduced_cache = {}
+
+        # Refer to set_auto_range
+        self._auto_range = {"x": AutoRange.OFF, "y": AutoRange.OFF, "x_pixels_per_tick": 40, "y_pixels_per_tick": 25}
+
+        # Touch zoom and pan (refer to set_interactive)
+        self._interaction = None
 
     def create_plot(self, offset_left=30, offset_right=10, offset_top=30, offset_bottom=30, fg_color=Colors.WHITE):
         """
@@ -107,7 +181,8 @@ class Graph(Drawables.Drawable):
         width = self._plot["width"]
         height = self._plot["height"]
 
-        # Reset the drawables
+        # Reset the drawables (and the cached surface they are drawn onto)
+        self._decorations = None
         self._drawables["x_ticks"] = []
         self._drawables["x_numbers"] = []
         self._drawables["y_ticks"] = []
@@ -120,12 +195,13 @@ class Graph(Drawables.Drawable):
 
         self.update_distance_between_ticks()
 
-        # Figure out x tick marks
+        # Figure out x tick marks (the values are kept for _scroll_x_bounds)
         x_ticks_x, x_ticks_values = self.tick_marks(x_min, x_max, x_interval, 0)
+        self._axis["x_tick_values"] = x_ticks_values
         for tick_x, tick_value in zip(x_ticks_x, x_ticks_values):
             self._drawables["x_ticks"].append(Drawables.Line(tick_x, plot_y + height - 4, 0, 4, self._plot["fg_color"]))
             self._drawables["x_numbers"].append(
-                Drawables.Text(x=tick_x, y=plot_y + height + 2, text=str(tick_value), font_size=12,
+                Drawables.Text(x=tick_x, y=plot_y + height + 2, text=self._x_tick_label(tick_value, x_interval), font_size=12,
                                fg_color=self._plot["fg_color"],
                                align_x=Drawables.Text.ALIGN_X_CENTER, align_y=Drawables.Text.ALIGN_Y_TOP)
             )
@@ -141,7 +217,16 @@ class Graph(Drawables.Drawable):
             )
 
     def tick_marks(self, low, high, interval, xory):
-        if low <= 0 and high <= 0:
+        if xory == 0 and self._time_axis["enabled"]:
+            # Time ticks go on whole multiples of the interval in local time (i.e. every 15 minutes on the quarter hour)
+            offset = 0 if self._time_axis["utc"] else time.localtime(low).tm_gmtoff
+            first = math.ceil((low + offset) / interval) * interval - offset
+            ticks_values = [first + i * interval for i in range(int((high - first) // interval) + 1)]
+        elif self._axis["aligned_ticks"] or (xory == 0 and self._x_scrolls()):
+            # Zoomed or panned by touch (or the x bounds scroll with the data) so the bounds are anything; ticks go on
+            # the multiples of the interval instead (so they stay put on the data while the bounds scroll)
+            ticks_values = [i * interval for i in range(int(math.ceil(low / interval)), int(math.floor(high / interval)) + 1)]
+        elif low <= 0 and high <= 0:
             num_ticks = abs(high - low) / interval
             ticks_values = [high - i * interval for i in range(int(num_ticks), -1, -1)]
         elif low >= 0 and high >= 0:
@@ -152,12 +237,63 @@ class Graph(Drawables.Drawable):
             num_ticks_negative = abs(low) / interval
             ticks_values = [-i * interval for i in range(int(num_ticks_negative), -1, -1)]
             ticks_values.extend([i * interval for i in range(int(num_ticks_positive) + 1)])
-        ticks_values = list(set(ticks_values))
-        if xory == 0:
-            ticks = [self._datum_position(ticks_value, 0)[xory] for ticks_value in ticks_values]
-        else:
-            ticks = [self._datum_position(0, ticks_value)[xory] for ticks_value in ticks_values]
-        return ticks, ticks_values
+        ticks = []
+        labels = []
+        for ticks_value in set(ticks_values):
+            if xory == 0:
+                tick = self._datum_position(ticks_value, 0)[xory]
+            else:
+                tick = self._datum_position(0, ticks_value)[xory]
+
+            # Floating point error can put the last tick just outside of the bounds
+            if tick is None:
+                continue
+
+            # Floating point error shouldn't show up in the tick labels (i.e. 0.30000000000000004 instead of 0.3)
+            ticks.append(tick)
+            labels.append(float("%.12g" % ticks_value) if isinstance(ticks_value, float) else ticks_value)
+        return ticks, labels
+
+    def _x_scrolls(self):
+        """
+        Internal function that checks if the x bounds scroll along with the data (refer to set_time_window).
+        :return: True if they do and False otherwise
+        """
+        return self._time_axis["window"] is not None
+
+    def _scroll_x_bounds(self, x_min, x_max, x_interval=None):
+        """
+        Internal function that moves the x bounds while the data scrolls by (which can happen every frame).  The x
+        ticks are on multiples of the interval (refer to tick_marks) so most moves keep the same ticks visible; then the
+        x tick marks, x tick labels, and y axis that are already there are just moved instead of being created again with
+        set_bounds (only the cached decorations are drawn again).
+        :param x_min: New minimum x value
+        :param x_max: New maximum x value
+        :param x_interval: New amount between tick marks on x axis (defaults to the current one)
+        :return: None
+        """
+        if x_interval is None: x_interval = self._axis["x_interval"]
+
+        old_bounds = (self._axis["x_min"], self._axis["x_max"])
+        if x_interval != self._axis["x_interval"] or x_max - x_min != old_bounds[1] - old_bounds[0]:
+            return self.set_bounds(x_min=x_min, x_max=x_max, x_interval=x_interval)
+
+        self._axis["x_min"], self._axis["x_max"] = x_min, x_max
+        ticks_x, ticks_values = self.tick_marks(x_min, x_max, x_interval, 0)
+        if sorted(ticks_values) != sorted(self._axis["x_tick_values"]):
+            return self.set_bounds(x_min=x_min, x_max=x_max, x_interval=x_interval)
+
+        positions = dict(zip(ticks_values, ticks_x))
+        for tick, number, value in zip(self._drawables["x_ticks"], self._drawables["x_numbers"],
+                                       self._axis["x_tick_values"]):
+            dx = positions[value] - tick.x
+            tick.move(dx, 0)
+            number.move(dx, 0)
+
+        self._axis_value_calculate()
+        y_axis = self._drawables["y_axis"]
+        y_axis.move(round(self._axis["y_axis_x"]) - y_axis.x, 0)
+        self._decorations = None
 
     def update_distance_between_ticks(self):
         x_min = self._axis["x_min"]
@@ -196,22 +332,49 @@ class Graph(Drawables.Drawable):
         :return: None
         """
         super().draw(surface)
+        self.receive_data()
 
-        if self._drawables["title"] is not None: self._drawables["title"].draw(surface)
-        if self._drawables["x_label"] is not None: self._drawables["x_label"].draw(surface)
-        if self._drawables["y_label"] is not None: self._drawables["y_label"].draw(surface)
+        self._publish_datasets()
 
-        self._drawables["x_axis"].draw(surface)
-        for tick in self._drawables["x_ticks"]:
-            tick.draw(surface)
-        for number in self._drawables["x_numbers"]:
-            number.draw(surface)
+        # Touch zooming and panning only changes the bounds once per frame, however many events came in
+        if self._interaction is not None and self._interaction["pending"] is not None:
+            self._apply_view()
 
-        self._drawables["y_axis"].draw(surface)
-        for tick in self._drawables["y_ticks"]:
-            tick.draw(surface)
-        for number in self._drawables["y_numbers"]:
-            number.draw(surface)
+        # The title, labels, axes, ticks, and tick labels only change when they are set so they are drawn from a cache
+        if self._decorations is None or self._decorations["size"] != (self.width, self.height):
+            self._render_decorations()
+        surface.blit(self._decorations["surface"], (self.x, self.y))
+
+    def _decoration_drawables(self):
+        """
+        Internal function that lists the drawables of the graph that aren't data (title, labels, axes, ticks, and tick
+        labels) in the order they are drawn.
+        :return: List of drawables
+        """
+        drawables = [self._drawables[name] for name in ("title", "x_label", "y_label") if self._drawables[name] is not None]
+        drawables.append(self._drawables["x_axis"])
+        drawables.extend(self._drawables["x_ticks"])
+        drawables.extend(self._drawables["x_numbers"])
+        drawables.append(self._drawables["y_axis"])
+        drawables.extend(self._drawables["y_ticks"])
+        drawables.extend(self._drawables["y_numbers"])
+        return drawables
+
+    def _render_decorations(self):
+        """
+        Internal function that draws the title, labels, axes, ticks, and tick labels onto a transparent surface the size
+        of the graph.  This is only done again after set_bounds, set_title, set_x_label, or set_y_label is called or the
+        graph is resized; every other frame just blits the surface.
+        :return: None
+        """
+        decorations = pygame.Surface((int(math.ceil(self.width)) + 1, int(math.ceil(self.height)) + 1), pygame.SRCALPHA)
+        for drawable in self._decoration_drawables():
+            # The drawables know where they are on the screen so they are drawn relative to the graph for a moment
+            drawable.move(-self.x, -self.y)
+            drawable.draw(decorations)
+            drawable.move(self.x, self.y)
+
+        self._decorations = {"surface": decorations, "size": (self.width, self.height)}
 
     def move(self, dx, dy):
         """
@@ -225,84 +388,39 @@ class Graph(Drawables.Drawable):
         # Need to update values for x_axis_y and y_axis_x
         self._axis_value_calculate()
 
-        # Move all of the drawables
-        if self._drawables["title"] is not None: self._drawables["title"].move(dx, dy)
-        if self._drawables["x_label"] is not None: self._drawables["x_label"].move(dx, dy)
-        if self._drawables["y_label"] is not None: self._drawables["y_label"].move(dx, dy)
-
-        self._drawables["x_axis"].move(dx, dy)
-        for tick in self._drawables["x_ticks"]:
-            tick.move(dx, dy)
-        for number in self._drawables["x_numbers"]:
-            number.move(dx, dy)
-
-        self._drawables["y_axis"].move(dx, dy)
-        for tick in self._drawables["y_ticks"]:
-            tick.move(dx, dy)
-        for number in self._drawables["y_numbers"]:
-            number.move(dx, dy)
+        # Move all of the drawables (the cached decorations don't need to be redrawn since they are relative to the graph)
+        for drawable in self._decoration_drawables():
+            drawable.move(dx, dy)
 
     def exit(self):
         """
         Exit out of this graph. This involves closing the fifo data feed
         :return: None
         """
-        for fifo_source in self.fifo_sources:
-            if not (os.path.exists(fifo_source) and stat.S_ISFIFO(os.stat(fifo_source).st_mode)):
-                continue
+        self._exit_data_sources()
 
-            # Go through all of the fifos writing a command indicating that fifo should close
-            with open(fifo_source, "w") as fifo:
-                fifo.write(Graph.FIFO_CLOSING_COMMAND)
-
-    def setup_new_data_source(self, fifo_source, new_data_callback):
-        """
-        Set up a new data_source/data feed.  This new source must be a fifo from which this function will automatically
-        and continuously try to read from in a new thread until this Graph is exited.  When there is a new data point,
-        the new_data_callback function will be triggered and you can define what to do in that (though you probably will
-        want to call the add_datum function)
-        :param fifo_source: The filepath (relative or absolute) to the data source
-        :param new_data_callback: The callback function that will process the data read from the fifo
-        :return: None
-        """
-        assert os.path.exists(fifo_source) and stat.S_ISFIFO(os.stat(fifo_source).st_mode)
-
-        self.fifo_sources.append(fifo_source)
-
-        def _get_new_data():
-            while True:
-                with open(fifo_source, "r") as fifo:
-                    while True:
-                        data = fifo.read().rstrip("\n")
-                        if len(data) == 0:
-                            break
-
-                        # Check if the fifo is actually initiating closing
-                        if data == Graph.FIFO_CLOSING_COMMAND:
-                            return
-
-                        # Data arrived so run the callback with the new data
-                        new_data_callback(self, fifo_source, data)
-
-        # Checking for new data needs to be done in a new thread so the select statement can block
-        threading.Thread(target=_get_new_data).start()
-
-    def add_dataset(self, name, x_data, y_data, color=Colors.GREEN):
+    def add_dataset(self, name, x_data, y_data, color=Colors.GREEN, capacity=None, time_window=None):
         """
         Add a new dataset with its own custom color
         :param name: Name of the dataset (each dataset must be unique).  If name already exists in dataset, then dataset
                     is updated.
-        :param x_data: List of x data values
-        :param y_data: List of y data values
+        :param x_data: List, tuple, array.array, memoryview, or numpy array of x data values
+        :param y_data: List, tuple, array.array, memoryview, or numpy array of y data values
         :param color: Color scheme for this dataset
+        :param capacity: Optional maximum number of data points to keep; once reached, adding a data point evicts the
+                    oldest one so the memory used stays the same (good for data sources that run for a long time)
+        :param time_window: Optional; only keep the data points whose x value is within time_window of the newest x
+                    value (x values must be increasing and a capacity is needed too)
         :return: None
         """
         assert isinstance(name, str) and name not in self.datasets
-        assert isinstance(x_data, list) and all([isinstance(x, int) or isinstance(x, float) for x in x_data])
-        assert isinstance(y_data, list) and all([isinstance(y, int) or isinstance(y, float) for y in y_data])
+
+        # Converting the values is what validates them (it raises a TypeError for anything that isn't a number)
+        x_data = Datasets.to_array(x_data)
+        y_data = Datasets.to_array(y_data)
         assert len(x_data) == len(y_data)
 
-        self.datasets[name] = {"color": color, "xs": x_data, "ys":y_data}
+        self.datasets[name] = Datasets.Dataset(x_data, y_data, color, capacity, time_window)
 
     def remove_dataset(self, name):
         """
@@ -318,27 +436,47 @@ class Graph(Drawables.Drawable):
 
     def get_dataset(self, name):
         """
-        Get data for a dataset.
+        Get data for a dataset.  Data points added with add_datum only show up here once they have been drawn.
         :param name: Name of the dataset
-        :return: A tuple containing the x data, y data, and color
+        :return: A tuple containing a copy of the x data, a copy of the y data, and color
         """
         assert isinstance(name, str) and name in self.datasets
 
-        return self.datasets[name]["xs"], self.datasets[name]["ys"], self.datasets[name]["color"]
+        dataset = self.datasets[name]
+        return list(dataset.xs), list(dataset.ys), dataset.color
 
     def add_datum(self, dataset_name, x_value, y_value):
         """
-        Add a new data point.
+        Add a new data point.  This is safe to call from any thread (i.e. from a data source callback); the data point is
+        drawn starting from the next frame.
         :param dataset_name: The dataset this data point belongs to; if dataset name doesn't exist, create new dataset
         :param x_value: The x value
         :param y_value: The y value
         :return: None
         """
-        if dataset_name in self.datasets:
-            self.datasets[dataset_name]["xs"].append(x_value)
-            self.datasets[dataset_name]["ys"].append(y_value)
-        else:
-            self.datasets[dataset_name] = {"color": Colors.GREEN, "xs": [x_value], "ys": [y_value]}
+        dataset = self.datasets.get(dataset_name)
+        if dataset is None:
+            dataset = self.datasets.setdefault(dataset_name, Datasets.Dataset([], [], Colors.GREEN))
+        dataset.append(x_value, y_value)
+
+    def extend(self, dataset_name, x_values, y_values):
+        """
+        Add a lot of data points at once.  Like add_datum, this is safe to call from any thread, but the whole batch is
+        validated once, queued as one item, and added to the dataset in one go at the next frame (so cached things are
+        only invalidated once), which is a lot cheaper than calling add_datum for every data point.
+        :param dataset_name: The dataset these data points belong to; if dataset name doesn't exist, create new dataset
+        :param x_values: List, tuple, array.array, memoryview, or numpy array of x values
+        :param y_values: List, tuple, array.array, memoryview, or numpy array of y values (same length as x_values)
+        :return: None
+        """
+        x_values = Datasets.to_array(x_values)
+        y_values = Datasets.to_array(y_values)
+        assert len(x_values) == len(y_values)
+
+        dataset = self.datasets.get(dataset_name)
+        if dataset is None:
+            dataset = self.datasets.setdefault(dataset_name, Datasets.Dataset([], [], Colors.GREEN))
+        dataset.extend(x_values, y_values)
 
     def set_title(self, text, distance_from_top_of_graph=5, font_size=20, fg_color=None):
         """
@@ -350,9 +488,10 @@ class Graph(Drawables.Drawable):
         :return: None
         """
         fg_color = self._plot["fg_color"] if fg_color is None else fg_color
-        self._drawables["title"] = Drawables.Text(x=self.width / 2, y=self.y + distance_from_top_of_graph,
+        self._drawables["title"] = Drawables.Text(x=self.x + self.width / 2, y=self.y + distance_from_top_of_graph,
                                                   text=text, font_size=font_size, fg_color=fg_color,
                                                   align_x=Drawables.Text.ALIGN_X_CENTER, align_y=Drawables.Text.ALIGN_Y_TOP)
+        self._decorations = None
 
     def set_x_label(self, text, distance_from_bottom_of_graph=5, font_size=15, fg_color=None):
         """
@@ -368,6 +507,7 @@ class Graph(Drawables.Drawable):
         fg_color = self._plot["fg_color"] if fg_color is None else fg_color
         self._drawables["x_label"] = Drawables.Text(x=x, y=y, text=text, font_size=font_size, fg_color=fg_color,
                                                     align_x=Drawables.Text.ALIGN_X_CENTER, align_y=Drawables.Text.ALIGN_Y_BOTTOM)
+        self._decorations = None
 
     def set_y_label(self, text, distance_from_left_of_graph=5, font_size=15, fg_color=None):
         """
@@ -383,6 +523,564 @@ class Graph(Drawables.Drawable):
         fg_color = self._plot["fg_color"] if fg_color is None else fg_color
         self._drawables["y_label"] = Drawables.Text(x=x, y=y, text=text, font_size=font_size, fg_color=fg_color,
                                                     align_x=Drawables.Text.ALIGN_X_LEFT, align_y=Drawables.Text.ALIGN_Y_CENTER, rotate=90)
+        self._decorations = None
+
+    def set_level_of_detail(self, level_of_detail):
+        """
+        Set how large datasets are reduced before being drawn.  With a reduction, the cost of drawing a dataset depends
+        on the width of the plot instead of the number of data points.
+        :param level_of_detail: One of the options in LevelOfDetail
+        :return: None
+        """
+        assert level_of_detail in (LevelOfDetail.NONE, LevelOfDetail.MIN_MAX, LevelOfDetail.LTTB)
+
+        self._level_of_detail = level_of_detail
+        self._reduced_cache = {}
+
+    def _reduced_data(self, dataset):
+        """
+        Internal function that gets the data of a dataset that actually needs to be drawn (refer to LevelOfDetail).  The
+        reduced data is cached until the dataset gets new data or the x bounds or plot width change (for interactive
+        graphs, until the x bounds are zoomed or panned outside of what was reduced).  Function datasets
+        are sampled for the current bounds instead and datasets with a pyramid are reduced from it (refer to
+        Line.set_pyramid).  With a time axis, only the data points within the x bounds are drawn.
+        :param dataset: The dataset (from self._frame_datasets)
+        :return: Tuple of x values and y values
+        """
+        columns = int(self._plot["width"])
+        if isinstance(dataset, Datasets.FunctionDataset):
+            return dataset.sample(self._axis["x_min"], self._axis["x_max"], columns, self._axis["y_min"],
+                                  self._axis["y_max"], int(self._plot["height"]))
+        if self._level_of_detail == LevelOfDetail.NONE or columns <= 0 or len(dataset) <= 4 * columns:
+            if self._time_axis["enabled"]:
+                return self._visible_data(dataset, self._axis["x_min"], self._axis["x_max"])
+            return dataset.xs, dataset.ys
+
+        # The cache is good as long as it was reduced at the same scale and covers the bounds
+        x_min, x_max = self._axis["x_min"], self._axis["x_max"]
+        key = (dataset.version, self._level_of_detail, columns)
+        cached = self._reduced_cache.get(id(dataset))
+        if cached is not None and cached["dataset"] is dataset and cached["key"] == key and \
+                abs(cached["span"] - (x_max - x_min)) <= 1e-9 * (x_max - x_min) and \
+                cached["x_min"] <= x_min and x_max <= cached["x_max"]:
+            return cached["xs"], cached["ys"]
+
+        span = x_max - x_min
+        if self._interaction is not None:
+            # Also reduce one plot width on each side so that panning doesn't need to reduce the data again
+            x_min, x_max, columns = x_min - span, x_max + span, 3 * columns
+
+        if self._level_of_detail == LevelOfDetail.MIN_MAX and dataset.pyramid is not None:
+            xs, ys = dataset.pyramid.min_max(dataset.xs, dataset.ys, x_min, x_max, columns)
+        elif self._level_of_detail == LevelOfDetail.MIN_MAX:
+            xs, ys = Decimation.min_max(dataset.xs, dataset.ys, x_min, x_max, columns)
+        else:
+            xs, ys = self._visible_data(dataset, x_min, x_max)
+            xs, ys = Decimation.lttb(xs, ys, max(2 * columns, 3))
+
+        # Forget about the datasets that aren't drawn anymore
+        if len(self._reduced_cache) > len(self._frame_datasets):
+            drawn = set(id(d) for d in self._frame_datasets)
+            self._reduced_cache = {k: v for k, v in self._reduced_cache.items() if k in drawn}
+
+        self._reduced_cache[id(dataset)] = {"dataset": dataset, "key": key, "span": span, "x_min": x_min,
+                                            "x_max": x_max, "xs": xs, "ys": ys}
+        return xs, ys
+
+    @staticmethod
+    def _visible_data(dataset, x_min, x_max):
+        """
+        Internal function that gets the data points of a dataset (with increasing x values) that are between x_min and
+        x_max, plus one on each side.  They are found with a binary search so this doesn't look at the rest of the data.
+        Don't hold on to the result; with numpy, they are views of the current snapshot.
+        :param dataset: The dataset
+        :param x_min: Minimum x value
+        :param x_max: Maximum x value
+        :return: Tuple of x values and y values
+        """
+        start, stop = Decimation.visible_range(dataset.xs, x_min, x_max)
+        if numpy is not None:
+            return Datasets.float_array(dataset.xs)[start:stop], Datasets.float_array(dataset.ys)[start:stop]
+        return dataset.xs[start:stop], dataset.ys[start:stop]
+
+    def set_auto_range(self, x_mode=AutoRange.OFF, y_mode=AutoRange.OFF, x_pixels_per_tick=40, y_pixels_per_tick=25):
+        """
+        Make the bounds of the axes follow the data.  Every frame, the bounds are picked so that all of the data fits,
+        rounded out to "nice" tick intervals (1, 2, or 5 times a power of 10) with about one tick every x_pixels_per_tick
+        or y_pixels_per_tick pixels.  The smallest and largest values are kept track of as the data comes in (in O(1)
+        amortized time per data point, even when old data points get evicted), and the axes are only regenerated when
+        the rounded bounds actually change.
+        :param x_mode: One of the options in AutoRange for the x axis
+        :param y_mode: One of the options in AutoRange for the y axis
+        :param x_pixels_per_tick: About how many pixels there should be between x ticks
+        :param y_pixels_per_tick: About how many pixels there should be between y ticks
+        :return: None
+        """
+        assert x_mode in (AutoRange.OFF, AutoRange.FIT, AutoRange.GROW)
+        assert y_mode in (AutoRange.OFF, AutoRange.FIT, AutoRange.GROW)
+        assert isinstance(x_pixels_per_tick, int) and x_pixels_per_tick > 0
+        assert isinstance(y_pixels_per_tick, int) and y_pixels_per_tick > 0
+
+        self._auto_range = {"x": x_mode, "y": y_mode, "x_pixels_per_tick": x_pixels_per_tick,
+                            "y_pixels_per_tick": y_pixels_per_tick}
+
+    @staticmethod
+    def nice_bounds(low, high, max_ticks):
+        """
+        Round bounds out to a "nice" tick interval (1, 2, or 5 times a power of 10).
+        :param low: Smallest value that needs to fit
+        :param high: Largest value that needs to fit
+        :param max_ticks: Maximum number of tick intervals between the bounds
+        :return: Tuple of the minimum, maximum, and interval (ints if the interval is a whole number)
+        """
+        assert low <= high and isinstance(max_ticks, int) and max_ticks > 0
+
+        if low == high:
+            low, high = low - max(abs(low) * 0.1, 1), high + max(abs(high) * 0.1, 1)
+
+        raw_interval = (high - low) / float(max_ticks)
+        magnitude = 10.0 ** math.floor(math.log10(raw_interval))
+        interval = 10 * magnitude
+        for step in (1, 2, 5):
+            if step * magnitude >= raw_interval:
+                interval = step * magnitude
+                break
+
+        low = math.floor(low / interval) * interval
+        high = math.ceil(high / interval) * interval
+        if interval >= 1:
+            return int(round(low)), int(round(high)), int(round(interval))
+
+        digits = -int(math.floor(math.log10(interval)))
+        return round(low, digits), round(high, digits), round(interval, digits)
+
+    def set_time_axis(self, enabled=True, utc=False, pixels_per_tick=60):
+        """
+        Turn the x axis into a time axis: the x values are timestamps (seconds since the epoch, like time.time()) and
+        must be increasing.  The x ticks are put on whole seconds, minutes, hours, or days (picked from TIME_INTERVALS
+        so that there is about one tick every pixels_per_tick pixels) and labeled with the time of day (or the date at
+        midnight).  Since the timestamps are sorted, only the data points within the x bounds are looked at when
+        drawing (they are found with a binary search).
+        :param enabled: Turn the time axis on or off
+        :param utc: Show UTC times instead of local times?
+        :param pixels_per_tick: About how many pixels there should be between x ticks
+        :return: None
+        """
+        assert isinstance(enabled, bool) and isinstance(utc, bool)
+        assert isinstance(pixels_per_tick, int) and pixels_per_tick > 0
+
+        self._time_axis["enabled"] = enabled
+        self._time_axis["utc"] = utc
+        self._time_axis["pixels_per_tick"] = pixels_per_tick
+        self._reduced_cache = {}
+        self.set_bounds(x_interval=self._x_interval(self._axis["x_min"], self._axis["x_max"]))
+
+    def set_time_window(self, seconds, follow_clock=False):
+        """
+        Only show the last seconds of data (i.e. the last 10 minutes): every frame, the x bounds are moved so that the
+        newest timestamp (or the current time with follow_clock) is at the right edge of the plot.  The bounds move in
+        whole pixels and the x ticks stay on multiples of the tick interval, so the tick marks are just moved along and
+        the axes are only regenerated when a tick scrolls in or out of the plot.  This is meant to be used with
+        set_time_axis but works for any increasing x values.
+        :param seconds: How much time to show (or None to stop following the data)
+        :param follow_clock: Follow time.time() instead of the newest timestamp (so the plot keeps moving when no new
+                    data comes in)?
+        :return: None
+        """
+        assert seconds is None or ((isinstance(seconds, int) or isinstance(seconds, float)) and seconds > 0)
+        assert isinstance(follow_clock, bool)
+
+        self._time_axis["window"] = seconds
+        self._time_axis["follow_clock"] = follow_clock
+
+    @staticmethod
+    def nice_time_bounds(low, high, max_ticks):
+        """
+        Same as nice_bounds but for a time axis: the interval is picked from TIME_INTERVALS (or is a nice number of days
+        if none of them is large enough).
+        :param low: Smallest timestamp that needs to fit
+        :param high: Largest timestamp that needs to fit
+        :param max_ticks: Maximum number of tick intervals between the bounds
+        :return: Tuple of the minimum, maximum, and interval (in seconds)
+        """
+        assert low <= high and isinstance(max_ticks, int) and max_ticks > 0
+
+        if low == high:
+            low, high = low - 1, high + 1
+
+        raw_interval = (high - low) / float(max_ticks)
+        for interval in Graph.TIME_INTERVALS:
+            if interval >= raw_interval:
+                break
+        else:
+            interval = Graph.nice_bounds(0, raw_interval / 86400.0, 1)[2] * 86400
+
+        return math.floor(low / interval) * interval, math.ceil(high / interval) * interval, interval
+
+    def _x_interval(self, low, high):
+        """
+        Internal function that picks a tick interval for x bounds that aren't rounded to it (i.e. after zooming).
+        :param low: Minimum x value
+        :param high: Maximum x value
+        :return: The interval
+        """
+        if self._time_axis["enabled"]:
+            max_ticks = max(int(self._plot["width"] // self._time_axis["pixels_per_tick"]), 1)
+            return Graph.nice_time_bounds(low, high, max_ticks)[2]
+
+        max_ticks = max(int(self._plot["width"] // self._auto_range["x_pixels_per_tick"]), 1)
+        return Graph.nice_bounds(low, high, max_ticks)[2]
+
+    def _x_tick_label(self, value, interval):
+        """
+        Internal function that gets the label of a x tick (refer to set_time_axis).
+        :param value: The value of the tick
+        :param interval: The tick interval
+        :return: The label
+        """
+        if not self._time_axis["enabled"]:
+            return str(value)
+
+        moment = time.gmtime(value) if self._time_axis["utc"] else time.localtime(value)
+        if interval >= 86400 or (moment.tm_hour == 0 and moment.tm_min == 0 and moment.tm_sec == 0):
+            return time.strftime("%b %d", moment)
+        if interval < 60:
+            return time.strftime("%H:%M:%S", moment)
+        return time.strftime("%H:%M", moment)
+
+    def _publish_datasets(self):
+        """
+        Internal function called once per frame before drawing the data.  This swaps in the newest snapshot of every
+        dataset so the data can be drawn while data sources keep adding data.  With a time window or auto range, the
+        bounds are updated too (before the axes are drawn).
+        :return: None
+        """
+        self._frame_datasets = list(self.datasets.values())
+        for dataset in self._frame_datasets:
+            dataset.publish()
+
+        if self._time_axis["window"] is not None:
+            self._update_time_window()
+
+        if self._auto_range["x"] != AutoRange.OFF or self._auto_range["y"] != AutoRange.OFF:
+            self._update_auto_range()
+
+    def _visible_y_extrema(self, dataset):
+        """
+        Internal function that gets the smallest and largest finite y values of the data points within the x bounds (used
+        by auto range with a time window).
+        :param dataset: The dataset
+        :return: Tuple of y_min and y_max (both None if there are no finite values)
+        """
+        xs, ys = Graph._visible_data(dataset, self._axis["x_min"], self._axis["x_max"])
+        if numpy is not None:
+            ys = ys[numpy.isfinite(ys)]
+            if len(ys) == 0:
+                return None, None
+            return float(ys.min()), float(ys.max())
+
+        ys = [y for y in ys if not math.isinf(y) and not math.isnan(y)]
+        if len(ys) == 0:
+            return None, None
+        return min(ys), max(ys)
+
+    def _update_time_window(self):
+        """
+        Internal function that moves the x bounds so that the newest data is at the right edge (refer to
+        set_time_window).  Only the newest timestamp of every dataset is looked at.
+        :return: None
+        """
+        window = self._time_axis["window"]
+        if self._time_axis["follow_clock"]:
+            newest = time.time()
+        else:
+            newest = None
+            for dataset in self._frame_datasets:
+                if isinstance(dataset, Datasets.FunctionDataset) or len(dataset) == 0:
+                    continue
+                if newest is None or dataset.xs[-1] > newest:
+                    newest = dataset.xs[-1]
+            if newest is None:
+                return
+
+        # The right edge only moves in whole pixels (and the axes are only regenerated when other ticks show up)
+        x_per_pixel = window / float(self._plot["width"])
+        x_max = math.ceil(newest / x_per_pixel) * x_per_pixel
+        if x_max != self._axis["x_max"] or x_max - window != self._axis["x_min"]:
+            self._scroll_x_bounds(x_max - window, x_max, self._x_interval(x_max - window, x_max))
+
+    def _update_auto_range(self):
+        """
+        Internal function that updates the bounds so that the data of the current frame fits (refer to set_auto_range).
+        :return: None
+        """
+        extents = {"x": [None, None], "y": [None, None]}
+        for dataset in self._frame_datasets:
+            if self._time_axis["window"] is not None and not isinstance(dataset, Datasets.FunctionDataset):
+                # Only fit the data in the time window (the x bounds are set by the time window)
+                x_min, x_max, y_min, y_max = (None, None) + self._visible_y_extrema(dataset)
+            else:
+                x_min, x_max, y_min, y_max = dataset.extrema()
+            for axis, low, high in (("x", x_min, x_max), ("y", y_min, y_max)):
+                if low is not None and (extents[axis][0] is None or low < extents[axis][0]):
+                    extents[axis][0] = low
+                if high is not None and (extents[axis][1] is None or high > extents[axis][1]):
+                    extents[axis][1] = high
+
+        bounds = {}
+        for axis, size in (("x", "width"), ("y", "height")):
+            low, high = extents[axis]
+            if self._auto_range[axis] == AutoRange.OFF or low is None:
+                continue
+
+            if self._auto_range[axis] == AutoRange.GROW:
+                low = min(low, self._axis[axis + "_min"])
+                high = max(high, self._axis[axis + "_max"])
+
+            if axis == "x" and self._time_axis["enabled"]:
+                max_ticks = max(int(self._plot[size] // self._time_axis["pixels_per_tick"]), 1)
+                new_min, new_max, interval = Graph.nice_time_bounds(low, high, max_ticks)
+            else:
+                max_ticks = max(int(self._plot[size] // self._auto_range[axis + "_pixels_per_tick"]), 1)
+                new_min, new_max, interval = Graph.nice_bounds(low, high, max_ticks)
+            if (new_min, new_max, interval) != (self._axis[axis + "_min"], self._axis[axis + "_max"],
+                                                self._axis[axis + "_interval"]):
+                bounds[axis + "_min"], bounds[axis + "_max"], bounds[axis + "_interval"] = new_min, new_max, interval
+
+        # Only regenerate the axes when the rounded bounds actually changed
+        if len(bounds) > 0:
+            self.set_bounds(**bounds)
+
+    def set_interactive(self, interactive=True, zoom_factor=2.0, zoom_in_pin=None, zoom_out_pin=None, reset_pin=None):
+        """
+        Let the bounds be changed by touch inside of the plot area: dragging pans, a double tap zooms in around the tap,
+        and a long press zooms out around the press.  Physical buttons can zoom in and out around the center of the
+        plot and reset the view.  While zoomed or panned, auto range is paused; reset_view goes back to the bounds (and
+        auto range) from before.  The bounds only change once per frame no matter how many touch events come in, and
+        the data drawn is reduced for one plot width on each side of the bounds as well so that panning reuses it.
+        Call this before the page with the graph is enabled.
+        :param interactive: Turn zooming and panning on or off
+        :param zoom_factor: How much one zoom step zooms in or out
+        :param zoom_in_pin: Optional GPIO pin of a button that zooms in
+        :param zoom_out_pin: Optional GPIO pin of a button that zooms out
+        :param reset_pin: Optional GPIO pin of a button that resets the view (refer to reset_view)
+        :return: None
+        """
+        assert (isinstance(zoom_factor, int) or isinstance(zoom_factor, float)) and zoom_factor > 1
+
+        if not interactive:
+            self.reset_view()
+            self._interaction = None
+            return
+
+        # home is what reset_view goes back to, drag is the touch that is panning, and pending is the next bounds
+        self._interaction = {"zoom_factor": zoom_factor, "pins": {zoom_in_pin: 1.0 / zoom_factor,
+                             zoom_out_pin: float(zoom_factor), reset_pin: None}, "home": None, "drag": None,
+                             "last_tap": None, "pending": None}
+        self._interaction["pins"].pop(None, None)
+        self._reduced_cache = {}
+
+    def reset_view(self):
+        """
+        Undo zooming and panning: go back to the bounds from before and turn auto range back on if it was on (so with
+        auto range, this fits the data again).
+        :return: None
+        """
+        if self._interaction is None or self._interaction["home"] is None:
+            return
+
+        home = self._interaction["home"]
+        self._interaction["home"] = None
+        self._interaction["pending"] = None
+        self._auto_range["x"], self._auto_range["y"] = home["auto_range"]
+        self._time_axis["window"] = home["time_window"]
+        self._axis["aligned_ticks"] = False
+        self.set_bounds(**home["bounds"])
+
+    def zoom(self, factor, x_value=None, y_value=None):
+        """
+        Zoom around a point (the point stays where it is on the screen).  The bounds change at the next frame.
+        :param factor: How much the bounds are scaled (less than 1 zooms in and more than 1 zooms out)
+        :param x_value: x value to zoom around (defaults to the middle of the x axis)
+        :param y_value: y value to zoom around (defaults to the middle of the y axis)
+        :return: None
+        """
+        assert factor > 0
+        assert self._interaction is not None
+
+        x_min, x_max, y_min, y_max = self._view_bounds()
+        x_value = (x_min + x_max) / 2.0 if x_value is None else x_value
+        y_value = (y_min + y_max) / 2.0 if y_value is None else y_value
+        self._set_view(x_value - (x_value - x_min) * factor, x_value + (x_max - x_value) * factor,
+                       y_value - (y_value - y_min) * factor, y_value + (y_max - y_value) * factor)
+
+    def enable(self, event_handler):
+        """
+        Enable the graph (if interactive, register for the touch events and button events; refer to set_interactive)
+        :param event_handler: The event handler that handles all events
+        :return: None
+        """
+        super().enable(event_handler)
+        if self._interaction is not None:
+            event_handler.register_event(self, Events.EventTypes.TOUCH_MOVEMENT, self._touch_movement_callback)
+            event_handler.register_event(self, Events.EventTypes.TOUCH_DRAG, self._touch_drag_callback)
+            event_handler.register_event(self, Events.EventTypes.BUTTON_UP, self._button_up_callback)
+
+    def disable(self, event_handler):
+        """
+        Disable the graph (unregister the events that enable registered)
+        :param event_handler: The event handler that handles all events
+        :return: None
+        """
+        super().disable(event_handler)
+        if self._interaction is not None:
+            event_handler.unregister_event(self, Events.EventTypes.TOUCH_MOVEMENT)
+            event_handler.unregister_event(self, Events.EventTypes.TOUCH_DRAG)
+            event_handler.unregister_event(self, Events.EventTypes.BUTTON_UP)
+
+    def position_inside(self, position):
+        """
+        If interactive, the plot area counts as inside the graph (so dragging there pans the graph instead of scrolling
+        the page).
+        :param position: (x, y) coordinate
+        :return: True if interactive and position is inside the plot area, False otherwise
+        """
+        if self._interaction is None:
+            return False
+
+        left, top, right, bottom = self._plot_rect()
+        return left <= position[0] <= right and top <= position[1] <= bottom
+
+    def _touch_movement_callback(self, event):
+        """
+        This is registered to the event handler for TOUCH_MOVEMENT events.  Once a touch that started in the plot area
+        moved further than Constants.TOUCH_HOLD_TOLERANCE, the bounds follow the finger.
+        :param event: The TOUCH_MOVEMENT event
+        :return: None
+        """
+        assert isinstance(event, Events.EventTouchMovement)
+        if not self._enabled or not self.position_inside(event.position_start):
+            return
+
+        drag = self._interaction["drag"]
+        if drag is None or drag["start"] != event.position_start:
+            drag = self._interaction["drag"] = {"start": event.position_start, "bounds": self._view_bounds(),
+                                                "panning": False}
+
+        dx = event.position_new[0] - event.position_start[0]
+        dy = event.position_new[1] - event.position_start[1]
+        if not drag["panning"] and abs(dx) <= Constants.TOUCH_HOLD_TOLERANCE and abs(dy) <= Constants.TOUCH_HOLD_TOLERANCE:
+            return
+        drag["panning"] = True
+
+        # Dragging to the right shows smaller x values and dragging down shows larger y values
+        x_min, x_max, y_min, y_max = drag["bounds"]
+        x_shift = -dx * (x_max - x_min) / float(self._plot["width"])
+        y_shift = dy * (y_max - y_min) / float(self._plot["height"])
+        self._set_view(x_min + x_shift, x_max + x_shift, y_min + y_shift, y_max + y_shift)
+
+    def _touch_drag_callback(self, event):
+        """
+        This is registered to the event handler for TOUCH_DRAG events (which come in when the finger is lifted).  A tap
+        in the plot area right after another one zooms in and a long press zooms out.
+        :param event: The TOUCH_DRAG event
+        :return: None
+        """
+        assert isinstance(event, Events.EventTouchDrag)
+        self._interaction["drag"] = None
+        if not self._enabled or not event.no_movement or not self.position_inside(event.position_start):
+            return
+
+        x_value, y_value = self._position_value(event.position_start)
+        if event.duration >= Constants.LONG_PRESS_DURATION:
+            self._interaction["last_tap"] = None
+            self.zoom(self._interaction["zoom_factor"], x_value, y_value)
+            return
+
+        now = time.time()
+        last_tap = self._interaction["last_tap"]
+        if last_tap is not None and now - last_tap[0] <= Constants.DOUBLE_TAP_INTERVAL and \
+                abs(event.position_start[0] - last_tap[1][0]) <= Constants.TOUCH_HOLD_TOLERANCE and \
+                abs(event.position_start[1] - last_tap[1][1]) <= Constants.TOUCH_HOLD_TOLERANCE:
+            self._interaction["last_tap"] = None
+            self.zoom(1.0 / self._interaction["zoom_factor"], x_value, y_value)
+        else:
+            self._interaction["last_tap"] = (now, event.position_start)
+
+    def _button_up_callback(self, event):
+        """
+        This is registered to the event handler for BUTTON_UP events (refer to the pins of set_interactive).
+        :param event: The BUTTON_UP event
+        :return: None
+        """
+        assert isinstance(event, Events.EventButtonUp)
+        if not self._enabled or event.pin not in self._interaction["pins"]:
+            return
+
+        factor = self._interaction["pins"][event.pin]
+        if factor is None:
+            self.reset_view()
+        else:
+            self.zoom(factor)
+
+    def _position_value(self, position):
+        """
+        Internal calculation.  The opposite of _datum_position: the x and y value at a position on the screen.
+        :param position: (x, y) coordinate
+        :return: Tuple of the x value and the y value
+        """
+        left, top, right, bottom = self._plot_rect()
+        x_min, x_max, y_min, y_max = self._view_bounds()
+        return (x_min + (position[0] - left) * (x_max - x_min) / float(right - left),
+                y_min + (bottom - position[1]) * (y_max - y_min) / float(bottom - top))
+
+    def _view_bounds(self):
+        """
+        Internal function that gets the bounds that will be shown at the next frame (the pending bounds if the view was
+        changed since the last frame).
+        :return: Tuple of x_min, x_max, y_min, y_max
+        """
+        pending = self._interaction["pending"] if self._interaction is not None else None
+        if pending is not None:
+            return pending
+        return self._axis["x_min"], self._axis["x_max"], self._axis["y_min"], self._axis["y_max"]
+
+    def _set_view(self, x_min, x_max, y_min, y_max):
+        """
+        Internal function that changes the bounds at the next frame because of zooming or panning.  The first change
+        remembers the bounds, auto range, and time window from before for reset_view and pauses them.
+        :param x_min: New minimum x value
+        :param x_max: New maximum x value
+        :param y_min: New minimum y value
+        :param y_max: New maximum y value
+        :return: None
+        """
+        interaction = self._interaction
+        if not (x_max > x_min and y_max > y_min):
+            # Zoomed in further than floats can tell apart
+            return
+        if interaction["home"] is None:
+            interaction["home"] = {"bounds": {key: self._axis[key] for key in ("x_min", "x_max", "x_interval", "y_min",
+                                                                               "y_max", "y_interval")},
+                                   "auto_range": (self._auto_range["x"], self._auto_range["y"]),
+                                   "time_window": self._time_axis["window"]}
+            self._auto_range["x"] = self._auto_range["y"] = AutoRange.OFF
+            self._time_axis["window"] = None
+        interaction["pending"] = (x_min, x_max, y_min, y_max)
+
+    def _apply_view(self):
+        """
+        Internal function that sets the pending bounds from zooming or panning (called once per frame).  The tick
+        intervals are picked like auto range does so that there are about as many ticks at any zoom.
+        :return: None
+        """
+        x_min, x_max, y_min, y_max = self._interaction["pending"]
+        self._interaction["pending"] = None
+
+        y_ticks = max(int(self._plot["height"] // self._auto_range["y_pixels_per_tick"]), 1)
+        self._axis["aligned_ticks"] = True
+        self.set_bounds(x_min=x_min, x_max=x_max, x_interval=self._x_interval(x_min, x_max),
+                        y_min=y_min, y_max=y_max, y_interval=Graph.nice_bounds(y_min, y_max, y_ticks)[2])
 
     def _datum_position(self, x_value, y_value):
         """
@@ -394,16 +1092,142 @@ class Graph(Drawables.Drawable):
         assert isinstance(x_value, int) or isinstance(x_value, float)
         assert isinstance(y_value, int) or isinstance(y_value, float)
 
+        left, top, right, bottom = self._plot_rect()
+
         x = None
         if self._axis["x_min"] <= x_value <= self._axis["x_max"]:
-            x = int(self._axis["y_axis_x"] + x_value * (self._plot["width"] / abs(self._axis["x_max"] - self._axis["x_min"])))
+            x = int(left + (x_value - self._axis["x_min"]) * ((right - left) / (self._axis["x_max"] - self._axis["x_min"])))
 
         y = None
         if self._axis["y_min"] <= y_value <= self._axis["y_max"]:
-            y = int(self._axis["x_axis_y"] - y_value * (self._plot["height"] / abs(self._axis["y_max"] - self._axis["y_min"])))
+            y = int(bottom - (y_value - self._axis["y_min"]) * ((bottom - top) / (self._axis["y_max"] - self._axis["y_min"])))
 
         return x, y
 
+    def _data_positions(self, xs, ys):
+        """
+        Internal calculation.  Vectorized version of _datum_position: calculate the positions on the graph of all of the
+        data points in one pass.  Unlike _datum_position, positions outside of the plot area are also calculated.
+        :param xs: The x values (list, array.array, or numpy array)
+        :param ys: The y values (list, array.array, or numpy array)
+        :return: Tuple of the x coordinates and the y coordinates (floats; numpy arrays if numpy is installed and lists
+                    otherwise)
+        """
+        left, top, right, bottom = self._plot_rect()
+        x_min = self._axis["x_min"]
+        y_min = self._axis["y_min"]
+        x_scale = (right - left) / float(self._axis["x_max"] - x_min)
+        y_scale = (bottom - top) / float(self._axis["y_max"] - y_min)
+
+        if numpy is not None:
+            return (Datasets.float_array(xs) - x_min) * x_scale + left, bottom - (Datasets.float_array(ys) - y_min) * y_scale
+
+        return [left + (x - x_min) * x_scale for x in xs], [bottom - (y - y_min) * y_scale for y in ys]
+
+    def _clip_polyline(self, pxs, pys):
+        """
+        Internal calculation.  Clip the line going through all of the given positions to the plot area (Liang-Barsky).
+        Segments that leave the plot area are cut off at its edge instead of being dropped.
+        :param pxs: The x coordinates of the points of the line (from _data_positions)
+        :param pys: The y coordinates of the points of the line (from _data_positions)
+        :return: List of runs; each run is a list of (x, y) positions that can be drawn with one pygame.draw.lines
+        """
+        left, top, right, bottom = self._plot_rect()
+        if len(pxs) < 2:
+            return []
+
+        if numpy is None:
+            runs = []
+            run = None
+            for i in range(len(pxs) - 1):
+                x0, y0 = pxs[i], pys[i]
+                dx, dy = pxs[i + 1] - x0, pys[i + 1] - y0
+                clipped = Graph._clip_segment(x0, y0, dx, dy, left, top, right, bottom)
+                if clipped is None:
+                    run = None
+                    continue
+
+                t0, t1 = clipped
+                if run is None or t0 > 0:
+                    run = [(x0 + t0 * dx, y0 + t0 * dy)]
+                    runs.append(run)
+                run.append((x0 + t1 * dx, y0 + t1 * dy))
+                if t1 < 1:
+                    run = None
+            return runs
+
+        x0, y0 = pxs[:-1], pys[:-1]
+        dx, dy = pxs[1:] - x0, pys[1:] - y0
+        t0 = numpy.zeros(len(dx))
+        t1 = numpy.ones(len(dx))
+        visible = numpy.isfinite(dx) & numpy.isfinite(dy)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            for p, q in ((-dx, x0 - left), (dx, right - x0), (-dy, y0 - top), (dy, bottom - y0)):
+                ratio = q / p
+                visible &= (p != 0) | (q >= 0)
+                t0 = numpy.where(p < 0, numpy.maximum(t0, ratio), t0)
+                t1 = numpy.where(p > 0, numpy.minimum(t1, ratio), t1)
+        visible &= t0 <= t1
+
+        # Segments that are next to each other are drawn in the same run unless they were cut at the point they share
+        connected = visible[:-1] & visible[1:] & (t1[:-1] == 1) & (t0[1:] == 0)
+        run_starts = visible.copy()
+        run_starts[1:] &= ~connected
+        run_ends = visible.copy()
+        run_ends[:-1] &= ~connected
+
+        start_xs, start_ys = x0 + t0 * dx, y0 + t0 * dy
+        end_xs, end_ys = x0 + t1 * dx, y0 + t1 * dy
+        runs = []
+        for a, b in zip(numpy.flatnonzero(run_starts).tolist(), numpy.flatnonzero(run_ends).tolist()):
+            run = [(float(start_xs[a]), float(start_ys[a]))]
+            run.extend(zip(end_xs[a:b + 1].tolist(), end_ys[a:b + 1].tolist()))
+            runs.append(run)
+        return runs
+
+    def _draw_polyline(self, surface, color, pxs, pys):
+        """
+        Internal function that draws the line going through the given positions (clipped to the plot area) with as few
+        pygame.draw.lines calls as possible (just one if all of the points are inside of the plot area).
+        :param surface: The surface onto which the line should be drawn
+        :param color: Color of the line
+        :param pxs: The x coordinates of the points of the line (from _data_positions)
+        :param pys: The y coordinates of the points of the line (from _data_positions)
+        :return: None
+        """
+        for run in self._clip_polyline(pxs, pys):
+            pygame.draw.lines(surface, color, False, run)
+
+    def _plot_rect(self):
+        """
+        Internal calculation for the edges of the plot area.
+        :return: Tuple of left, top, right, bottom
+        """
+        left = self.x + self._plot["offset_x"]
+        top = self.y + self._plot["offset_y"]
+        return left, top, left + self._plot["width"], top + self._plot["height"]
+
+    @staticmethod
+    def _clip_segment(x0, y0, dx, dy, left, top, right, bottom):
+        """
+        Internal calculation.  Clip a single segment going from (x0, y0) to (x0 + dx, y0 + dy) to a rectangle.
+        :return: Tuple of where the visible part of the segment starts and ends (as fractions of the segment) or None if
+                    no part of the segment is visible
+        """
+        if not (abs(dx) < math.inf and abs(dy) < math.inf):
+            return None
+
+        t0, t1 = 0.0, 1.0
+        for p, q in ((-dx, x0 - left), (dx, right - x0), (-dy, y0 - top), (dy, bottom - y0)):
+            if p == 0:
+                if q < 0:
+                    return None
+            elif p < 0:
+                t0 = max(t0, q / p)
+            else:
+                t1 = min(t1, q / p)
+        return (t0, t1) if t0 <= t1 else None
+
     def _axis_value_calculate(self):
         """
         Internal calculation for getting some axes values.
@@ -440,7 +1264,7 @@ class Scatter(Graph):
     def __init__(self, x, y, width, height, connect_points=False):
         """
         Create a scatter plot.  Note that if connect_points=True and if a data point is not within the x bounds or y
-        bounds, the line to and from this point will not be drawn.
+        bounds, the lines to and from this point are cut off at the edge of the plot area.
         :param x: The x coordinate of the top left corner of the graph
         :param y: The y coordinate of the top left corner of the graph
         :param width: The width of the graph
@@ -452,6 +1276,19 @@ class Scatter(Graph):
         assert isinstance(connect_points, bool)
 
         self._connect_points = connect_points
+        self._point_rendering = {"mode": PointRendering.PIXELS, "min_points": 1000}
+
+    def set_point_rendering(self, mode, min_points=1000):
+        """
+        Set how the data points are drawn (refer to PointRendering).
+        :param mode: One of the options in PointRendering
+        :param min_points: Datasets with fewer data points in the plot area than this are drawn with circles anyways
+        :return: None
+        """
+        assert mode in (PointRendering.CIRCLES, PointRendering.PIXELS, PointRendering.DENSITY)
+        assert isinstance(min_points, int) and min_points >= 0
+
+        self._point_rendering = {"mode": mode, "min_points": min_points}
 
     def draw(self, surface):
         """
@@ -462,36 +1299,112 @@ class Scatter(Graph):
         super().draw(surface)
 
         # Draw datapoints
-        for dataset_name in self.datasets:
-            color = self.datasets[dataset_name]["color"]
-            data_x = self.datasets[dataset_name]["xs"]
-            data_y = self.datasets[dataset_name]["ys"]
+        left, top, right, bottom = self._plot_rect()
+        for dataset in self._frame_datasets:
+            pxs, pys = self._data_positions(*self._reduced_data(dataset))
+
+            if self._connect_points:
+                self._draw_polyline(surface, dataset.color, pxs, pys)
+
+            if numpy is not None:
+                inside = numpy.flatnonzero((left <= pxs) & (pxs <= right) & (top <= pys) & (pys <= bottom))
+                if self._point_rendering["mode"] != PointRendering.CIRCLES and \
+                        len(inside) >= self._point_rendering["min_points"] and \
+                        self._draw_pixels(surface, dataset.color, pxs[inside], pys[inside]):
+                    continue
+                points = zip(pxs[inside].tolist(), pys[inside].tolist())
+            else:
+                points = [(x, y) for x, y in zip(pxs, pys) if left <= x <= right and top <= y <= bottom]
+            for point in points:
+                pygame.draw.circle(surface, dataset.color, point, 1)
+
+    def _draw_pixels(self, surface, color, pxs, pys):
+        """
+        Internal function that writes data points straight into the pixels of the surface (refer to PointRendering).
+        Every data point covers the same 2x2 pixels that pygame.draw.circle with a radius of 1 would.
+        :param surface: The surface onto which the graph should be drawn
+        :param color: Color of the dataset
+        :param pxs: The x coordinates of the data points (numpy array; all inside of the plot area)
+        :param pys: The y coordinates of the data points (numpy array; all inside of the plot area)
+        :return: True if the data points were drawn or False if the pixels of the surface can't be accessed directly
+        """
+        try:
+            pixels = pygame.surfarray.pixels3d(surface)
+        except (ValueError, pygame.error):
+            return False
 
-            for i, (x_value, y_value, next_x, next_y) in enumerate(zip(data_x, data_y, data_x[1:], data_y[1:])):
-                x, y = self._datum_position(x_value, y_value)
-                x2, y2 = self._datum_position(next_x, next_y)
+        width, height = surface.get_size()
+        xs = pxs.astype(numpy.intp)
+        ys = pys.astype(numpy.intp)
 
-                if x is not None and y is not None and x2 is not None and y2 is not None:
-                    pygame.draw.line(surface,color,(x,y), (x2,y2))
+        if self._point_rendering["mode"] == PointRendering.PIXELS:
+            for dx, dy in ((-1, -1), (-1, 0), (0, -1), (0, 0)):
+                x, y = xs + dx, ys + dy
+                valid = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+                pixels[x[valid], y[valid]] = color[:3]
+            del pixels
+            return True
 
-                if i == 0 and x is not None and y is not None:
-                    pygame.draw.circle(surface, color, (x, y), 1)
-                if x2 is not None and y2 is not None:
-                    pygame.draw.circle(surface, color, (x2, y2), 1)
+        # Count the data points on every pixel of the area they can be in
+        x_min, y_min = max(int(xs.min()) - 1, 0), max(int(ys.min()) - 1, 0)
+        x_max, y_max = min(int(xs.max()) + 1, width), min(int(ys.max()) + 1, height)
+        area_width, area_height = x_max - x_min, y_max - y_min
+        counts = numpy.zeros(area_width * area_height, dtype=numpy.int64)
+        for dx, dy in ((-1, -1), (-1, 0), (0, -1), (0, 0)):
+            x, y = xs + dx - x_min, ys + dy - y_min
+            valid = (x >= 0) & (x < area_width) & (y >= 0) & (y < area_height)
+            counts += numpy.bincount(x[valid] * area_height + y[valid], minlength=area_width * area_height)
+        counts = counts.reshape((area_width, area_height))
+
+        # Shade from a dark version of the color (few) through the color to white (the most)
+        covered = counts > 0
+        shade = numpy.log1p(counts[covered]) / numpy.log1p(counts.max())
+        base = numpy.array(color[:3], dtype=numpy.float64)
+        shaded = base * (0.25 + 0.75 * numpy.minimum(2 * shade, 1))[:, None] + \
+            (255 - base) * numpy.maximum(2 * shade - 1, 0)[:, None]
+        pixels[x_min:x_max, y_min:y_max][covered] = numpy.clip(shaded, 0, 255).astype(numpy.uint8)
+        del pixels
+        return True
 
 
 class Line(Graph):
     def __init__(self, x, y, width, height):
         """
-        Create a scatter plot.  Note that if a data point is not within the x bounds or y bounds, the line to and from
-        this point will not be drawn.
+        Create a line graph.  Note that if a data point is not within the x bounds or y bounds, the lines to and from
+        this point are cut off at the edge of the plot area.  Large datasets are reduced with LevelOfDetail.MIN_MAX
+        before being drawn (refer to set_level_of_detail).
         :param x: The x coordinate of the top left corner of the graph
         :param y: The y coordinate of the top left corner of the graph
         :param width: The width of the graph
         :param height: The height of the graph
         """
+        # Strip chart mode (refer to set_strip_chart; set before the plot is created since tick_marks looks at it)
+        self._strip = None
+
         super(Line, self).__init__(x, y, width, height)
 
+        self.set_level_of_detail(LevelOfDetail.MIN_MAX)
+
+    def set_strip_chart(self, x_window):
+        """
+        Turn strip chart mode on or off.  In strip chart mode, the x bounds follow the newest data (the plot always shows
+        the last x_window of x values) and the plot area is kept in its own surface.  Every frame, that surface is
+        shifted left by however many pixels the data advanced and only the new segments are drawn at its right edge,
+        so the cost of a frame depends on the number of new data points and not on how many are shown.  The x values
+        of every dataset must be increasing.  Changing the y bounds or adding/removing datasets redraws everything once.
+        :param x_window: How much of the x axis to show (or None to turn strip chart mode off)
+        :return: None
+        """
+        assert x_window is None or ((isinstance(x_window, int) or isinstance(x_window, float)) and x_window > 0)
+
+        if x_window is None:
+            self._strip = None
+            return
+
+        # x_right is the x value at the right edge of the strip surface; last_drawn maps a dataset to its newest drawn x
+        self._strip = {"x_window": x_window, "surface": None, "key": None, "x_right": None, "scroll": 0,
+                       "last_drawn": {}}
+
     def draw(self, surface):
         """
         Customized draw function.
@@ -500,17 +1413,155 @@ class Line(Graph):
         """
         super().draw(surface)
 
-        # Draw datapoints
-        for dataset_name in self.datasets:
-            color = self.datasets[dataset_name]["color"]
-            data_x = self.datasets[dataset_name]["xs"]
-            data_y = self.datasets[dataset_name]["ys"]
+        if self._strip is not None:
+            self._draw_strip(surface)
+            return
+
+        # Draw datapoints (one pygame.draw.lines per dataset unless parts of the line leave the plot area)
+        for dataset in self._frame_datasets:
+            self._draw_polyline(surface, dataset.color, *self._data_positions(*self._reduced_data(dataset)))
+
+    def _x_scrolls(self):
+        """
+        Refer to Graph._x_scrolls.  The x bounds also scroll in strip chart mode.
+        :return: True if they do and False otherwise
+        """
+        return self._strip is not None or super(Line, self)._x_scrolls()
+
+    def _publish_datasets(self):
+        """
+        Refer to Graph._publish_datasets.  In strip chart mode, this also advances the x bounds (before the axes are
+        drawn) by a whole number of pixels so that the newest data point is at the right edge of the plot.
+        :return: None
+        """
+        super(Line, self)._publish_datasets()
+
+        if self._strip is None:
+            return
+
+        newest = None
+        for dataset in self._frame_datasets:
+            if isinstance(dataset, Datasets.FunctionDataset):
+                continue
+            if len(dataset) > 0 and (newest is None or dataset.xs[-1] > newest):
+                newest = dataset.xs[-1]
+        if newest is None:
+            return
+
+        strip = self._strip
+        x_per_pixel = strip["x_window"] / float(self._plot["width"])
+        if strip["x_right"] is None or newest < strip["x_right"] - strip["x_window"]:
+            strip["x_right"] = newest
+            strip["surface"] = None
+        elif newest > strip["x_right"]:
+            pixels = int(math.ceil((newest - strip["x_right"]) / x_per_pixel))
+            strip["x_right"] += pixels * x_per_pixel
+            strip["scroll"] += pixels
+        else:
+            return
+
+        self._scroll_x_bounds(strip["x_right"] - strip["x_window"], strip["x_right"])
 
-            for x_value, y_value, next_x, next_y in zip(data_x, data_y, data_x[1:], data_y[1:]):
-                x, y = self._datum_position(x_value, y_value)
-                x2, y2 = self._datum_position(next_x, next_y)
-                if x is not None and y is not None and x2 is not None and y2 is not None:
-                    pygame.draw.line(surface,color,(x,y), (x2,y2))
+    def _draw_strip(self, surface):
+        """
+        Internal function that draws the datasets in strip chart mode (refer to set_strip_chart).
+        :param surface: The surface onto which the graph should be drawn
+        :return: None
+        """
+        strip = self._strip
+        left, top, right, bottom = self._plot_rect()
+        width, height = int(self._plot["width"]) + 1, int(self._plot["height"]) + 1
+
+        # Anything that changes where old data points would be drawn means starting over
+        key = (self._axis["y_min"], self._axis["y_max"], width, height, tuple(id(d) for d in self._frame_datasets))
+        if strip["surface"] is None or strip["key"] != key or strip["scroll"] >= width:
+            strip["surface"] = pygame.Surface((width, height), pygame.SRCALPHA)
+            strip["key"] = key
+            strip["last_drawn"] = {}
+        elif strip["scroll"] > 0:
+            strip["surface"].scroll(-strip["scroll"], 0)
+            strip["surface"].fill((0, 0, 0, 0), (width - strip["scroll"], 0, strip["scroll"], height))
+        strip["scroll"] = 0
+
+        functions = []
+        for dataset in self._frame_datasets:
+            if isinstance(dataset, Datasets.FunctionDataset):
+                functions.append(dataset)
+                continue
+            if len(dataset) == 0:
+                continue
+
+            last_drawn = strip["last_drawn"].get(id(dataset))
+            if last_drawn is None:
+                xs, ys = self._reduced_data(dataset)
+            elif dataset.xs[-1] < last_drawn:
+                # The x values went backwards so what was drawn for this dataset is no good anymore
+                strip["surface"] = None
+                return self._draw_strip(surface)
+            else:
+                # Only the segments from the newest drawn data point onwards are new
+                start = max(bisect.bisect_right(dataset.xs, last_drawn) - 1, 0)
+                xs, ys = dataset.xs[start:], dataset.ys[start:]
+
+            pxs, pys = self._data_positions(xs, ys)
+            for run in self._clip_polyline(pxs, pys):
+                pygame.draw.lines(strip["surface"], dataset.color, False, [(x - left, y - top) for x, y in run])
+            strip["last_drawn"][id(dataset)] = dataset.xs[-1]
+
+        surface.blit(strip["surface"], (left, top))
+
+        # Functions aren't data that scrolls by so they are just drawn over the current bounds
+        for dataset in functions:
+            self._draw_polyline(surface, dataset.color, *self._data_positions(*self._reduced_data(dataset)))
+
+    def add_function_dataset(self, name, func, color=Colors.GREEN, vectorized=None, max_depth=4):
+        """
+        Add a dataset that is a function (refer to Datasets.FunctionDataset).  Unlike generate_ys_from_function, the
+        function is evaluated over whatever x range is shown when the graph is drawn (at about one x value per pixel and
+        more where the curve bends sharply), so there is nothing to redo after set_bounds.
+        :param name: Name of the dataset (must be unique)
+        :param func: A function that takes in a single x value (or a numpy array of them) and returns the y value
+        :param color: Color scheme for this dataset
+        :param vectorized: Does func take in numpy arrays? (None to try it out)
+        :param max_depth: Maximum number of times the spacing is halved where the curve bends sharply
+        :return: None
+        """
+        assert isinstance(name, str) and name not in self.datasets
+        assert callable(func)
+
+        self.datasets[name] = Datasets.FunctionDataset(func, color, vectorized, max_depth)
+
+    def set_pyramid(self, dataset_name, path=None, bucket_size=32, branching=4):
+        """
+        Keep a min/max pyramid for a dataset (refer to Decimation.MinMaxPyramid).  This is meant for very long histories
+        (i.e. days of data points every second): with LevelOfDetail.MIN_MAX, any x range, all the way out to the whole
+        dataset, is then drawn from the level that matches the plot width, so it takes about the same time no matter
+        how many data points there are.  The pyramid is kept up to date as data points are added.  With a path, the
+        pyramid is read from that file if it was saved for the same data (so it isn't recomputed on startup) and saved
+        to it when the graph exits.  The x values must be increasing and the dataset can't have a capacity.
+        :param dataset_name: Name of the dataset
+        :param path: Optional file to keep the pyramid in between runs
+        :param bucket_size: Number of data points summarized by every bucket of the finest level
+        :param branching: Number of buckets combined into every bucket of the next level
+        :return: None
+        """
+        assert dataset_name in self.datasets
+        dataset = self.datasets[dataset_name]
+        assert isinstance(dataset, Datasets.Dataset) and dataset.capacity is None
+
+        dataset.set_pyramid(Decimation.MinMaxPyramid(bucket_size, branching, path))
+        self._reduced_cache = {}
+
+    def exit(self):
+        """
+        Refer to Graph.exit.  This also saves the pyramids that have a file (refer to set_pyramid).
+        :return: None
+        """
+        super(Line, self).exit()
+
+        for dataset in self.datasets.values():
+            if isinstance(dataset, Datasets.Dataset) and dataset.pyramid is not None and dataset.pyramid.path is not None:
+                dataset.pyramid.save()
 
     def generate_ys_from_function(self, func, num_xs=100):
         """
@@ -526,13 +1577,9 @@ class Line(Graph):
 
         x_interval = (self._axis["x_max"] - self._axis["x_min"]) / num_xs
 
-        xs = []
-        ys = []
-        x = self._axis["x_min"]
-        while x <= self._axis["x_max"]:
-            xs.append(x)
-            ys.append(func(x))
-            x += x_interval
+        # x values are calculated from their index so floating point error doesn't add up (and x_max is always included)
+        xs = [self._axis["x_min"] + i * x_interval for i in range(num_xs)] + [self._axis["x_max"]]
+        ys = [func(x) for x in xs]
 
         return xs, ys
 
@@ -555,16 +1602,20 @@ class Bar(Graph):
         assert column_width is None or (isinstance(column_width, float) and 0 < column_width <= 1)
 
         self._plot = {"x": 0, "y": 0, "width": 0, "height": 0, "bg_color": None, "fg_color": None}
-        self._axis = {"x_min": 0, "x_max": num_columns, "x_interval": 1, "y_min": -7, "y_max": 7, "y_interval": 2}
+        self._axis = {"x_min": 0, "x_max": num_columns, "x_interval": 1, "y_min": -7, "y_max": 7, "y_interval": 2,
+                      "aligned_ticks": False}
+        self._time_axis = {"enabled": False, "utc": False, "pixels_per_tick": 60, "window": None, "follow_clock": False}
         self._drawables = {"title": None, "x_label": None, "y_label": None, "x_axis": None, "y_axis": None,
                            "x_ticks": [], "x_numbers": [], "y_ticks": [], "y_numbers": []}
-        self._bars = {"num_columns": num_columns, "column_width": column_width}
+        self._bars = {"num_columns": num_columns, "column_width": column_width, "smoothing": 1.0}
         self._can_set_bars = True
 
+        # The bars are kept drawn on their own surface and only the bars that changed are drawn again (refer to draw)
+        self._bar_layer = {"surface": None, "key": None, "shown": {}, "moving": False, "rect": pygame.Rect(0, 0, 0, 0)}
+
         self.create_plot()
 
-        self.datasets = collections.OrderedDict()
-        self.fifo_sources = []
+        self._create_data_storage()
 
     def set_bounds(self, x_min=None, x_max=None, x_interval=None, y_min=None, y_max=None, y_interval=None):
         """
@@ -580,6 +1631,18 @@ class Bar(Graph):
         """
         super(Bar, self).set_bounds(y_min=y_min, y_max=y_max, y_interval=y_interval)
 
+    def set_auto_range(self, x_mode=AutoRange.OFF, y_mode=AutoRange.OFF, x_pixels_per_tick=40, y_pixels_per_tick=25):
+        """
+        Refer to the documentation for Graph.set_auto_range.  Note that for Bar graphs, only the y axis can follow the
+        data.
+        :param x_mode: Not used!
+        :param y_mode: One of the options in AutoRange for the y axis
+        :param x_pixels_per_tick: Not used!
+        :param y_pixels_per_tick: About how many pixels there should be between y ticks
+        :return: None
+        """
+        super(Bar, self).set_auto_range(y_mode=y_mode, y_pixels_per_tick=y_pixels_per_tick)
+
     def add_dataset(self, name, x_data, y_data, color=Colors.GREEN):
         """
         Add a new dataset with its own custom color
@@ -593,33 +1656,142 @@ class Bar(Graph):
         assert isinstance(y_data, list) and all([isinstance(y, int) or isinstance(y, float) for y in y_data])
         assert len(y_data) == self._bars["num_columns"]
 
-        self.datasets[name] = {"color": color, "ys": y_data}
+        self.datasets[name] = Datasets.BarDataset(y_data, color)
 
         self._can_set_bars = False
 
     def add_datum(self, dataset_name, x_value, y_value):
-        raise NotImplementedError("add_datum is not supported for bar graphs")
+        raise NotImplementedError("add_datum is not supported for bar graphs (use set_value)")
+
+    def extend(self, dataset_name, x_values, y_values):
+        raise NotImplementedError("extend is not supported for bar graphs (use set_values)")
+
+    def set_time_axis(self, enabled=True, utc=False, pixels_per_tick=60):
+        raise NotImplementedError("Bar graphs don't have a x axis with values")
+
+    def set_time_window(self, seconds, follow_clock=False):
+        raise NotImplementedError("Bar graphs don't have a x axis with values")
+
+    def set_value(self, dataset_name, column, value):
+        """
+        Change the value of a single bar.  This is safe to call from any thread (i.e. from a data source callback); the
+        bar is drawn again starting from the next frame (and only that bar).
+        :param dataset_name: Name of the dataset
+        :param column: Index of the column (an int or a NumPy integer)
+        :param value: The new y value
+        :return: None
+        """
+        assert dataset_name in self.datasets
+        column = operator.index(column)
+        assert 0 <= column < self._bars["num_columns"]
+
+        self.datasets[dataset_name].set_value(column, value)
+
+    def set_values(self, dataset_name, values):
+        """
+        Change the values of a lot of bars at once (refer to set_value).
+        :param dataset_name: Name of the dataset
+        :param values: List with a value for every column or dictionary of column to value
+        :return: None
+        """
+        assert dataset_name in self.datasets
+        if isinstance(values, dict):
+            values = {operator.index(column): value for column, value in values.items()}
+        assert (isinstance(values, list) and len(values) == self._bars["num_columns"]) or \
+            (isinstance(values, dict) and all([0 <= column < self._bars["num_columns"] for column in values]))
+
+        self.datasets[dataset_name].set_values(values)
+
+    def set_smoothing(self, smoothing):
+        """
+        Make the bars move smoothly to their new values.  Every frame, a bar moves smoothing of the way from where it is
+        drawn to its value (so 1.0 means no smoothing and 0.2 means a bar takes about 20 frames to get there).
+        :param smoothing: Fraction of the remaining distance a bar moves every frame (must be > 0 and <= 1.0)
+        :return: None
+        """
+        assert (isinstance(smoothing, int) or isinstance(smoothing, float)) and 0 < smoothing <= 1
+
+        self._bars["smoothing"] = float(smoothing)
 
     def draw(self, surface):
         """
-        Customized draw function.
+        Customized draw function.  The bars are kept drawn on a surface the size of the plot area; only the bars whose
+        value changed (or that are still moving with smoothing) are cleared and drawn again and the surface is blitted
+        every frame.  Everything is drawn again if the bounds, the plot area, or the datasets change.
         :param surface: The surface onto which the graph should be drawn
         :return: None
         """
         super().draw(surface)
 
-        # Draw datapoints
+        layer = self._bar_layer
+        left, top, right, bottom = self._plot_rect()
+        key = (self._axis["y_min"], self._axis["y_max"], self._plot["width"], self._plot["height"],
+               tuple([(id(dataset), dataset.color) for dataset in self._frame_datasets]))
+        if layer["surface"] is None or layer["key"] != key:
+            layer["surface"] = pygame.Surface((int(self._plot["width"]) + 1, int(self._plot["height"]) + 1),
+                                              pygame.SRCALPHA)
+            layer["key"] = key
+            layer["shown"] = {id(dataset): array.array("d", dataset.ys) for dataset in self._frame_datasets}
+            layer["moving"] = False
+            for i, dataset in enumerate(self._frame_datasets):
+                for column in range(len(dataset.ys)):
+                    self._draw_bar(i, column, layer["shown"][id(dataset)][column], dataset.color)
+            surface.blit(layer["surface"], (left, top))
+            return
+
+        smoothing = self._bars["smoothing"]
+        snap = (self._axis["y_max"] - self._axis["y_min"]) / float(self._plot["height"]) / 2
+        moving = False
+        for i, dataset in enumerate(self._frame_datasets):
+            shown = layer["shown"][id(dataset)]
+            values = dataset.ys
+
+            # Without smoothing only the changed bars are drawn, unless bars were still moving when smoothing was turned
+            # off (the loop below snaps those to their values)
+            if smoothing == 1.0 and not layer["moving"]:
+                for column in dataset.changed_columns:
+                    shown[column] = values[column]
+                    self._draw_bar(i, column, shown[column], dataset.color)
+                continue
+
+            # Bars keep moving until they are within half a pixel of their value
+            for column in range(len(values)):
+                if shown[column] == values[column]:
+                    continue
+                shown[column] += (values[column] - shown[column]) * smoothing
+                if smoothing == 1.0 or abs(values[column] - shown[column]) < snap:
+                    shown[column] = values[column]
+                else:
+                    moving = True
+                self._draw_bar(i, column, shown[column], dataset.color)
+
+        layer["moving"] = moving
+        surface.blit(layer["surface"], (left, top))
+
+    def _draw_bar(self, i, column, value, color):
+        """
+        Internal function that clears the slot of a bar on the bar surface and draws the bar with its new value.
+        :param i: Index of the dataset (in this frame)
+        :param column: Index of the column
+        :param value: The value to draw the bar at
+        :param color: Color of the bar
+        :return: None
+        """
+        layer = self._bar_layer
+        left, top, right, bottom = self._plot_rect()
         one_side = (self._plot["width"] / abs(self._axis["x_max"] - self._axis["x_min"])) * self._bars["column_width"] * 0.5
-        each_width = one_side * 2 / len(self.datasets)
-        for i, dataset_name in enumerate(self.datasets):
-            color = self.datasets[dataset_name]["color"]
-            data_x = list(map(lambda x: x + 0.5, range(self._bars["num_columns"])))
-            data_y = self.datasets[dataset_name]["ys"]
+        each_width = one_side * 2 / max(len(self._frame_datasets), 1)
 
-            for x_value, y_value in zip(data_x, data_y):
-                x, y = self._datum_position(x_value, max(min(y_value, self._axis["y_max"]), self._axis["y_min"]))
-                rect = (x - one_side + each_width * i, self._axis["x_axis_y"], each_width, y - self._axis["x_axis_y"])
-                pygame.draw.rect(surface, color, rect)
+        x, y = self._datum_position(column + 0.5, max(min(value, self._axis["y_max"]), self._axis["y_min"]))
+        bar_left = x - one_side + each_width * i - left
+
+        # The slot is the whole height of the plot so whatever was drawn for the old value is gone
+        layer["rect"].update(bar_left, 0, each_width, bottom - top + 1)
+        layer["surface"].fill((0, 0, 0, 0), layer["rect"])
+
+        # pygame doesn't draw rectangles with a negative height so the bar goes from its top to the x axis
+        layer["rect"].update(bar_left, min(y, self._axis["x_axis_y"]) - top, each_width, abs(y - self._axis["x_axis_y"]))
+        pygame.draw.rect(layer["surface"], color, layer["rect"])
 
 
 class Histogram(Graph):
@@ -643,15 +1815,17 @@ class Histogram(Graph):
         assert column_width is None or (isinstance(column_width, float) and 0 < column_width <= 1)
 
         self._plot = {"x": 0, "y": 0, "width": 0, "height": 0, "bg_color": None, "fg_color": None}
-        self._axis = {"x_min": 0, "x_max": len(bins), "x_interval": 1, "y_min": 0, "y_max": 14, "y_interval": 2}
+        self._axis = {"x_min": 0, "x_max": len(bins), "x_interval": 1, "y_min": 0, "y_max": 14, "y_interval": 2,
+                      "aligned_ticks": False}
+        self._time_axis = {"enabled": False, "utc": False, "pixels_per_tick": 60, "window": None, "follow_clock": False}
         self._drawables = {"title": None, "x_label": None, "y_label": None, "x_axis": None, "y_axis": None,
                            "x_ticks": [], "x_numbers": [], "y_ticks": [], "y_numbers": []}
         self._bins = {"bins": bins, "left_inclusive": left_inclusive, "column_width": column_width}
+        self._prepare_bins()
 
         self.create_plot()
 
-        self.datasets = collections.OrderedDict()
-        self.fifo_sources = []
+        self._create_data_storage()
 
     def set_bounds(self, x_min=None, x_max=None, x_interval=None, y_min=None, y_max=None, y_interval=None):
         """
@@ -667,50 +1841,137 @@ class Histogram(Graph):
         """
         super(Histogram, self).set_bounds(y_max=y_max, y_interval=y_interval)
 
-    def add_dataset(self, name, x_data, y_data, color=Colors.GREEN):
+    def set_auto_range(self, x_mode=AutoRange.OFF, y_mode=AutoRange.OFF, x_pixels_per_tick=40, y_pixels_per_tick=25):
+        """
+        Refer to the documentation for Graph.set_auto_range.  Note that for histograms, only the maximum of the y axis
+        can follow the data (the bin counts).
+        :param x_mode: Not used!
+        :param y_mode: One of the options in AutoRange for the y axis
+        :param x_pixels_per_tick: Not used!
+        :param y_pixels_per_tick: About how many pixels there should be between y ticks
+        :return: None
+        """
+        super(Histogram, self).set_auto_range(y_mode=y_mode, y_pixels_per_tick=y_pixels_per_tick)
+
+    def add_dataset(self, name, x_data, y_data, color=Colors.GREEN, capacity=None):
         """
         Add a new dataset with its own custom color
         :param name: Name of the dataset (must be unique)
-        :param x_data: List of x data values
+        :param x_data: List, tuple, array.array, memoryview, or numpy array of x data values
         :param y_data: Not used!
         :param color: Color scheme for this dataset
+        :param capacity: Optional maximum number of x values to keep; once reached, adding a x value evicts the oldest
+                    one (and takes it out of its bin) so the memory used stays the same
         :return: None
         """
         assert isinstance(name, str) and name not in self.datasets
-        assert isinstance(x_data, list) and all([isinstance(x, int) or isinstance(x, float) for x in x_data])
 
-        ys = [0] * len(self._bins["bins"])
-        for x in x_data:
-            for i, bin in enumerate(self._bins["bins"]):
-                if self._bins["left_inclusive"] and bin[0] <= x < bin[1]:
-                    ys[i] += 1
-                elif not self._bins["left_inclusive"] and bin[0] < x <= bin[1]:
-                    ys[i] += 1
-        self.datasets[name] = {"color": color, "xs": x_data, "ys": ys}
+        x_data = Datasets.to_array(x_data)
+
+        self.datasets[name] = Datasets.HistogramDataset(x_data, len(self._bins["bins"]), self._bin_counts, color,
+                                                        capacity)
+
+    def add_streaming_dataset(self, name, color=Colors.GREEN, relative_accuracy=0.01, max_buckets=2048,
+                              percentiles=(50, 95, 99)):
+        """
+        Add a new dataset that doesn't keep its x values.  They are summarized by a quantile sketch instead (refer to
+        Datasets.QuantileSketch) so the memory used stays the same however many x values arrive (good for i.e. latency
+        distributions with millions of samples).  The bins are counted from the sketch (counts are within
+        relative_accuracy of where the x values really are) and a marker is drawn at every one of the percentiles.  Use
+        add_datum and add_data to add x values like with any other dataset.
+        :param name: Name of the dataset (must be unique)
+        :param color: Color scheme for this dataset
+        :param relative_accuracy: Maximum relative error of the percentiles (and of where values are counted)
+        :param max_buckets: Maximum number of buckets of the sketch (for each of the positive and negative values)
+        :param percentiles: Percentiles to draw markers for (between 0 and 100)
+        :return: None
+        """
+        assert isinstance(name, str) and name not in self.datasets
+        assert 0 < relative_accuracy < 1
+        assert all([0 <= p <= 100 for p in percentiles])
+
+        self.datasets[name] = Datasets.SketchDataset(len(self._bins["bins"]), self._bin_counts, color,
+                                                     relative_accuracy, max_buckets, percentiles)
+
+    def get_percentiles(self, name):
+        """
+        Get the percentiles of a streaming dataset (refer to add_streaming_dataset) as of the last frame.
+        :param name: Name of the dataset
+        :return: Dictionary of percentile to value (None if there are no values yet)
+        """
+        assert isinstance(name, str) and isinstance(self.datasets.get(name), Datasets.SketchDataset)
+
+        return dict(self.datasets[name].percentile_values())
+
+    def set_bins(self, bins, left_inclusive=None):
+        """
+        Change the bins.  Every dataset is counted again (streaming datasets from their sketch, so the resolution can be
+        changed at any time without having kept the x values).
+        :param bins: List of length 2 tuple/list defining the bins
+        :param left_inclusive: Refer to __init__ (None keeps the current setting)
+        :return: None
+        """
+        assert isinstance(bins, list) and len(bins) > 0
+        assert all([(isinstance(b, list) or isinstance(b, tuple)) and len(b) == 2 and b[0] < b[1] for b in bins])
+
+        self._bins["bins"] = bins
+        if left_inclusive is not None:
+            self._bins["left_inclusive"] = left_inclusive
+        self._prepare_bins()
+
+        Graph.set_bounds(self, x_min=0, x_max=len(bins))
+        for dataset in self.datasets.values():
+            dataset.rebin(len(bins))
 
     def add_datum(self, dataset_name, x_value, y_value):
         """
-        Add a new data point.
+        Add a new data point.  This is safe to call from any thread (i.e. from a data source callback); the data point is
+        counted starting from the next frame.
         :param dataset_name: The dataset this data point belongs to; if dataset name doesn't exist, create new dataset
         :param x_value: The x value
         :param y_value: Not used!
         :return: None
         """
-        if dataset_name in self.datasets:
-            xs = self.datasets[dataset_name]["xs"]
-            ys = self.datasets[dataset_name]["ys"]
-        else:
-            xs = []
-            ys = [0] * len(self._bins["bins"])
+        self._get_or_create_dataset(dataset_name).append(x_value)
 
-        for i, bin in enumerate(self._bins["bins"]):
-            if self._bins["left_inclusive"] and bin[0] <= x_value < bin[1]:
-                ys[i] += 1
-            elif not self._bins["left_inclusive"] and bin[0] < x_value <= bin[1]:
-                ys[i] += 1
+    def add_data(self, dataset_name, x_values):
+        """
+        Add a lot of data points at once.  Like add_datum, this is safe to call from any thread, but the values are
+        queued together and binned in one pass at the next frame, so this is a lot cheaper than calling add_datum for
+        every value (use this for data sources with a high rate).
+        :param dataset_name: The dataset these data points belong to; if dataset name doesn't exist, create new dataset
+        :param x_values: List, tuple, array.array, memoryview, or numpy array of x values
+        :return: None
+        """
+        self.extend(dataset_name, x_values)
 
-        xs.append(x_value)
-        self.datasets[dataset_name] = {"color": Colors.GREEN, "xs": xs, "ys": ys}
+    def extend(self, dataset_name, x_values, y_values=None):
+        """
+        Refer to Graph.extend (same as add_data).
+        :param dataset_name: The dataset these data points belong to; if dataset name doesn't exist, create new dataset
+        :param x_values: List, tuple, array.array, memoryview, or numpy array of x values
+        :param y_values: Not used!
+        :return: None
+        """
+        self._get_or_create_dataset(dataset_name).extend(Datasets.to_array(x_values))
+
+    def set_time_axis(self, enabled=True, utc=False, pixels_per_tick=60):
+        raise NotImplementedError("The x axis of histograms is set by the bins")
+
+    def set_time_window(self, seconds, follow_clock=False):
+        raise NotImplementedError("The x axis of histograms is set by the bins")
+
+    def _get_or_create_dataset(self, dataset_name):
+        """
+        Internal function that gets a dataset, creating it first if it doesn't exist yet.
+        :param dataset_name: Name of the dataset
+        :return: The dataset
+        """
+        dataset = self.datasets.get(dataset_name)
+        if dataset is None:
+            dataset = self.datasets.setdefault(
+                dataset_name, Datasets.HistogramDataset([], len(self._bins["bins"]), self._bin_counts, Colors.GREEN))
+        return dataset
 
     def draw(self, surface):
         """
@@ -722,17 +1983,138 @@ class Histogram(Graph):
 
         # Draw datapoints
         one_side = (self._plot["width"] / abs(self._axis["x_max"] - self._axis["x_min"])) * self._bins["column_width"] * 0.5
-        each_width = one_side * 2 / len(self.datasets)
-        for i, dataset_name in enumerate(self.datasets):
-            color = self.datasets[dataset_name]["color"]
-            data_x = list(map(lambda x: x + 0.5, range(len(self._bins["bins"]))))
-            data_y = self.datasets[dataset_name]["ys"]
+        each_width = one_side * 2 / max(len(self._frame_datasets), 1)
+        data_x = [x + 0.5 for x in range(len(self._bins["bins"]))]
+        for i, dataset in enumerate(self._frame_datasets):
+            color = dataset.color
+            data_y = dataset.ys
 
             for x_value, y_value in zip(data_x, data_y):
                 x, y = self._datum_position(x_value, max(min(y_value, self._axis["y_max"]), self._axis["y_min"]))
-                rect = (x - one_side + each_width * i, self._axis["x_axis_y"], each_width, y - self._axis["x_axis_y"])
+                # pygame doesn't draw rectangles with a negative height so the bar goes from its top to the x axis
+                rect = (x - one_side + each_width * i, min(y, self._axis["x_axis_y"]), each_width, abs(y - self._axis["x_axis_y"]))
                 pygame.draw.rect(surface, color, rect)
 
+        # Draw the percentile markers of the streaming datasets
+        left, top, right, bottom = self._plot_rect()
+        for dataset in self._frame_datasets:
+            if not isinstance(dataset, Datasets.SketchDataset):
+                continue
+
+            for percentile, value in dataset.percentile_values().items():
+                x = self._value_position(value)
+                if x is None:
+                    continue
+
+                pygame.draw.line(surface, dataset.color, (x, top), (x, bottom))
+                label = Drawables._font(12).render("p%g" % percentile, True, dataset.color)
+                surface.blit(label, label.get_rect(left=x + 2, top=top))
+
+    def _value_position(self, value):
+        """
+        Internal calculation for where a x value is on the plot (the x axis of a histogram counts bins, so this is
+        interpolated within the bin of the value).
+        :param value: The x value
+        :return: The x coordinate or None if the value isn't in any of the bins
+        """
+        i = None if value is None else self._bin_index(value)
+        if i is None:
+            return None
+
+        left, right = self._bins["lefts"][i], self._bins["rights"][i]
+        return self._datum_position(i + (value - left) / float(right - left), self._axis["y_min"])[0]
+
+    def _prepare_bins(self):
+        """
+        Internal function that figures out how x values can be binned quickly.  If the bins are sorted and don't overlap,
+        the bin of a x value can be found with a binary search (and a whole batch with numpy.searchsorted).  If they are
+        also all next to each other and the same width (like the ones from generate_bins), it can just be calculated.
+        Otherwise, every bin has to be checked.
+        :return: None
+        """
+        bins = self._bins["bins"]
+        lefts = [b[0] for b in bins]
+        rights = [b[1] for b in bins]
+        width = rights[0] - lefts[0]
+
+        self._bins["lefts"] = lefts
+        self._bins["rights"] = rights
+        self._bins["width"] = width
+        self._bins["sorted"] = all([rights[i] <= lefts[i + 1] for i in range(len(bins) - 1)])
+        self._bins["uniform"] = self._bins["sorted"] and \
+            all([rights[i] == lefts[i + 1] for i in range(len(bins) - 1)]) and \
+            all([abs((right - left) - width) <= 1e-9 * width for left, right in zip(lefts, rights)])
+
+        if numpy is not None:
+            self._bins["lefts_array"] = numpy.array(lefts, dtype=numpy.float64)
+            self._bins["rights_array"] = numpy.array(rights, dtype=numpy.float64)
+
+    def _bin_index(self, x_value):
+        """
+        Internal function that finds the bin that a x value belongs to (refer to _prepare_bins).
+        :param x_value: The x value
+        :return: Index of the bin or None if the x value isn't in any of the bins
+        """
+        lefts = self._bins["lefts"]
+        rights = self._bins["rights"]
+        left_inclusive = self._bins["left_inclusive"]
+
+        if self._bins["uniform"]:
+            if not -math.inf < x_value < math.inf:
+                return None
+            # Floating point error can put the guess off by one so the neighbours are checked too
+            guess = int(math.floor((x_value - lefts[0]) / self._bins["width"]))
+            candidates = (guess, guess - 1, guess + 1)
+        elif self._bins["sorted"]:
+            if left_inclusive:
+                candidates = (bisect.bisect_right(lefts, x_value) - 1,)
+            else:
+                candidates = (bisect.bisect_left(rights, x_value),)
+        else:
+            candidates = range(len(lefts))
+
+        for i in candidates:
+            if not 0 <= i < len(lefts):
+                continue
+            if left_inclusive and lefts[i] <= x_value < rights[i]:
+                return i
+            elif not left_inclusive and lefts[i] < x_value <= rights[i]:
+                return i
+        return None
+
+    def _bin_counts(self, x_values, weights=None):
+        """
+        Internal function that counts how many x values are in each bin.  With numpy and sorted bins, all of the values
+        are binned in one vectorized pass.
+        :param x_values: array.array of x values
+        :param weights: Optional list of how many times each x value counts (whole numbers)
+        :return: List with the number of x values in each bin
+        """
+        num_bins = len(self._bins["bins"])
+        if numpy is not None and self._bins["sorted"] and len(x_values) > 0:
+            xs = Datasets.float_array(x_values)
+            lefts = self._bins["lefts_array"]
+            rights = self._bins["rights_array"]
+            if self._bins["left_inclusive"]:
+                indices = numpy.searchsorted(lefts, xs, side="right") - 1
+                valid = indices >= 0
+                valid[valid] = xs[valid] < rights[indices[valid]]
+            else:
+                indices = numpy.searchsorted(rights, xs, side="left")
+                valid = indices < num_bins
+                valid[valid] = xs[valid] > lefts[indices[valid]]
+            if weights is None:
+                return numpy.bincount(indices[valid], minlength=num_bins).tolist()
+            weights = numpy.asarray(weights, dtype=numpy.float64)[valid]
+            return numpy.bincount(indices[valid], weights, minlength=num_bins).astype(numpy.int64).tolist()
+
+        counts = [0] * num_bins
+        for j, x_value in enumerate(x_values):
+            i = self._bin_index(x_value)
+            if i is not None:
+                counts[i] += 1 if weights is None else weights[j]
+        return counts
+
     @staticmethod
     def generate_bins(bin_min, bin_max, bin_size):
         """
@@ -746,4 +2128,210 @@ class Histogram(Graph):
         assert isinstance(bin_max, int) or isinstance(bin_max, float) and bin_max > bin_min
         assert isinstance(bin_size, int) or isinstance(bin_size, float) and bin_size > 0
 
-        return [(x * bin_size, (x + 1) * bin_size) for x in range(math.ceil(float(bin_max - bin_min) / bin_size))]
+        return [(bin_min + x * bin_size, bin_min + (x + 1) * bin_size)
+                for x in range(math.ceil(float(bin_max - bin_min) / bin_size))]
+
+
+class Heatmap(Graph):
+    def __init__(self, x, y, width, height, num_rows, num_columns, value_min=0.0, value_max=1.0,
+                 colors=Colors.HEAT_COLORS, waterfall=False):
+        """
+        Create a heatmap: a grid of num_rows by num_columns values drawn as colors.  The grid can be set all at once
+        (set_grid) or fed a column at a time (add_column), in which case it scrolls like a spectrogram: the newest column
+        is on the right and the oldest column falls off on the left.  With waterfall, the grid is turned so that the
+        newest column is a row at the top and older ones move down.  The values are turned into colors with a lookup
+        table, the grid is kept as an image with one pixel per value that is written with one bulk blit (only the new
+        columns after the image is scrolled), and the image is stretched over the plot area.  The bounds only label
+        the axes; they default to the column and row numbers.
+        :param x: The x coordinate of the top left corner of the graph
+        :param y: The y coordinate of the top left corner of the graph
+        :param width: The width of the graph
+        :param height: The height of the graph
+        :param num_rows: Number of values in a column (i.e. frequency bins of a spectrum)
+        :param num_columns: Number of columns shown
+        :param value_min: Value drawn with the first color (smaller values too)
+        :param value_max: Value drawn with the last color (larger values too)
+        :param colors: Colors from value_min to value_max (refer to set_colors)
+        :param waterfall: Draw the columns as rows with the newest at the top?
+        """
+        super(Heatmap, self).__init__(x, y, width, height)
+
+        assert isinstance(waterfall, bool)
+
+        self._grid = Datasets.HeatmapDataset(num_rows, num_columns)
+
+        # image has a pixel per value and scaled is image stretched over the plot area (refer to draw)
+        self._heatmap = {"value_min": 0.0, "value_max": 1.0, "waterfall": waterfall, "lookup": None, "image": None,
+                         "scaled": None, "key": None}
+        self.set_value_range(value_min, value_max)
+        self.set_colors(colors)
+
+        x_max, y_max = (num_rows, num_columns) if waterfall else (num_columns, num_rows)
+        self.set_bounds(x_min=0, x_max=x_max, x_interval=Graph.nice_bounds(0, x_max, max(int(self._plot["width"] // 40), 1))[2],
+                        y_min=0, y_max=y_max, y_interval=Graph.nice_bounds(0, y_max, max(int(self._plot["height"] // 25), 1))[2])
+
+    def set_value_range(self, value_min, value_max):
+        """
+        Set the values that are drawn with the first and the last color.
+        :param value_min: Value drawn with the first color (smaller values too)
+        :param value_max: Value drawn with the last color (larger values too)
+        :return: None
+        """
+        assert value_max > value_min
+
+        self._heatmap["value_min"] = float(value_min)
+        self._heatmap["value_max"] = float(value_max)
+
+    def set_colors(self, colors, size=256):
+        """
+        Set the colors that values are drawn with (refer to Colors.color_lookup_table).  Values that are NaN are drawn
+        with the first color.
+        :param colors: Tuple or list of at least two colors (from value_min to value_max)
+        :param size: Number of different colors in the lookup table
+        :return: None
+        """
+        table = Colors.color_lookup_table(colors, size)
+        if numpy is not None:
+            self._heatmap["lookup"] = numpy.array(table, dtype=numpy.uint8)
+        else:
+            self._heatmap["lookup"] = [bytes(color) for color in table]
+
+    def set_grid(self, grid):
+        """
+        Replace all of the values.  This is safe to call from any thread; the new grid is drawn starting from the next
+        frame.
+        :param grid: 2D list or numpy array of num_rows rows of num_columns values (grid[row][column], with row 0 at the
+                    bottom and column 0 the oldest)
+        :return: None
+        """
+        rows, columns = self._grid.num_rows, self._grid.num_columns
+        if numpy is not None:
+            grid = numpy.asarray(grid, dtype=numpy.float64)
+            assert grid.shape == (rows, columns)
+            self._grid.set_grid(Datasets.to_array(grid.T))
+        else:
+            assert len(grid) == rows and all([len(row) == columns for row in grid])
+            self._grid.set_grid(array.array("d", [grid[row][column] for column in range(columns) for row in range(rows)]))
+
+    def add_column(self, values):
+        """
+        Add a new column (the oldest column is dropped).  This is safe to call from any thread (i.e. from a data source
+        callback); the column is drawn starting from the next frame.
+        :param values: List, tuple, array.array, memoryview, or numpy array of num_rows values (row 0 at the bottom)
+        :return: None
+        """
+        values = Datasets.to_array(values)
+        assert len(values) == self._grid.num_rows
+
+        self._grid.add_columns(values)
+
+    def add_columns(self, columns):
+        """
+        Add a lot of new columns at once (refer to add_column).
+        :param columns: 2D list or numpy array of columns of num_rows values each (columns[column][row], oldest first)
+        :return: None
+        """
+        if numpy is not None:
+            columns = numpy.asarray(columns, dtype=numpy.float64)
+            assert columns.ndim == 2 and columns.shape[1] == self._grid.num_rows
+            self._grid.add_columns(Datasets.to_array(columns))
+        else:
+            assert all([len(column) == self._grid.num_rows for column in columns])
+            self._grid.add_columns(array.array("d", [value for column in columns for value in column]))
+
+    def add_dataset(self, name, x_data, y_data, color=Colors.GREEN, capacity=None, time_window=None):
+        raise NotImplementedError("Heatmaps don't have datasets (use set_grid or add_column)")
+
+    def add_datum(self, dataset_name, x_value, y_value):
+        raise NotImplementedError("Heatmaps don't have datasets (use add_column)")
+
+    def extend(self, dataset_name, x_values, y_values):
+        raise NotImplementedError("Heatmaps don't have datasets (use add_columns)")
+
+    def draw(self, surface):
+        """
+        Customized draw function.  The image is only written again where the grid changed: with new columns, it is
+        scrolled and just the new columns are written; everything is written again after set_grid or when the value
+        range, colors, or plot area change.  It is only stretched again when it changed.
+        :param surface: The surface onto which the graph should be drawn
+        :return: None
+        """
+        super().draw(surface)
+
+        heatmap = self._heatmap
+        grid = self._grid
+        width, height = int(self._plot["width"]), int(self._plot["height"])
+        if width <= 0 or height <= 0:
+            return
+
+        key = (heatmap["value_min"], heatmap["value_max"], id(heatmap["lookup"]), width, height)
+        if heatmap["image"] is None or heatmap["key"] != key or grid.new_columns == grid.num_columns:
+            size = (grid.num_rows, grid.num_columns) if heatmap["waterfall"] else (grid.num_columns, grid.num_rows)
+            heatmap["image"] = pygame.Surface(size)
+            heatmap["key"] = key
+            self._write_columns(0, grid.num_columns)
+            heatmap["scaled"] = None
+        elif grid.new_columns > 0:
+            if heatmap["waterfall"]:
+                heatmap["image"].scroll(0, grid.new_columns)
+            else:
+                heatmap["image"].scroll(-grid.new_columns, 0)
+            self._write_columns(grid.num_columns - grid.new_columns, grid.num_columns)
+            heatmap["scaled"] = None
+
+        if heatmap["scaled"] is None:
+            heatmap["scaled"] = pygame.transform.scale(heatmap["image"], (width, height))
+
+        left, top, right, bottom = self._plot_rect()
+        surface.blit(heatmap["scaled"], (left, top))
+
+        # The axes are at the edges of the plot area so they are put back on top
+        surface.blit(self._decorations["surface"], (self.x, self.y))
+
+    def _publish_datasets(self):
+        """
+        Refer to Graph._publish_datasets.  This also applies the queued grids and columns.
+        :return: None
+        """
+        super(Heatmap, self)._publish_datasets()
+        self._grid.publish()
+
+    def _write_columns(self, first, last):
+        """
+        Internal function that writes columns of the grid into the image (a column is a vertical line of pixels with
+        row 0 at the bottom, or a horizontal line with the newest at the top for waterfalls).
+        :param first: Index of the first column (0 is the oldest)
+        :param last: Index after the last column
+        :return: None
+        """
+        heatmap = self._heatmap
+        rows = self._grid.num_rows
+        count = last - first
+        values = self._grid.columns(first, last)
+        lookup = heatmap["lookup"]
+        scale = (len(lookup) - 1) / (heatmap["value_max"] - heatmap["value_min"])
+
+        if heatmap["waterfall"]:
+            rect = pygame.Rect(0, self._grid.num_columns - last, rows, count)
+        else:
+            rect = pygame.Rect(first, 0, count, rows)
+
+        if numpy is not None:
+            indices = (numpy.frombuffer(values, dtype=numpy.float64).reshape(count, rows) - heatmap["value_min"]) * scale
+            indices = numpy.clip(numpy.nan_to_num(indices), 0, len(lookup) - 1).astype(numpy.intp)
+            colors = lookup[indices]
+            colors = colors[::-1].transpose(1, 0, 2) if heatmap["waterfall"] else colors[:, ::-1]
+            pygame.surfarray.blit_array(heatmap["image"].subsurface(rect), colors)
+            return
+
+        indices = []
+        for value in values:
+            index = (value - heatmap["value_min"]) * scale
+            indices.append(0 if not index > 0 else (len(lookup) - 1 if index >= len(lookup) - 1 else int(index)))
+
+        # pygame.image.frombuffer wants the pixels row by row from the top
+        if heatmap["waterfall"]:
+            pixels = [lookup[indices[column * rows + row]] for column in range(count - 1, -1, -1) for row in range(rows)]
+        else:
+            pixels = [lookup[indices[column * rows + row]] for row in range(rows - 1, -1, -1) for column in range(count)]
+        heatmap["image"].blit(pygame.image.frombuffer(b"".join(pixels), rect.size, "RGB"), rect.topleft)
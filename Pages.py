@@ -2,6 +2,7 @@ import pygame
 
 from pydisplay import Colors
 from pydisplay import Constants
+from pydisplay import DataSources
 from pydisplay import Drawables
 from pydisplay import Events
 from pydisplay import PyDisplay
@@ -120,6 +121,16 @@ class Page(object):
             drawable.draw(surface)
             drawable.move(-self.location_on_screen[0], -self.location_on_screen[1])
 
+    def receive_data(self):
+        """
+        Hand over the new data to the Drawables that have data sources (refer to DataSources.DataSourceMixin).  This is
+        done for every page every frame, whether it is shown or not.
+        :return: None
+        """
+        for drawable in self._drawables:
+            if isinstance(drawable, DataSources.DataSourceMixin):
+                drawable.receive_data()
+
     def exit(self):
         """
         Gracefully exit (will call exit on all of the Drawables)
@@ -232,6 +243,14 @@ class PageManager(object):
         top = 0 if self.switcher_location == PageManager.SWITCHER_LOCATIONS["TOP"] else (Constants.PI_TFT_SCREEN_SIZE[1] - PageManager.SWITCHER_HEIGHT)
         pygame.draw.line(surface, Colors.WHITE, (0, top), (Constants.PI_TFT_SCREEN_SIZE[0], top), 1)
 
+    def receive_data(self):
+        """
+        Hand over the new data to the Drawables of all of the pages (refer to Page.receive_data)
+        :return: None
+        """
+        for page in self.pages:
+            page.receive_data()
+
     def exit(self):
         """
         Graceful exit all pages
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import time
 
@@ -5,6 +6,7 @@ import pygame
 
 from pydisplay import Constants
 from pydisplay import Controllers
+from pydisplay import DataSources
 from pydisplay import Events
 from pydisplay import Pages
 
@@ -48,6 +50,9 @@ class PyDisplay(object):
             for pin in Constants.PI_TFT_BUTTON_PINS:
                 self._button_ctrl.add_physical_button(Controllers.PhysicalButton(pin, True))
 
+        # Data streams that can be shared by everything on every page
+        self.data_hub = DataSources.DataHub()
+
         # At this point, we don't have pages so can't create a page manager
         self.page_manager = None
 
@@ -87,6 +92,8 @@ class PyDisplay(object):
         if self._touch_ctrl is not None: self._touch_ctrl.stop()
         if self._button_ctrl is not None: self._button_ctrl.stop()
 
+        self.data_hub.exit()
+
         if self.page_manager is not None:
             self.page_manager.exit()
 
@@ -99,16 +106,45 @@ class PyDisplay(object):
         try:
             while self._alive:
                 start_time = time.time()
-                if self.page_manager is not None:
-                    self.page_manager.draw(self.surface)
-                pygame.display.flip()
-
-                # Handle controllers and their generated events
-                if self._touch_ctrl is not None: self._touch_ctrl.iteration()
-                if self._button_ctrl is not None: self._button_ctrl.iteration()
-                self._event_handler.iteration()
+                self._refresh()
 
                 # Sleep for the refresh interval
                 time.sleep(max(0, Constants.REFRESH_INTERVAL - (time.time() - start_time)))
         finally:
             self.exit()
+
+    async def run_async(self):
+        """
+        Same as run, but as a coroutine so PyDisplay can live inside of an existing asyncio application (i.e.
+        asyncio.run(pydisplay.run_async()) or loop.create_task(pydisplay.run_async())).  Instead of blocking while
+        waiting for the next refresh, control is given back to the event loop so other tasks (like async data sources set
+        up with setup_new_async_data_source) can run.  Call PyDisplay.exit or cancel the task to stop displaying things.
+        :return:
+        """
+        try:
+            while self._alive:
+                start_time = time.time()
+                self._refresh()
+
+                # Let the rest of the event loop run until the next refresh
+                await asyncio.sleep(max(0, Constants.REFRESH_INTERVAL - (time.time() - start_time)))
+        finally:
+            self.exit()
+
+    def _refresh(self):
+        """
+        Internal function that does one refresh of the display: hand new data to the data hub subscribers and to the
+        Drawables of every page, draw the current page, and then handle the controllers.
+        :return: None
+        """
+        self.data_hub.iteration()
+
+        if self.page_manager is not None:
+            self.page_manager.receive_data()
+            self.page_manager.draw(self.surface)
+        pygame.display.flip()
+
+        # Handle controllers and their generated events
+        if self._touch_ctrl is not None: self._touch_ctrl.iteration()
+        if self._button_ctrl is not None: self._button_ctrl.iteration()
+        self._event_handler.iteration()
@@ -0,0 +1,196 @@
+import multiprocessing
+import os
+
+import pygame
+
+from pydisplay import Colors
+from pydisplay import Drawables
+from pydisplay import Pages
+from pydisplay import PyDisplay
+
+
+# The headless PyDisplay of a worker process (refer to SnapshotPool)
+_worker = {"pydisplay": None}
+
+
+def init_headless():
+    """
+    Start up pygame without a display (with the dummy SDL video driver) so things can be rendered in scripts and worker
+    processes that don't have a screen.  Must be called before pygame is started up.
+    :return: None
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.init()
+
+
+def render(target, size=None, bg_color=Colors.BLACK):
+    """
+    Render a Page or a Drawable (i.e. a Graph or a Chart) onto an offscreen surface.  A Page is rendered the way it is
+    shown on the screen (without the PageManager switcher).  A Drawable is rendered on its own: the surface starts at its
+    top left corner (x, y) and is as large as its width and height.  Rendering draws the target, so do this from the
+    thread that draws the display (or on a target that isn't on the display).
+    :param target: The Page or Drawable to render
+    :param size: Optional (width, height) of the surface (defaults to the screen size for a Page and the size of the
+                Drawable otherwise); useful for Drawables (like Charts) that draw outside of their height
+    :param bg_color: Background color behind a Drawable (a Page fills its own background)
+    :return: The surface (pygame.Surface)
+    """
+    assert size is None or (isinstance(size, tuple) and len(size) == 2)
+    assert Colors.is_color(bg_color)
+
+    if isinstance(target, Pages.Page):
+        surface = pygame.Surface(size if size is not None else target.screen_size)
+        target.draw(surface)
+        return surface
+
+    assert isinstance(target, Drawables.Drawable)
+    width, height = size if size is not None else (target.width, target.height)
+    width, height = max(int(round(width)), 1), max(int(round(height)), 1)
+
+    # The Drawable is drawn where it is and then cut out.  If it is partly off the surface (a negative x or y) it is
+    # moved over while it is drawn, the same way a Page moves its Drawables, so nothing of it is cut off
+    shift_x, shift_y = max(-target.x, 0), max(-target.y, 0)
+    if shift_x or shift_y:
+        target.move(shift_x, shift_y)
+    try:
+        left, top = int(round(target.x)), int(round(target.y))
+        surface = pygame.Surface((left + width, top + height))
+        surface.fill(bg_color)
+        target.draw(surface)
+    finally:
+        if shift_x or shift_y:
+            target.move(-shift_x, -shift_y)
+    return surface.subsurface((left, top, width, height)).copy()
+
+
+def save(target, path, size=None, bg_color=Colors.BLACK):
+    """
+    Render a Page or a Drawable (refer to render) and save it as an image.  The image is written next to path first and
+    then moved into place so that anything reading path never sees a half written image.
+    :param target: The Page or Drawable to render
+    :param path: Where to save the image (the format comes from the extension, i.e. .png)
+    :param size: Refer to render
+    :param bg_color: Refer to render
+    :return: None
+    """
+    root, extension = os.path.splitext(path)
+    temporary_path = root + ".tmp" + extension
+    pygame.image.save(render(target, size, bg_color), temporary_path)
+    os.replace(temporary_path, path)
+
+
+class SnapshotPool(object):
+    def __init__(self, processes=None):
+        """
+        A pool of worker processes that render and save snapshots (refer to save) with the dummy SDL video driver, so
+        generating images doesn't take frame time away from the display.  Since Pages and Drawables can't be sent to
+        another process, every snapshot is described by a job: a tuple of (factory, args, path) or (factory, args, path,
+        size).  The factory is called in the worker to build what is rendered, so it must be importable by the worker (a
+        class or function at the top level of a module, not a lambda):
+        - If the factory is a Page class, the page is created like PyDisplay.setup_pages does (with a headless PyDisplay
+          of the worker): factory(pydisplay, event_handler, *args)
+        - Otherwise, factory(*args) must return a Page or a Drawable
+        The workers are started with "spawn" so they don't inherit the display (or the threads) of this process.
+        :param processes: Number of worker processes (defaults to the number of CPUs)
+        """
+        assert processes is None or (isinstance(processes, int) and processes > 0)
+
+        context = multiprocessing.get_context("spawn")
+        self._pool = context.Pool(processes, initializer=_init_worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def save_all(self, jobs):
+        """
+        Save the snapshots of all of the jobs and wait for them to be done.
+        :param jobs: List of jobs (refer to SnapshotPool)
+        :return: List of the paths of the saved images (in the order of the jobs)
+        """
+        return self._pool.map(_save_job, SnapshotPool._check_jobs(jobs))
+
+    def save_all_async(self, jobs, callback=None, error_callback=None):
+        """
+        Same as save_all, but without waiting (i.e. to start a report from the display loop).  Note that the callbacks
+        are called from a thread of the pool.
+        :param jobs: List of jobs (refer to SnapshotPool)
+        :param callback: Optional function called with the list of paths once all of the snapshots are saved
+        :param error_callback: Optional function called with the exception if a snapshot couldn't be saved
+        :return: multiprocessing AsyncResult (get() returns the list of paths)
+        """
+        return self._pool.map_async(_save_job, SnapshotPool._check_jobs(jobs), callback=callback,
+                                    error_callback=error_callback)
+
+    def close(self):
+        """
+        Wait for the jobs that were handed to the pool and stop the worker processes.
+        :return: None
+        """
+        self._pool.close()
+        self._pool.join()
+
+    @staticmethod
+    def _check_jobs(jobs):
+        """
+        Internal function that makes sure the jobs look right before they are sent to the workers.
+        :param jobs: List of jobs
+        :return: List of jobs
+        """
+        jobs = list(jobs)
+        for job in jobs:
+            assert isinstance(job, tuple) and len(job) in (3, 4)
+            assert callable(job[0]) and isinstance(job[1], (list, tuple)) and isinstance(job[2], str)
+        return jobs
+
+
+def save_batch(jobs, processes=None):
+    """
+    Save many snapshots in parallel with a SnapshotPool that only lives for this call (use a SnapshotPool directly for
+    periodic reports so the worker processes don't need to be started every time).
+    :param jobs: List of jobs (refer to SnapshotPool)
+    :param processes: Number of worker processes (defaults to the smaller of the number of jobs and CPUs)
+    :return: List of the paths of the saved images (in the order of the jobs)
+    """
+    jobs = list(jobs)
+    if len(jobs) == 0:
+        return []
+    if processes is None:
+        processes = min(len(jobs), os.cpu_count() or 1)
+
+    with SnapshotPool(processes) as pool:
+        return pool.save_all(jobs)
+
+
+def _init_worker():
+    """
+    Internal function that starts up pygame without a display in a worker process of a SnapshotPool.
+    :return: None
+    """
+    init_headless()
+    _worker["pydisplay"] = PyDisplay.PyDisplay(on_pitft=False, enable_touchscreen=False, enable_button=False)
+
+
+def _save_job(job):
+    """
+    Internal function that builds, saves, and cleans up the target of a job in a worker process (refer to SnapshotPool).
+    :param job: The job
+    :return: The path of the saved image
+    """
+    factory, args, path = job[:3]
+    size = job[3] if len(job) == 4 else None
+
+    if isinstance(factory, type) and issubclass(factory, Pages.Page):
+        pydisplay = _worker["pydisplay"]
+        target = factory(pydisplay, pydisplay._event_handler, *args)
+    else:
+        target = factory(*args)
+
+    try:
+        save(target, path, size)
+    finally:
+        target.exit()
+    return path
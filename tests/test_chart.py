@@ -0,0 +1,61 @@
+import os
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from pydisplay import Chart
+
+
+class ChartEvictionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.init()
+
+    def test_compact_with_other_sorting_that_compares_rows(self):
+        # The compare function gets (value, row) tuples and breaks ties by row, so the sort keys have to be made again
+        # when the rows are renumbered by _compact
+        def compare(a, b):
+            if a[0] != b[0]:
+                return -1 if a[0] < b[0] else 1
+            return -1 if a[1] < b[1] else (1 if a[1] > b[1] else 0)
+
+        chart = Chart.Chart(0, 0, 200, 200)
+        chart.add_dataset("value", [])
+        chart.add_sorting_scheme(Chart.Sorting.OTHER, "value", compare)
+        chart.set_max_rows(50, Chart.Eviction.OLDEST)
+
+        for i in range(400):
+            chart.add_datum({"value": i % 7})
+
+        self.assertEqual(chart.num_rows, 50)
+        expected = sorted(i % 7 for i in range(350, 400))
+        self.assertEqual([chart.get_row(position)["value"] for position in range(chart.num_rows)], expected)
+
+    def test_eviction_policies(self):
+        values = [(i * 37) % 101 for i in range(300)]
+        cases = [(Chart.Eviction.LOWEST, "value", None, sorted(values)[-4:]),
+                 (Chart.Eviction.HIGHEST, "value", None, sorted(values)[:4]),
+                 (Chart.Eviction.OTHER, None, lambda row: -row["value"], sorted(values)[:4])]
+        for eviction, dataset_name, eviction_func, expected in cases:
+            chart = Chart.Chart(0, 0, 200, 200)
+            chart.add_dataset("value", [])
+            chart.add_sorting_scheme(Chart.Sorting.ASCENDING, "value")
+            chart.set_max_rows(4, eviction, dataset_name, eviction_func)
+            for value in values:
+                chart.add_datum({"value": value})
+            self.assertEqual([chart.get_row(position)["value"] for position in range(chart.num_rows)], expected)
+
+    def test_highest_evicts_the_oldest_of_a_tie(self):
+        chart = Chart.Chart(0, 0, 200, 200)
+        chart.add_dataset("name", [])
+        chart.add_dataset("value", [])
+        chart.set_max_rows(2, Chart.Eviction.HIGHEST, "value")
+        for name, value in (("a", 3), ("b", 3), ("c", 1)):
+            chart.add_datum({"name": name, "value": value})
+        self.assertEqual([chart.get_row(position)["name"] for position in range(chart.num_rows)], ["b", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()